@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+جهان دارایی فشرده: ستون‌های پیوسته NumPy (قیمت، change_7d، change_30d، کد دسته) و جدول نمادهای
+intern شده به جای یک dict برای هر دارایی؛ بارگذاری و ذخیره جریانی با همان قالب فایل‌های JSON بازار
+"""
+
+import os
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+import instrumentation
+from calculate_volatility import ASSET_FILES, DATA_DIR
+from json_stream import AtomicWriter, MarketJSONReader, MarketJSONWriter
+from volatility_params import UnknownCategoryError, VolatilityParams
+
+CORE_FIELDS = ('price', 'change_7d', 'change_30d')
+
+# نوع مقدار هر فیلد اصلی در هر سطر تا عدد صحیح/اعشاری و "N/A" بدون تغییر بازنویسی شوند
+FLOAT, INT, NA, ABSENT, OTHER = range(5)
+MAX_EXACT_INT = 2 ** 53  # larger ints would not survive a float64 round trip
+
+_MISSING = object()
+_ROOT = object()  # position of the asset section among a file's top-level keys
+
+CategoryLabel = Tuple[str, str]  # (asset_class, category)
+
+
+class SymbolTable:
+    """جدول رشته‌های یکتا: هر رشته یک بار (intern شده) نگه داشته و با کد صحیح ارجاع می‌شود"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, code: int) -> str:
+        return self.names[code]
+
+    def code(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            name = sys.intern(name)
+            code = len(self.names)
+            self.codes[name] = code
+            self.names.append(name)
+        return code
+
+    def get(self, name: str) -> Optional[int]:
+        return self.codes.get(name)
+
+
+class FileLayout:
+    """ساختار یک فایل بازار: ترتیب کلیدهای سطح اول و بازه سطرهای هر دسته"""
+
+    __slots__ = ('key', 'path', 'top', 'categories')
+
+    def __init__(self, key: str, path: str):
+        self.key = key
+        self.path = path
+        self.top: List[Tuple[str, Any]] = []
+        self.categories: List[Tuple[int, int, int]] = []  # (category code, first row, end row)
+
+    @property
+    def rows(self) -> range:
+        if not self.categories:
+            return range(0)
+        return range(self.categories[0][1], self.categories[-1][2])
+
+
+class AssetUniverse:
+    """تمام دارایی‌های فایل‌های بازار به صورت ستونی (struct-of-arrays)
+
+    values[field] و kinds[field] برای price، change_7d و change_30d آرایه‌های پیوسته‌اند؛
+    category کد (asset_class، category) هر سطر و symbol_codes کد نماد در جدول symbols است.
+    فیلدهای دیگر هر دارایی (name، symbol، ...) در یک لیست برای هر کلید نگه داشته می‌شوند و
+    ترتیب کلیدهای هر رکورد با کد layout حفظ می‌شود تا خروجی بایت به بایت با dict اصلی یکسان باشد.
+    """
+
+    def __init__(self):
+        self.symbols = SymbolTable()
+        self.categories: List[CategoryLabel] = []
+        self._category_codes: Dict[CategoryLabel, int] = {}
+        self.layouts: List[Tuple[str, ...]] = []
+        self._layout_codes: Dict[Tuple[str, ...], int] = {}
+        self.files: Dict[str, FileLayout] = {}
+        self.extras: Dict[str, List[Any]] = {}
+        self.others: Dict[Tuple[str, int], Any] = {}
+
+        # Compact growable buffers while loading; converted to NumPy by _freeze
+        self._values = {field: array('d') for field in CORE_FIELDS}
+        self._kinds = {field: array('b') for field in CORE_FIELDS}
+        self._category = array('h')
+        self._layout = array('H')
+        self._symbol_codes = array('i')
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    # ---- loading -------------------------------------------------------------
+
+    @classmethod
+    def load(cls, data_dir: str = DATA_DIR, keys: List[str] = None) -> 'AssetUniverse':
+        """خواندن جریانی فایل‌های بازار؛ dict هر دارایی فقط لحظه‌ای ساخته و به ستون‌ها منتقل می‌شود"""
+        universe = cls()
+        for key in (keys or list(ASSET_FILES)):
+            filepath = os.path.join(data_dir, ASSET_FILES[key]['filename'])
+            if not os.path.exists(filepath):
+                print(f"فایل {filepath} پیدا نشد")
+                instrumentation.count('files_missing', asset_class=key)
+                continue
+            with instrumentation.stage('parse', asset_class=key), open(filepath, 'r', encoding='utf-8') as f:
+                universe._load_events(key, filepath, MarketJSONReader(f, key))
+        universe._freeze()
+        return universe
+
+    @classmethod
+    def from_market(cls, market: Dict[str, Dict[str, Any]]) -> 'AssetUniverse':
+        """ساخت از خروجی load_market_files ({کلید: {'path', 'data', ...}})"""
+        universe = cls()
+        for key, entry in market.items():
+            universe._load_events(key, entry['path'], _dict_events(entry['data'], key))
+        universe._freeze()
+        return universe
+
+    def _load_events(self, key: str, path: str, events: Iterable[Tuple[str, str, Optional[str], Any]]) -> None:
+        layout = FileLayout(key, path)
+        self.files[key] = layout
+        current = None
+        for kind, name, symbol, value in events:
+            if kind == 'key':
+                layout.top.append((name, value))
+            elif kind == 'root':
+                layout.top.append((key, _ROOT))
+            elif kind == 'category':
+                code = self._category_code((key, name))
+                current = [code, self.size, self.size]
+                layout.categories.append(current)
+            else:
+                self._append(current[0], symbol, value)
+                current[2] = self.size
+        layout.categories = [tuple(entry) for entry in layout.categories]
+
+    def _category_code(self, label: CategoryLabel) -> int:
+        code = self._category_codes.get(label)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(label)
+            self._category_codes[label] = code
+        return code
+
+    def _layout_code(self, keys: Tuple[str, ...]) -> int:
+        code = self._layout_codes.get(keys)
+        if code is None:
+            code = len(self.layouts)
+            self.layouts.append(keys)
+            self._layout_codes[keys] = code
+        return code
+
+    def _append(self, category_code: int, symbol: str, record: Dict) -> None:
+        row = self.size
+        for field in CORE_FIELDS:
+            value = record.get(field, _MISSING)
+            if value is _MISSING:
+                kind, number = ABSENT, 0.0
+            elif value == "N/A":
+                kind, number = NA, float('nan')
+            elif isinstance(value, float):
+                kind, number = FLOAT, value
+            elif isinstance(value, int) and not isinstance(value, bool) and abs(value) < MAX_EXACT_INT:
+                kind, number = INT, float(value)
+            else:
+                kind, number = OTHER, float('nan')
+                self.others[(field, row)] = value
+            self._values[field].append(number)
+            self._kinds[field].append(kind)
+
+        for field, value in record.items():
+            if field in CORE_FIELDS:
+                continue
+            column = self.extras.get(field)
+            if column is None:
+                column = self.extras[field] = [_MISSING] * row
+            column.append(sys.intern(value) if isinstance(value, str) else value)
+        for column in self.extras.values():
+            if len(column) == row:
+                column.append(_MISSING)
+
+        self._category.append(category_code)
+        self._layout.append(self._layout_code(tuple(record)))
+        self._symbol_codes.append(self.symbols.code(symbol))
+        self.size += 1
+
+    def _freeze(self) -> None:
+        self.values = {field: np.frombuffer(buffer, dtype=np.float64).copy() for field, buffer in self._values.items()}
+        self.kinds = {field: np.frombuffer(buffer, dtype=np.int8).copy() for field, buffer in self._kinds.items()}
+        self.category = np.frombuffer(self._category, dtype=np.int16).copy()
+        self.layout = np.frombuffer(self._layout, dtype=np.uint16).copy()
+        self.symbol_codes = np.frombuffer(self._symbol_codes, dtype=np.int32).copy()
+        del self._values, self._kinds, self._category, self._layout, self._symbol_codes
+
+    # ---- queries -------------------------------------------------------------
+
+    @property
+    def nbytes(self) -> int:
+        """حجم ستون‌های NumPy (بدون لیست فیلدهای جانبی)"""
+        arrays = list(self.values.values()) + list(self.kinds.values())
+        return sum(a.nbytes for a in arrays + [self.category, self.layout, self.symbol_codes])
+
+    def priced(self) -> np.ndarray:
+        """ماسک دارایی‌هایی که قیمت عددی غیرصفر دارند (مکمل skip_reason)"""
+        kinds = self.kinds['price']
+        return ((kinds == FLOAT) | (kinds == INT)) & (self.values['price'] != 0)
+
+    def skipped_counts(self, rows: np.ndarray) -> Dict[CategoryLabel, Dict[str, int]]:
+        """تعداد دارایی‌های بدون قیمت هر دسته به تفکیک دلیل ('missing_price' یا 'zero_price')"""
+        kinds = self.kinds['price'][rows]
+        reasons = {'missing_price': kinds == NA, 'zero_price': ~self.priced()[rows] & (kinds != NA)}
+        counts: Dict[CategoryLabel, Dict[str, int]] = {}
+        for reason, mask in reasons.items():
+            codes, values = np.unique(self.category[rows[mask]], return_counts=True)
+            for code, value in zip(codes, values):
+                counts.setdefault(self.categories[code], {})[reason] = int(value)
+        return counts
+
+    def asset_rows(self) -> np.ndarray:
+        """سطرهای دسته‌های مجاز هر فایل به همان ترتیب iter_asset_records"""
+        parts = []
+        for key, layout in self.files.items():
+            ranges = {self.categories[code][1]: (start, stop) for code, start, stop in layout.categories}
+            allowed = ASSET_FILES[key]['categories']
+            for category in (allowed if allowed is not None else list(ranges)):
+                if category in ranges:
+                    parts.append(np.arange(*ranges[category]))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+    def rows(self, symbols: Iterable[str]) -> np.ndarray:
+        """اولین سطر هر نماد (برای نمادهای تکراری در چند کلاس) یا -1 برای نماد ناشناخته"""
+        first = np.full(len(self.symbols), -1, dtype=np.intp)
+        # Fancy assignment keeps the last write, so assigning in reverse leaves the first row
+        first[self.symbol_codes[::-1]] = np.arange(self.size - 1, -1, -1)
+        codes = [self.symbols.get(symbol) for symbol in symbols]
+        return np.array([first[code] if code is not None else -1 for code in codes], dtype=np.intp)
+
+    def category_labels(self, rows: np.ndarray) -> List[CategoryLabel]:
+        """(asset_class، category فایل) هر سطر"""
+        return [self.categories[code] for code in self.category[rows]]
+
+    def param_ids(self, params: VolatilityParams, rows: np.ndarray,
+                  unknown: Optional[Set[str]] = None) -> np.ndarray:
+        """شناسه پارامتر نوسان هر سطر (-1 برای دسته ناشناخته)
+
+        مانند get_volatility_factor فیلد category خود دارایی بر دسته فایل مقدم است.
+        """
+        overrides = self.extras.get('category')
+        resolved: Dict[Tuple[int, Any], int] = {}
+        ids = np.empty(len(rows), dtype=np.intp)
+        for position, row in enumerate(rows):
+            code = int(self.category[row])
+            override = overrides[row] if overrides is not None else _MISSING
+            pair = (code, override)
+            if pair not in resolved:
+                asset_class, category = self.categories[code]
+                try:
+                    resolved[pair] = params.category_id(asset_class, category if override is _MISSING else override)
+                except UnknownCategoryError as exc:
+                    if unknown is not None:
+                        unknown.add(exc.args[0])
+                    resolved[pair] = -1
+            ids[position] = resolved[pair]
+        return ids
+
+    # ---- updates -------------------------------------------------------------
+
+    def set_values(self, field: str, rows: np.ndarray, values: np.ndarray) -> None:
+        """نوشتن مقدار اعشاری فیلد در سطرها؛ فیلد غایب مانند dict به انتهای کلیدهای رکورد اضافه می‌شود"""
+        rows = np.asarray(rows, dtype=np.intp)
+        absent = rows[self.kinds[field][rows] == ABSENT]
+        if len(absent):
+            codes = self.layout[absent]
+            for code in np.unique(codes):
+                self.layout[absent[codes == code]] = self._layout_code(self.layouts[code] + (field,))
+        for row in rows[self.kinds[field][rows] == OTHER]:
+            self.others.pop((field, int(row)), None)
+        self.values[field][rows] = values
+        self.kinds[field][rows] = FLOAT
+
+    # ---- dumping -------------------------------------------------------------
+
+    def record(self, row: int) -> Dict:
+        """بازسازی dict یک دارایی با همان ترتیب کلیدها و نوع مقدارها"""
+        record = {}
+        for field in self.layouts[self.layout[row]]:
+            if field in self.values:
+                kind = self.kinds[field][row]
+                if kind == FLOAT:
+                    record[field] = float(self.values[field][row])
+                elif kind == INT:
+                    record[field] = int(self.values[field][row])
+                elif kind == NA:
+                    record[field] = "N/A"
+                else:
+                    record[field] = self.others[(field, row)]
+            else:
+                record[field] = self.extras[field][row]
+        return record
+
+    def iter_records(self, key: str) -> Iterator[Tuple[str, str, Dict]]:
+        """(دسته، نماد، داده) تمام دارایی‌های یک فایل به ترتیب فایل"""
+        for code, start, stop in self.files[key].categories:
+            category = self.categories[code][1]
+            for row in range(start, stop):
+                yield category, self.symbols[self.symbol_codes[row]], self.record(row)
+
+    def file_data(self, key: str) -> Dict:
+        """سند کامل یک فایل (برای سازگاری با کدهای مبتنی بر dict)"""
+        layout = self.files[key]
+        data = {}
+        for name, value in layout.top:
+            if value is not _ROOT:
+                data[name] = value
+                continue
+            section = data[key] = {}
+            for code, _, _ in layout.categories:
+                section[self.categories[code][1]] = {}
+            for category, symbol, record in self.iter_records(key):
+                section[category][symbol] = record
+        return data
+
+    def dump_file(self, key: str, f, indent: Optional[int] = 2) -> None:
+        """نوشتن جریانی فایل با همان قالب save_json_file"""
+        layout = self.files[key]
+        writer = MarketJSONWriter(f, key, indent)
+        for name, value in layout.top:
+            if value is not _ROOT:
+                writer.write_key(name, value)
+                continue
+            writer.write_root()
+            for code, start, stop in layout.categories:
+                category = self.categories[code][1]
+                writer.write_category(category)
+                for row in range(start, stop):
+                    writer.write_record(category, self.symbols[self.symbol_codes[row]], self.record(row))
+        writer.close()
+
+    def save(self, compact: bool = False) -> List[str]:
+        """ذخیره اتمی فایل‌ها؛ فایل‌هایی که محتوایشان تغییر نکرده دست نمی‌خورند"""
+        written = []
+        for key, layout in self.files.items():
+            writer = AtomicWriter(layout.path, skip_if_unchanged=True)
+            with instrumentation.stage('write', asset_class=key), writer as f:
+                self.dump_file(key, f, None if compact else 2)
+            if writer.replaced:
+                written.append(layout.path)
+            else:
+                instrumentation.count('files_unchanged', asset_class=key)
+        return written
+
+
+def _dict_events(data: Dict, key: str) -> Iterator[Tuple[str, str, Optional[str], Any]]:
+    """همان رویدادهای MarketJSONReader از روی سند بارگذاری شده"""
+    for name, value in data.items():
+        if name != key or not isinstance(value, dict):
+            yield 'key', name, None, value
+            continue
+        yield 'root', name, None, None
+        for category, records in value.items():
+            yield 'category', category, None, None
+            for symbol, record in records.items():
+                yield 'record', category, symbol, record
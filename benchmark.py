@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+سنجش کارایی اسکریپت‌های نوسان و تولید اخبار روی داده‌های مصنوعی با اندازه قابل تنظیم
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from calculate_volatility import ASSET_FILES, COMPLETE_DATA_FILE
+from json_stream import MarketJSONWriter, write_file_atomic
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = [88, 10_000]
+COLD_START_RUNS = 3
+# وابستگی‌هایی که نباید فقط با وارد کردن ماژول یک فرمان بارگذاری شوند
+HEAVY_MODULES = ('numpy', 'yfinance', 'requests', 'pandas')
+# Runs in a fresh interpreter: import one command module and report its cost
+COLD_START_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+seconds = time.perf_counter() - start
+print(json.dumps({'import_seconds': seconds, 'heavy_modules': [m for m in sys.argv[2:] if m in sys.modules]}))
+'''
+ALL_SIZES = [88, 10_000, 1_000_000]
+NEWS_POOL_FILE = 'news-pool.json'
+
+# سهم هر کلاس دارایی از کل جهان مصنوعی و دسته‌های آن
+SYNTHETIC_UNIVERSE = {
+    'stocks': (0.5, ['technology', 'banking', 'healthcare', 'energy', 'retail', 'industrial']),
+    'cryptocurrencies': (0.2, ['top_tier', 'defi_layer2', 'stablecoins']),
+    'commodities': (0.15, ['precious_metals', 'energy', 'industrial_metals', 'agricultural']),
+    'indices': (0.15, ['american', 'european', 'asian']),
+}
+
+
+def generate_synthetic_market(data_dir: str, n_assets: int, seed: int = 0) -> Dict[str, int]:
+    """ساخت فایل‌های *_complete_data.json مصنوعی با n_assets دارایی (به صورت جریانی)"""
+    # Real tickers first so update_real_volatility finds its major stocks
+    from real_volatility_calculator import MAJOR_STOCKS
+
+    os.makedirs(data_dir, exist_ok=True)
+    rng = random.Random(seed)
+    counts = {}
+    for key, (share, categories) in SYNTHETIC_UNIVERSE.items():
+        class_total = max(len(categories), round(n_assets * share))
+        counts[key] = class_total
+        filepath = os.path.join(data_dir, ASSET_FILES[key]['filename'])
+        with open(filepath, 'wb') as f:
+            writer = MarketJSONWriter(f, key)
+            for index, category in enumerate(categories):
+                per_category = class_total // len(categories) + (index < class_total % len(categories))
+                symbols = MAJOR_STOCKS.get(category, []) if key == 'stocks' else []
+                symbols = symbols[:per_category]
+                symbols += [f"{category[:3].upper()}{i:07d}" for i in range(per_category - len(symbols))]
+                writer.write_category(category)
+                for symbol in symbols:
+                    roll = rng.random()
+                    price = 0 if roll < 0.005 else "N/A" if roll < 0.01 else round(rng.uniform(0.5, 5000), 2)
+                    writer.write_record(category, symbol, {
+                        'symbol': symbol,
+                        'name': f"Synthetic {symbol}",
+                        'price': price,
+                        'category': category,
+                        'change_7d': 0,
+                        'change_30d': 0,
+                    })
+            writer.write_key('metadata', {'source': 'synthetic', 'assets': class_total, 'seed': seed})
+            writer.close()
+
+    complete_data = {'metadata': {'total_assets': sum(counts.values()), 'last_updated': None}}
+    write_file_atomic(json.dumps(complete_data, ensure_ascii=False, indent=2).encode('utf-8'),
+                      os.path.join(data_dir, COMPLETE_DATA_FILE))
+    return counts
+
+
+def _run_calculate_volatility(data_dir: str, size: int) -> int:
+    from calculate_volatility import update_market_volatility
+    return update_market_volatility(data_dir=data_dir, seed=0)['processed']
+
+
+def _run_calculate_volatility_stream(data_dir: str, size: int) -> int:
+    from calculate_volatility import update_market_volatility
+    return update_market_volatility(data_dir=data_dir, seed=0, stream=True)['processed']
+
+
+def _run_calculate_volatility_correlated(data_dir: str, size: int) -> int:
+    from calculate_volatility import update_market_volatility
+    return update_market_volatility(data_dir=data_dir, seed=0, correlated=True)['processed']
+
+
+def _run_update_real_volatility(data_dir: str, size: int) -> int:
+    from real_volatility_calculator import update_real_volatility
+    return update_real_volatility(data_dir=data_dir, seed=0)['processed']
+
+
+def _run_generate_news_pool(data_dir: str, size: int) -> int:
+    from generate_news_pool import generate_news_pool
+    normal_count = size * 2 // 3
+    counts = generate_news_pool(os.path.join(data_dir, NEWS_POOL_FILE), normal_count, size - normal_count,
+                                seed=0)
+    return counts['normalNews'] + counts['majorNews']
+
+
+STAGES = {
+    'calculate_volatility': _run_calculate_volatility,
+    'calculate_volatility_stream': _run_calculate_volatility_stream,
+    'calculate_volatility_correlated': _run_calculate_volatility_correlated,
+    'update_real_volatility': _run_update_real_volatility,
+    'generate_news_pool': _run_generate_news_pool,
+}
+
+
+def run_stage_in_process(stage: str, data_dir: str, size: int) -> Dict[str, Any]:
+    """اجرای یک مرحله در همین پردازه و اندازه‌گیری زمان و بیشینه حافظه"""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull  # the stages print Persian progress lines per file
+        try:
+            start = time.perf_counter()
+            items = STAGES[stage](data_dir, size)
+            wall = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak_kb //= 1024  # macOS reports bytes
+    return {
+        'stage': stage,
+        'size': size,
+        'items': items,
+        'wall_seconds': round(wall, 6),
+        'items_per_second': round(items / wall, 2) if wall > 0 else None,
+        'peak_rss_mb': round(peak_kb / 1024, 2),
+    }
+
+
+def run_stage(stage: str, data_dir: str, size: int) -> Dict[str, Any]:
+    """اجرای مرحله در پردازه تازه تا بیشینه حافظه هر مرحله جدا اندازه‌گیری شود"""
+    command = [sys.executable, os.path.abspath(__file__), '--run-stage', stage,
+               '--data-dir', data_dir, '--size', str(size)]
+    completed = subprocess.run(command, capture_output=True, text=True, check=False)
+    if completed.returncode != 0:
+        return {'stage': stage, 'size': size, 'error': completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure_cold_start(command: str, runs: int = COLD_START_RUNS) -> Dict[str, Any]:
+    """زمان شروع سرد یک فرمان market_cli در پردازه تازه (کمینه چند اجرا)
+
+    help_seconds کل زمان «python -m market_cli <فرمان> --help» با راه‌اندازی مفسر است و
+    import_seconds فقط زمان وارد کردن ماژول فرمان؛ heavy_modules وابستگی‌های سنگینی است که
+    همان import بارگذاری کرده است.
+    """
+    from market_cli import COMMANDS
+    module = COMMANDS[command][0]
+    help_times, import_times, heavy = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-m', 'market_cli', command, '--help'], cwd=REPO_DIR,
+                                   capture_output=True, text=True, check=False)
+        help_times.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            return {'command': command, 'error': completed.stderr.strip().splitlines()[-1:]}
+        probe = subprocess.run([sys.executable, '-c', COLD_START_PROBE, module, *HEAVY_MODULES], cwd=REPO_DIR,
+                               capture_output=True, text=True, check=False)
+        if probe.returncode != 0:
+            return {'command': command, 'error': probe.stderr.strip().splitlines()[-1:]}
+        measured = json.loads(probe.stdout.strip().splitlines()[-1])
+        import_times.append(measured['import_seconds'])
+        heavy = measured['heavy_modules']
+    return {
+        'command': command,
+        'module': module,
+        'help_seconds': round(min(help_times), 6),
+        'import_seconds': round(min(import_times), 6),
+        'heavy_modules': heavy,
+    }
+
+
+def git_commit() -> str:
+    """شناسه commit فعلی برای مقایسه نتایج بین نسخه‌ها"""
+    try:
+        completed = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                   cwd=REPO_DIR, check=True)
+        return completed.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare_results(current: List[Dict[str, Any]], baseline_path: str,
+                    cold_start: List[Dict[str, Any]] = ()) -> None:
+    """چاپ نسبت زمان و حافظه (و زمان شروع سرد) نسبت به یک فایل نتایج قبلی"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    baseline = {(r['stage'], r['size']): r for r in report['results'] if 'error' not in r}
+    baseline_cold = {r['command']: r for r in report.get('cold_start', []) if 'error' not in r}
+    for result in cold_start:
+        previous = baseline_cold.get(result['command'])
+        if previous is None or 'error' in result or not previous['help_seconds']:
+            continue
+        print(f"{'cold_start ' + result['command']:<30} {'':>9}  زمان ×{result['help_seconds'] / previous['help_seconds']:.2f}")
+    for result in current:
+        previous = baseline.get((result['stage'], result['size']))
+        if previous is None or 'error' in result:
+            continue
+        time_ratio = result['wall_seconds'] / previous['wall_seconds'] if previous['wall_seconds'] else float('nan')
+        memory_ratio = result['peak_rss_mb'] / previous['peak_rss_mb'] if previous['peak_rss_mb'] else float('nan')
+        print(f"{result['stage']:<30} {result['size']:>9}  زمان ×{time_ratio:.2f}  حافظه ×{memory_ratio:.2f}")
+
+
+def main(argv: List[str] = None):
+    """تابع اصلی"""
+    parser = argparse.ArgumentParser(description="سنجش کارایی مراحل نوسان و تولید اخبار")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help=f"تعداد دارایی/خبر در هر اجرا (مثلاً {' '.join(map(str, ALL_SIZES))})")
+    parser.add_argument('--stages', nargs='+', choices=sorted(STAGES), default=list(STAGES))
+    parser.add_argument('--output', default='benchmark_results.json', help="مسیر فایل JSON نتایج")
+    parser.add_argument('--compare', default=None, help="فایل نتایج قبلی برای مقایسه")
+    parser.add_argument('--cold-start-runs', type=int, default=COLD_START_RUNS,
+                        help="تعداد اجرای هر فرمان برای زمان شروع سرد (0 = بدون اندازه‌گیری)")
+    parser.add_argument('--keep-data', default=None, help="پوشه‌ای برای نگه داشتن داده‌های مصنوعی")
+    parser.add_argument('--run-stage', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--data-dir', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_stage:
+        print(json.dumps(run_stage_in_process(args.run_stage, args.data_dir, args.size)))
+        return
+
+    cold_start = []
+    if args.cold_start_runs > 0:
+        from market_cli import COMMANDS
+        print("زمان شروع سرد فرمان‌ها...")
+        for command in COMMANDS:
+            result = measure_cold_start(command, args.cold_start_runs)
+            cold_start.append(result)
+            if 'error' in result:
+                print(f"{command:<30} خطا: {result['error']}")
+            else:
+                heavy = ', '.join(result['heavy_modules']) or '-'
+                print(f"{command:<30} help {result['help_seconds']:>7.3f}s  import {result['import_seconds']:>7.3f}s"
+                      f"  وابستگی سنگین: {heavy}")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='market-bench-') as scratch:
+        root = args.keep_data or scratch
+        for size in args.sizes:
+            data_dir = os.path.join(root, str(size))
+            print(f"ساخت داده مصنوعی با {size} دارایی...")
+            generate_synthetic_market(data_dir, size)
+            for stage in args.stages:
+                result = run_stage(stage, data_dir, size)
+                results.append(result)
+                if 'error' in result:
+                    print(f"{stage:<30} {size:>9}  خطا: {result['error']}")
+                else:
+                    print(f"{stage:<30} {size:>9}  {result['wall_seconds']:>9.3f}s"
+                          f"  {result['items_per_second']:>12.0f}/s  {result['peak_rss_mb']:>8.1f} MB")
+
+    report = {
+        'timestamp': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+        'cold_start': cold_start,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"نتایج در {args.output} ذخیره شد")
+
+    if args.compare:
+        compare_results(results, args.compare, cold_start)
+
+
+if __name__ == "__main__":
+    main()
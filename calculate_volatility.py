@@ -3,231 +3,542 @@
 محاسبه نوسانات 7 و 30 روزه برای تمام دارایی‌ها
 """
 
+import argparse
 import json
 import math
+import os
 import random
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
 
-def load_json_file(filepath: str) -> Dict:
-    """بارگذاری فایل JSON"""
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"فایل {filepath} پیدا نشد")
-        return {}
-
-def save_json_file(data: Dict, filepath: str) -> None:
-    """ذخیره فایل JSON"""
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-def calculate_volatility_7_30_days(asset_data: Dict, asset_type: str) -> Dict:
+import instrumentation
+from json_stream import dumps, load_json_file, save_json_file, stream_update_market_file, write_file_atomic
+from rng_streams import ItemRandom, RNGService
+from volatility_cache import VOLATILITY_CACHE_PATH, VolatilityCache, cache_key
+from volatility_params import UnknownCategoryError, load_volatility_params
+
+DATA_DIR = '/workspace/data/market-real-data'
+COMPLETE_DATA_FILE = 'complete_market_data_88_assets.json'
+
+# فایل‌های داده هر دسته دارایی؛ categories=None یعنی تمام دسته‌های موجود در فایل
+ASSET_FILES = {
+    'stocks': {'filename': 'stocks_complete_data.json', 'label': 'سهام', 'categories': None},
+    'cryptocurrencies': {
+        'filename': 'cryptocurrencies_complete_data.json',
+        'label': 'رمزارزها',
+        'categories': ['top_tier', 'defi_layer2', 'stablecoins'],
+    },
+    'commodities': {'filename': 'commodities_complete_data.json', 'label': 'کالاها', 'categories': None},
+    'indices': {'filename': 'indices_complete_data.json', 'label': 'شاخص‌ها', 'categories': None},
+}
+
+# دسته‌های بزرگ به تکه‌هایی با این اندازه تقسیم می‌شوند تا بین پردازه‌ها پخش شوند
+CHUNK_SIZE = 5000
+
+def get_volatility_factor(asset_data: Dict, asset_class: str = None, category: str = None) -> Dict[str, float]:
+    """فاکتور نوسان متناسب با دسته دارایی از volatility_params.json
+
+    دسته ناشناخته با UnknownCategoryError گزارش می‌شود (دیگر به technology نگاشت نمی‌شود).
+    """
+    params = load_volatility_params()
+    category = asset_data.get('category', category)
+    if asset_class is None:
+        asset_class = params.find_class(category)
+        if asset_class is None:
+            raise UnknownCategoryError(str(category))
+    return params.factor(asset_class, category)
+
+def skip_reason(asset_data: Dict) -> Optional[str]:
+    """دلیل رد شدن دارایی بدون قیمت ('zero_price' یا 'missing_price')؛ None یعنی دارایی پردازش می‌شود"""
+    current_price = asset_data.get('price', 0)
+    if current_price == "N/A":
+        return 'missing_price'
+    if current_price == 0:
+        return 'zero_price'
+    return None
+
+def calculate_volatility_7_30_days(asset_data: Dict, asset_type: str, rng: random.Random = random,
+                                   asset_class: str = None) -> Dict:
     """محاسبه نوسانات 7 و 30 روزه بر اساس نوع دارایی"""
     
     # دریافت قیمت فعلی
-    current_price = asset_data.get('price', 0)
-    if current_price == 0 or current_price == "N/A":
+    if skip_reason(asset_data) is not None:
         return asset_data
     
-    # تعریف فاکتورهای نوسان بر اساس نوع دارایی
-    volatility_factors = {
-        'technology': {
-            'base_volatility_7d': 0.025,  # 2.5% نوسان 7 روزه
-            'base_volatility_30d': 0.085,  # 8.5% نوسان 30 روزه
-            'random_factor': 0.15  # فاکتور تصادفی
-        },
-        'banking': {
-            'base_volatility_7d': 0.018,
-            'base_volatility_30d': 0.065,
-            'random_factor': 0.12
-        },
-        'healthcare': {
-            'base_volatility_7d': 0.022,
-            'base_volatility_30d': 0.075,
-            'random_factor': 0.13
-        },
-        'energy': {
-            'base_volatility_7d': 0.028,
-            'base_volatility_30d': 0.095,
-            'random_factor': 0.16
-        },
-        'retail': {
-            'base_volatility_7d': 0.020,
-            'base_volatility_30d': 0.070,
-            'random_factor': 0.14
-        },
-        'industrial': {
-            'base_volatility_7d': 0.025,
-            'base_volatility_30d': 0.080,
-            'random_factor': 0.15
-        },
-        'top_tier': {
-            'base_volatility_7d': 0.035,
-            'base_volatility_30d': 0.120,
-            'random_factor': 0.20
-        },
-        'defi_layer2': {
-            'base_volatility_7d': 0.045,
-            'base_volatility_30d': 0.150,
-            'random_factor': 0.25
-        },
-        'stablecoin': {
-            'base_volatility_7d': 0.002,
-            'base_volatility_30d': 0.005,
-            'random_factor': 0.01
-        },
-        'precious_metals': {
-            'base_volatility_7d': 0.015,
-            'base_volatility_30d': 0.055,
-            'random_factor': 0.10
-        },
-        'industrial_metals': {
-            'base_volatility_7d': 0.025,
-            'base_volatility_30d': 0.085,
-            'random_factor': 0.15
-        },
-        'agricultural': {
-            'base_volatility_7d': 0.020,
-            'base_volatility_30d': 0.070,
-            'random_factor': 0.13
-        },
-        'american': {
-            'base_volatility_7d': 0.012,
-            'base_volatility_30d': 0.045,
-            'random_factor': 0.08
-        },
-        'european': {
-            'base_volatility_7d': 0.013,
-            'base_volatility_30d': 0.050,
-            'random_factor': 0.09
-        },
-        'asian': {
-            'base_volatility_7d': 0.015,
-            'base_volatility_30d': 0.055,
-            'random_factor': 0.10
-        }
-    }
-    
     # دریافت فاکتور مناسب
-    category = asset_data.get('category', 'default')
-    factor = volatility_factors.get(category, volatility_factors['technology'])
+    factor = get_volatility_factor(asset_data, asset_class, asset_type)
     
     # محاسبه نوسان 7 روزه
-    volatility_7d = factor['base_volatility_7d'] * (1 + random.uniform(-factor['random_factor'], factor['random_factor']))
+    volatility_7d = factor['base_volatility_7d'] * (1 + rng.uniform(-factor['random_factor'], factor['random_factor']))
     # اعمال نوسان تصادفی
-    change_7d = volatility_7d * random.uniform(-1, 1)
+    change_7d = volatility_7d * rng.uniform(-1, 1)
     
     # محاسبه نوسان 30 روزه (مبتنی بر نوسان 7 روزه)
-    volatility_30d = factor['base_volatility_30d'] * (1 + random.uniform(-factor['random_factor'], factor['random_factor']))
-    change_30d = volatility_30d * random.uniform(-1, 1)
+    volatility_30d = factor['base_volatility_30d'] * (1 + rng.uniform(-factor['random_factor'], factor['random_factor']))
+    change_30d = volatility_30d * rng.uniform(-1, 1)
     
-    # بروزرسانی داده‌ها
-    asset_data['change_7d'] = round(change_7d * 100, 2)  # تبدیل به درصد
-    asset_data['change_30d'] = round(change_30d * 100, 2)  # تبدیل به درصد
+    # بروزرسانی داده‌ها (+ 0.0 مقدار -0.0 را مانند خواندن از کش SQLite به 0.0 تبدیل می‌کند)
+    asset_data['change_7d'] = round(change_7d * 100, 2) + 0.0  # تبدیل به درصد
+    asset_data['change_30d'] = round(change_30d * 100, 2) + 0.0  # تبدیل به درصد
     
     return asset_data
 
 def update_stocks_volatility() -> None:
     """بروزرسانی نوسانات سهام"""
-    print("در حال بروزرسانی نوسانات سهام...")
-    
-    stocks_data = load_json_file('/workspace/data/market-real-data/stocks_complete_data.json')
-    
-    if not stocks_data:
-        return
-        
-    # بروزرسانی هر دسته سهام
-    for category, stocks in stocks_data['stocks'].items():
-        for symbol, data in stocks.items():
-            stocks_data['stocks'][category][symbol] = calculate_volatility_7_30_days(data, category)
-    
-    # ذخیره فایل
-    save_json_file(stocks_data, '/workspace/data/market-real-data/stocks_complete_data.json')
-    print("نوسانات سهام با موفقیت بروزرسانی شد")
+    update_market_volatility(['stocks'], update_complete_data=False)
 
 def update_cryptocurrencies_volatility() -> None:
     """بروزرسانی نوسانات رمزارزها"""
-    print("در حال بروزرسانی نوسانات رمزارزها...")
-    
-    crypto_data = load_json_file('/workspace/data/market-real-data/cryptocurrencies_complete_data.json')
-    
-    if not crypto_data:
-        return
-        
-    # تعریف دسته‌بندی رمزارزها
-    crypto_categories = ['top_tier', 'defi_layer2', 'stablecoins']
-    
-    # بروزرسانی هر دسته رمزارز
-    for category in crypto_categories:
-        if category in crypto_data['cryptocurrencies']:
-            for symbol, data in crypto_data['cryptocurrencies'][category].items():
-                crypto_data['cryptocurrencies'][category][symbol] = calculate_volatility_7_30_days(data, category)
-    
-    # ذخیره فایل
-    save_json_file(crypto_data, '/workspace/data/market-real-data/cryptocurrencies_complete_data.json')
-    print("نوسانات رمزارزها با موفقیت بروزرسانی شد")
+    update_market_volatility(['cryptocurrencies'], update_complete_data=False)
 
 def update_commodities_volatility() -> None:
     """بروزرسانی نوسانات کالاها"""
-    print("در حال بروزرسانی نوسانات کالاها...")
-    
-    commodities_data = load_json_file('/workspace/data/market-real-data/commodities_complete_data.json')
-    
-    if not commodities_data:
-        return
-        
-    # بروزرسانی هر دسته کالا
-    for category, commodities in commodities_data['commodities'].items():
-        for symbol, data in commodities.items():
-            commodities_data['commodities'][category][symbol] = calculate_volatility_7_30_days(data, category)
-    
-    # ذخیره فایل
-    save_json_file(commodities_data, '/workspace/data/market-real-data/commodities_complete_data.json')
-    print("نوسانات کالاها با موفقیت بروزرسانی شد")
+    update_market_volatility(['commodities'], update_complete_data=False)
 
 def update_indices_volatility() -> None:
     """بروزرسانی نوسانات شاخص‌ها"""
-    print("در حال بروزرسانی نوسانات شاخص‌ها...")
-    
-    indices_data = load_json_file('/workspace/data/market-real-data/indices_complete_data.json')
-    
-    if not indices_data:
+    update_market_volatility(['indices'], update_complete_data=False)
+
+def serialize_json(data: Dict, compact: bool = False) -> bytes:
+    """تبدیل داده به بایت‌های JSON با همان قالب save_json_file"""
+    return dumps(data, None if compact else 2).encode('utf-8')
+
+def load_market_files(keys: List[str], data_dir: str = DATA_DIR) -> Dict[str, Dict[str, Any]]:
+    """بارگذاری یکباره فایل‌های دارایی؛ بایت‌های اصلی برای تشخیص تغییر نگه داشته می‌شوند"""
+    market = {}
+    for key in keys:
+        filepath = os.path.join(data_dir, ASSET_FILES[key]['filename'])
+        try:
+            with instrumentation.stage('read', asset_class=key), open(filepath, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            print(f"فایل {filepath} پیدا نشد")
+            instrumentation.count('files_missing', asset_class=key)
+            continue
+        instrumentation.count('bytes_read', len(raw), asset_class=key)
+        with instrumentation.stage('parse', asset_class=key):
+            market[key] = {'path': filepath, 'raw': raw, 'data': json.loads(raw)}
+    return market
+
+def iter_asset_records(data: Dict, key: str) -> Iterator[Tuple[str, str, Dict]]:
+    """پیمایش (دسته، نماد، داده) دارایی‌های یک فایل با رعایت دسته‌های مجاز آن"""
+    assets = data.get(key, {})
+    categories = ASSET_FILES[key]['categories']
+    for category in (categories if categories is not None else list(assets)):
+        if category not in assets:
+            continue
+        for symbol, asset_data in assets[category].items():
+            yield category, symbol, asset_data
+
+def asset_random(rng: ItemRandom, key: str, category: str, symbol: str) -> ItemRandom:
+    """جریان تصادفی یک دارایی؛ فقط به بذر اجرا و هویت دارایی وابسته است، پس حالت عادی، جریانی، موازی و کش یکسان‌اند"""
+    return rng.item('calculate_volatility', key, category, symbol)
+
+def build_volatility_tasks(market: Dict[str, Dict[str, Any]], rngs: RNGService,
+                           chunk_size: int = CHUNK_SIZE) -> List[Tuple]:
+    """تقسیم دارایی‌ها به کارهای مستقل (فایل، دسته، بذر اجرا، دارایی‌های تکه)"""
+    tasks = []
+    for key, entry in market.items():
+        chunks = {}
+        for category, symbol, asset_data in iter_asset_records(entry['data'], key):
+            chunks.setdefault(category, []).append((symbol, asset_data))
+        for category, records in chunks.items():
+            for start in range(0, len(records), chunk_size):
+                tasks.append((key, category, rngs.seed, records[start:start + chunk_size]))
+    return tasks
+
+def update_asset_volatility(asset_data: Dict, key: str, category: str, rng: random.Random,
+                            unknown: Set[str]) -> Dict:
+    """مانند calculate_volatility_7_30_days، ولی دارایی با دسته ناشناخته بدون تغییر می‌ماند و در unknown ثبت می‌شود"""
+    try:
+        return calculate_volatility_7_30_days(asset_data, category, rng, key)
+    except UnknownCategoryError as exc:
+        unknown.add(exc.args[0])
+        return asset_data
+
+def report_unknown_categories(unknown: Set[str]) -> None:
+    if unknown:
+        print(f"⚠️ پارامتر نوسان برای دسته‌های {', '.join(sorted(unknown))} تعریف نشده؛ این دارایی‌ها بدون تغییر ماندند")
+
+def count_assets(key: str, category: str, processed: int, skipped: Dict[str, int]) -> None:
+    """ثبت شمارنده‌های دارایی‌های پردازش شده و رد شده (بر اساس دلیل) یک دسته"""
+    instrumentation.count('assets_processed', processed, asset_class=key, category=category)
+    for reason, value in skipped.items():
+        instrumentation.count('assets_skipped', value, asset_class=key, category=category, reason=reason)
+
+def compute_volatility_chunk(task: Tuple) -> Tuple[str, str, List[Tuple[str, Dict]], Set[str], Dict[str, Any]]:
+    """محاسبه نوسانات یک تکه با جریان تصادفی مستقل هر دارایی (قابل اجرا در پردازه جداگانه)
+
+    آمار تکه (زمان و تعداد رد شده‌ها) برگردانده می‌شود چون شمارنده‌های پردازه worker به والد نمی‌رسند.
+    """
+    started = time.perf_counter()
+    key, category, seed, records = task
+    rng = ItemRandom(seed)
+    results = []
+    unknown = set()
+    skipped: Dict[str, int] = {}
+    for symbol, asset_data in records:
+        reason = skip_reason(asset_data)
+        if reason is not None:
+            skipped[reason] = skipped.get(reason, 0) + 1
+            results.append((symbol, asset_data))
+            continue
+        results.append((symbol, update_asset_volatility(asset_data, key, category,
+                                                         asset_random(rng, key, category, symbol), unknown)))
+    return key, category, results, unknown, {'seconds': time.perf_counter() - started, 'skipped': skipped}
+
+def compute_market_volatility(market: Dict[str, Dict[str, Any]], rngs: RNGService = None, workers: int = 1,
+                              chunk_size: int = CHUNK_SIZE, unknown: Optional[Set[str]] = None) -> int:
+    """محاسبه نوسانات تمام دسته‌های دارایی در یک گذر؛ تعداد دارایی‌های پردازش شده را برمی‌گرداند
+
+    خروجی برای یک seed ثابت مستقل از تعداد workers و ترتیب اجرای کارهاست.
+    """
+    tasks = build_volatility_tasks(market, rngs or RNGService(), chunk_size)
+
+    if workers > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(compute_volatility_chunk, tasks))
+    else:
+        results = [compute_volatility_chunk(task) for task in tasks]
+
+    # ادغام نتایج پیش از نوشتن یکباره فایل‌ها
+    processed = 0
+    category_stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for key, category, records, chunk_unknown, stats in results:
+        if unknown is not None:
+            unknown |= chunk_unknown
+        assets = market[key]['data'][key][category]
+        for symbol, asset_data in records:
+            assets[symbol] = asset_data
+        processed += len(records)
+
+        totals = category_stats.setdefault((key, category), {'seconds': 0.0, 'records': 0, 'skipped': {}})
+        totals['seconds'] += stats['seconds']
+        totals['records'] += len(records)
+        for reason, value in stats['skipped'].items():
+            totals['skipped'][reason] = totals['skipped'].get(reason, 0) + value
+
+    # Chunk times are summed per category (CPU seconds across workers, not wall time)
+    for (key, category), totals in category_stats.items():
+        instrumentation.record_stage('compute', totals['seconds'], asset_class=key, category=category)
+        count_assets(key, category, totals['records'], totals['skipped'])
+    return processed
+
+def compute_correlated_market_volatility(market: Dict[str, Dict[str, Any]], rngs: RNGService = None,
+                                         unknown: Optional[Set[str]] = None) -> int:
+    """محاسبه همبسته تغییرات تمام دارایی‌ها با یک ضرب ماتریسی (حالت --correlated)
+
+    انحراف معیار هر دارایی برابر انحراف معیار تغییر در حالت مستقل است (base / √3)،
+    ولی دارایی‌های یک دسته و یک کلاس با هم حرکت می‌کنند.
+    """
+    from correlated_shocks import draw_correlated_changes
+
+    params = load_volatility_params()
+    labels, ids, targets = [], [], []
+    processed = 0
+    skipped: Dict[Tuple[str, str], Dict[str, int]] = {}
+    for key, entry in market.items():
+        for category, symbol, asset_data in iter_asset_records(entry['data'], key):
+            processed += 1
+            reason = skip_reason(asset_data)
+            if reason is not None:
+                counts = skipped.setdefault((key, category), {})
+                counts[reason] = counts.get(reason, 0) + 1
+                continue
+            try:
+                ids.append(params.category_id(key, asset_data.get('category', category)))
+            except UnknownCategoryError as exc:
+                if unknown is not None:
+                    unknown.add(exc.args[0])
+                continue
+            labels.append((key, category))
+            targets.append(asset_data)
+
+    # Parameters are gathered by category id in one vectorized step
+    sigmas_7d = params.gather('base_volatility_7d', ids) * 100 / math.sqrt(3)
+    sigmas_30d = params.gather('base_volatility_30d', ids) * 100 / math.sqrt(3)
+    rng = (rngs or RNGService()).generator('correlated')
+    with instrumentation.stage('compute', mode='correlated'):
+        changes = draw_correlated_changes(labels, {'change_7d': sigmas_7d, 'change_30d': sigmas_30d}, rng)
+        for row, asset_data in enumerate(targets):
+            asset_data['change_7d'] = round(float(changes['change_7d'][row]), 2)
+            asset_data['change_30d'] = round(float(changes['change_30d'][row]), 2)
+    instrumentation.count('assets_processed', processed, mode='correlated')
+    for (key, category), counts in skipped.items():
+        count_assets(key, category, 0, counts)
+    return processed
+
+def compute_universe_correlated_volatility(universe, rngs: RNGService = None,
+                                           unknown: Optional[Set[str]] = None) -> int:
+    """حالت --correlated روی ستون‌های AssetUniverse؛ خروجی با compute_correlated_market_volatility یکسان است"""
+    from correlated_shocks import draw_correlated_changes
+
+    params = load_volatility_params()
+    rows = universe.asset_rows()
+    for (asset_class, category), counts in universe.skipped_counts(rows).items():
+        count_assets(asset_class, category, 0, counts)
+    processed = len(rows)
+
+    rows = rows[universe.priced()[rows]]
+    ids = universe.param_ids(params, rows, unknown)
+    rows, ids = rows[ids >= 0], ids[ids >= 0]
+
+    sigmas_7d = params.gather('base_volatility_7d', ids) * 100 / math.sqrt(3)
+    sigmas_30d = params.gather('base_volatility_30d', ids) * 100 / math.sqrt(3)
+    rng = (rngs or RNGService()).generator('correlated')
+    with instrumentation.stage('compute', mode='correlated'):
+        changes = draw_correlated_changes(universe.category_labels(rows),
+                                          {'change_7d': sigmas_7d, 'change_30d': sigmas_30d}, rng)
+        for field, values in changes.items():
+            # Python round() keeps the stored decimals identical to the dict-based path
+            universe.set_values(field, rows, [round(float(value), 2) for value in values])
+    instrumentation.count('assets_processed', processed, mode='correlated')
+    return processed
+
+def asset_cache_key(rngs: RNGService, key: str, category: str, symbol: str, asset_data: Dict) -> str:
+    """کلید کش یک دارایی: تمام ورودی‌هایی که change_7d/change_30d به آنها وابسته است"""
+    return cache_key('calculate_volatility', rngs.seed, key, category, symbol,
+                     asset_data.get('price'), get_volatility_factor(asset_data, key, category))
+
+def compute_cached_market_volatility(market: Dict[str, Dict[str, Any]], rngs: RNGService,
+                                     cache: VolatilityCache, unknown: Optional[Set[str]] = None) -> int:
+    """محاسبه با کش: فقط دارایی‌هایی که ورودی‌شان تغییر کرده دوباره محاسبه می‌شوند
+
+    جریان تصادفی هر دارایی همان جریان حالت عادی است، پس خروجی با و بدون کش یکسان است؛
+    کلید کش شامل بذر است چون نتیجه به آن وابسته است.
+    """
+    processed = 0
+    pending = []
+    skipped: Dict[Tuple[str, str], Dict[str, int]] = {}
+    for key, entry in market.items():
+        for category, symbol, asset_data in iter_asset_records(entry['data'], key):
+            processed += 1
+            reason = skip_reason(asset_data)
+            if reason is not None:
+                counts = skipped.setdefault((key, category), {})
+                counts[reason] = counts.get(reason, 0) + 1
+                continue
+            try:
+                entry_key = asset_cache_key(rngs, key, category, symbol, asset_data)
+            except UnknownCategoryError as exc:
+                if unknown is not None:
+                    unknown.add(exc.args[0])
+                continue
+            pending.append((entry_key, key, category, symbol, asset_data))
+
+    with instrumentation.stage('cache_read'):
+        cached = cache.get_many(entry_key for entry_key, _, _, _, _ in pending)
+    fresh = {}
+    rng = ItemRandom(rngs.seed)
+    with instrumentation.stage('compute', mode='cached'):
+        for entry_key, key, category, symbol, asset_data in pending:
+            if entry_key in cached:
+                asset_data['change_7d'], asset_data['change_30d'] = cached[entry_key]
+                continue
+            calculate_volatility_7_30_days(asset_data, category, asset_random(rng, key, category, symbol), key)
+            fresh[entry_key] = (asset_data['change_7d'], asset_data['change_30d'])
+    with instrumentation.stage('cache_write'):
+        cache.put_many(fresh)
+    instrumentation.count('assets_processed', processed, mode='cached')
+    instrumentation.count('cache_hits', len(cached))
+    instrumentation.count('cache_misses', len(fresh))
+    for (key, category), counts in skipped.items():
+        count_assets(key, category, 0, counts)
+    return processed
+
+def stream_market_volatility(keys: List[str], data_dir: str = DATA_DIR, rngs: RNGService = None,
+                             compact: bool = False, unknown: Optional[Set[str]] = None) -> Tuple[int, List[str]]:
+    """محاسبه جریانی: هر فایل دارایی به دارایی خوانده و نوشته می‌شود و کل سند در حافظه نمی‌ماند
+
+    جریان هر دارایی مانند حالت عادی است، پس خروجی برای یک seed با compute_market_volatility یکسان است.
+    """
+    rngs = rngs or RNGService()
+    unknown = set() if unknown is None else unknown
+    processed = 0
+    written = []
+    for key in keys:
+        filepath = os.path.join(data_dir, ASSET_FILES[key]['filename'])
+        if not os.path.exists(filepath):
+            print(f"فایل {filepath} پیدا نشد")
+            continue
+
+        positions = {}
+        rng = ItemRandom(rngs.seed)
+        skipped: Dict[str, Dict[str, int]] = {}
+
+        def update_record(category: str, symbol: str, asset_data: Dict) -> Dict:
+            nonlocal processed
+            positions[category] = positions.get(category, 0) + 1
+            processed += 1
+            reason = skip_reason(asset_data)
+            if reason is not None:
+                counts = skipped.setdefault(category, {})
+                counts[reason] = counts.get(reason, 0) + 1
+                return asset_data
+            return update_asset_volatility(asset_data, key, category, asset_random(rng, key, category, symbol),
+                                           unknown)
+
+        # Parsing, computing and writing are interleaved, so only the whole file is timed
+        with instrumentation.stage('stream', asset_class=key):
+            if stream_update_market_file(filepath, filepath, key, update_record,
+                                         ASSET_FILES[key]['categories'], None if compact else 2):
+                written.append(filepath)
+        for category, records in positions.items():
+            count_assets(key, category, records, skipped.get(category, {}))
+    return processed, written
+
+def write_changed_files(market: Dict[str, Dict[str, Any]], compact: bool = False) -> List[str]:
+    """نوشتن اتمی فقط فایل‌هایی که محتوایشان تغییر کرده است"""
+    written = []
+    for key, entry in market.items():
+        with instrumentation.stage('serialize', asset_class=key):
+            payload = serialize_json(entry['data'], compact)
+        if payload == entry['raw']:
+            instrumentation.count('files_unchanged', asset_class=key)
+            continue
+        with instrumentation.stage('write', asset_class=key):
+            write_file_atomic(payload, entry['path'])
+        instrumentation.count('bytes_written', len(payload), asset_class=key)
+        entry['raw'] = payload
+        written.append(entry['path'])
+    return written
+
+def update_complete_data_metadata(data_dir: str = DATA_DIR, compact: bool = False, seed: int = None) -> bool:
+    """بروزرسانی metadata فایل جامع (همراه با بذر تصادفی اجرا برای بازتولید آن)"""
+    filepath = os.path.join(data_dir, COMPLETE_DATA_FILE)
+    with instrumentation.stage('read', file='complete_data'):
+        complete_data = load_json_file(filepath)
+    if not complete_data:
+        return False
+
+    now = datetime.now()
+    complete_data['metadata']['last_updated'] = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+    complete_data['metadata']['volatility_calculated'] = True
+    complete_data['metadata']['volatility_calculation_date'] = now.strftime("%Y-%m-%d")
+    if seed is not None:
+        complete_data['metadata']['volatility_seed'] = seed
+
+    with instrumentation.stage('write', file='complete_data'):
+        write_file_atomic(serialize_json(complete_data, compact), filepath)
+    return True
+
+def cache_run_seed(cache_path: Optional[str], seed: Optional[int]) -> Optional[int]:
+    """بذر اجرا؛ با کش و بدون --seed بذر ذخیره شده در کش به کار می‌رود تا اجراهای بعدی به کش بخورند"""
+    if not cache_path or seed is not None:
+        return seed
+    with VolatilityCache(cache_path) as cache:
+        seed = cache.default_seed()
+    print(f"⚠️ --seed داده نشده؛ بذر ذخیره شده کش ({seed}) به کار می‌رود")
+    return seed
+
+def update_market_volatility(keys: List[str] = None, data_dir: str = DATA_DIR,
+                             update_complete_data: bool = True, seed: int = None,
+                             workers: int = 1, correlated: bool = False, stream: bool = False,
+                             compact: bool = False, cache_path: str = None) -> Dict[str, Any]:
+    """خط لوله یکپارچه: بارگذاری یکباره، محاسبه همه دسته‌ها، نوشتن فایل‌های تغییر یافته
+
+    با stream=True فایل‌ها به صورت جریانی پردازش می‌شوند تا حافظه مستقل از اندازه فایل بماند.
+    با cache_path نتایج در کش SQLite نگه داشته می‌شوند و دارایی‌های بدون تغییر دوباره محاسبه نمی‌شوند.
+    """
+    if stream and correlated:
+        raise ValueError("حالت همبسته به تمام دارایی‌ها با هم نیاز دارد و با حالت جریانی سازگار نیست")
+    if cache_path and (stream or correlated):
+        raise ValueError("کش نتایج فقط در حالت عادی (غیر جریانی و غیر همبسته) پشتیبانی می‌شود")
+    keys = list(ASSET_FILES) if keys is None else keys
+    rngs = RNGService(cache_run_seed(cache_path, seed))
+    unknown = set()
+    for key in keys:
+        print(f"در حال بروزرسانی نوسانات {ASSET_FILES[key]['label']}...")
+
+    if stream:
+        processed, written = stream_market_volatility(keys, data_dir, rngs, compact=compact, unknown=unknown)
+        loaded = [key for key in keys if os.path.exists(os.path.join(data_dir, ASSET_FILES[key]['filename']))]
+    elif correlated:
+        # Columnar path: records are streamed into AssetUniverse arrays instead of per-asset dicts
+        from asset_universe import AssetUniverse
+
+        universe = AssetUniverse.load(data_dir, keys)
+        processed = compute_universe_correlated_volatility(universe, rngs, unknown)
+        written = universe.save(compact)
+        loaded = list(universe.files)
+    else:
+        market = load_market_files(keys, data_dir)
+        if cache_path:
+            with VolatilityCache(cache_path) as cache:
+                processed = compute_cached_market_volatility(market, rngs, cache, unknown)
+                print(f"کش نوسان: {cache.hits} مورد از کش، {cache.misses} مورد محاسبه شد")
+        else:
+            processed = compute_market_volatility(market, rngs, workers=workers, unknown=unknown)
+        written = write_changed_files(market, compact)
+        loaded = list(market)
+    report_unknown_categories(unknown)
+
+    for key in loaded:
+        print(f"نوسانات {ASSET_FILES[key]['label']} با موفقیت بروزرسانی شد")
+
+    complete_updated = False
+    if update_complete_data:
+        print("در حال بروزرسانی فایل جامع...")
+        complete_updated = update_complete_data_metadata(data_dir, compact, rngs.seed)
+        if complete_updated:
+            print("فایل جامع با موفقیت بروزرسانی شد")
+
+    return {'processed': processed, 'written': written, 'complete_data_updated': complete_updated,
+            'seed': rngs.seed, 'unknown_categories': sorted(unknown)}
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """خواندن آرگومان‌های خط فرمان"""
+    parser = argparse.ArgumentParser(description="محاسبه نوسانات 7 و 30 روزه برای تمام دارایی‌ها")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="پوشه فایل‌های داده بازار")
+    parser.add_argument('--workers', type=int, default=1, help="تعداد پردازه‌های موازی")
+    parser.add_argument('--seed', type=int, default=None, help="بذر تصادفی برای خروجی تکرارپذیر")
+    parser.add_argument('--correlated', action='store_true', help="تغییرات همبسته بین دارایی‌های هم‌دسته و هم‌کلاس")
+    parser.add_argument('--stream', action='store_true', help="پردازش جریانی فایل‌ها با حافظه ثابت")
+    parser.add_argument('--compact', action='store_true', help="خروجی JSON فشرده (بدون تورفتگی)")
+    parser.add_argument('--cache', nargs='?', const=VOLATILITY_CACHE_PATH, default=None,
+                        help="کش SQLite نتایج برای رد شدن از دارایی‌های بدون تغییر (بدون --seed بذر ذخیره شده کش)")
+    add_instrumentation_args(parser)
+    add_snapshot_args(parser)
+    return parser.parse_args(argv)
+
+def add_instrumentation_args(parser: argparse.ArgumentParser) -> None:
+    """گزینه‌های مشترک --metrics و --profile برای خط فرمان‌ها"""
+    parser.add_argument('--metrics', nargs='?', const='-', default=None,
+                        help="ثبت زمان مراحل و شمارنده‌ها به صورت JSON lines در فایل (بدون مسیر: stderr)")
+    parser.add_argument('--profile', choices=instrumentation.PROFILE_MODES, default=None,
+                        help="پروفایل cpu (cProfile) یا memory (tracemalloc) و ثبت نتیجه در metrics")
+
+def add_snapshot_args(parser: argparse.ArgumentParser) -> None:
+    """گزینه‌های مشترک ثبت وضعیت پایان اجرا در تاریخچه snapshot_store"""
+    parser.add_argument('--snapshot', nargs='?', const='', default=None,
+                        help="ثبت وضعیت پس از اجرا در تاریخچه (بدون مسیر: market_history.snap داخل data-dir)")
+    parser.add_argument('--day', type=int, default=None,
+                        help="روز بازی snapshot (پیش‌فرض روز آخرین snapshot + 1)")
+
+def record_run_snapshot(args: argparse.Namespace, **metadata) -> None:
+    """ثبت snapshot در صورت درخواست با --snapshot"""
+    if args.snapshot is None:
         return
-        
-    # بروزرسانی هر دسته شاخص
-    for category, indices in indices_data['indices'].items():
-        for symbol, data in indices.items():
-            indices_data['indices'][category][symbol] = calculate_volatility_7_30_days(data, category)
-    
-    # ذخیره فایل
-    save_json_file(indices_data, '/workspace/data/market-real-data/indices_complete_data.json')
-    print("نوسانات شاخص‌ها با موفقیت بروزرسانی شد")
+    from snapshot_store import record_market_snapshot
+    record_market_snapshot(args.data_dir, args.snapshot or None, args.day, metadata)
 
-def main():
+def main(argv: List[str] = None):
     """تابع اصلی"""
+    args = parse_args(argv)
     print("شروع محاسبه نوسانات 7 و 30 روزه...")
     print("زمان شروع:", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     
-    # بروزرسانی تمام دسته‌ها
-    update_stocks_volatility()
-    update_cryptocurrencies_volatility()
-    update_commodities_volatility()
-    update_indices_volatility()
-    
-    # بروزرسانی فایل جامع
-    print("در حال بروزرسانی فایل جامع...")
-    complete_data = load_json_file('/workspace/data/market-real-data/complete_market_data_88_assets.json')
-    
-    if complete_data:
-        # بروزرسانی metadata
-        complete_data['metadata']['last_updated'] = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
-        complete_data['metadata']['volatility_calculated'] = True
-        complete_data['metadata']['volatility_calculation_date'] = datetime.now().strftime("%Y-%m-%d")
-        
-        save_json_file(complete_data, '/workspace/data/market-real-data/complete_market_data_88_assets.json')
-        print("فایل جامع با موفقیت بروزرسانی شد")
+    # بروزرسانی تمام دسته‌ها و فایل جامع در یک گذر
+    with instrumentation.instrumented(args.metrics, args.profile, script='calculate_volatility') as metrics:
+        result = update_market_volatility(data_dir=args.data_dir, seed=args.seed, workers=args.workers,
+                                          correlated=args.correlated, stream=args.stream, compact=args.compact,
+                                          cache_path=args.cache)
+        metrics.emit({'type': 'result', 'processed': result['processed'], 'written': len(result['written']),
+                      'seed': result['seed'], 'unknown_categories': result['unknown_categories']})
+        record_run_snapshot(args, source='calculate_volatility', seed=result['seed'])
+    print(f"بذر تصادفی این اجرا: {result['seed']}")
     
     print("محاسبه نوسانات کامل شد!")
     print("زمان پایان:", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
@@ -1,5 +1,19 @@
-import json
+#!/usr/bin/env python3
+"""
+تولید مخزن اخبار معمولی، مهم و رویدادهای زمان‌بندی شده بازار؛ وارد کردن ماژول هیچ کاری انجام نمی‌دهد
+"""
+
+import argparse
+import hashlib
 import random
+import string
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Set
+
+from json_stream import AtomicWriter, dumps
+from news_index import NewsIndexBuilder, index_path
+from rng_streams import RNGService
+from scheduled_events import generate_scheduled_events
 
 # دسته‌بندی‌های اخبار
 categories = {
@@ -12,15 +26,61 @@ categories = {
     "indices": ["SP500", "NASDAQ", "DOW", "FTSE", "DAX", "NIKKEI"]
 }
 
+companies = ["TechCorp", "GlobalBank", "MegaRetail", "NovaPharma", "AutoWorks", "PetroLine", "SkyJet",
+             "TerraMining", "UrbanEstate", "AgriCo", "MetalOne", "FinEdge", "ByteWave", "GreenPower",
+             "OceanFreight", "PrimeFoods", "SolarGrid", "CoinVault", "HealthPlus", "SteelBridge"]
+
+# هر فیلد choices یک مقدار تصادفی می‌گیرد؛ sector و percent از اثر خبر می‌آیند.
+# ظرفیت هر قالب حدود ۱۵ هزار (اثر × بخش) ضرب در حاصل‌ضرب اندازه choices است
 normal_news_templates = [
     {
         "title_fa": "تحلیلگران {action} {percent}% در {sector} پیش‌بینی می‌کنند",
         "desc_fa": "تحلیلگران بازار انتظار دارند {sector} در {timeframe} آینده تغییرات قابل توجهی را تجربه کند.",
-        "actions": ["رشد", "کاهش", "نوسان", "ثبات"],
-        "timeframes": ["فصل", "ماه", "هفته", "سه‌ماهه"],
+        "choices": {
+            "action": ["رشد", "کاهش", "نوسان", "ثبات"],
+            "timeframe": ["فصل", "ماه", "هفته", "سه‌ماهه"],
+        },
         "min_impact": 0.5,
         "max_impact": 10
-    }
+    },
+    {
+        "title_fa": "{company} از {action} {percent}% در بخش {sector} خبر داد",
+        "desc_fa": "{company} در گزارش {period} خود اعلام کرد که {sector} با {outlook} روبرو است.",
+        "choices": {
+            "company": companies,
+            "action": ["رشد", "کاهش", "بهبود", "افت", "جهش"],
+            "period": ["فصلی", "ماهانه", "سالانه", "شش‌ماهه"],
+            "outlook": ["چشم‌انداز مثبت", "چشم‌انداز منفی", "ریسک‌های تازه", "تقاضای رو به رشد", "فشار هزینه‌ها"],
+        },
+        "min_impact": 0.5,
+        "max_impact": 10
+    },
+    {
+        "title_fa": "گزارش {source}: احتمال {action} {percent}% در {sector}",
+        "desc_fa": "{source} با استناد به داده‌های {indicator} پیش‌بینی کرد {sector} در {timeframe} آینده جابه‌جا شود.",
+        "choices": {
+            "source": ["رویترز", "بلومبرگ", "فایننشال تایمز", "وال استریت ژورنال", "CNBC", "مورگان استنلی",
+                       "گلدمن ساکس", "صندوق بین‌المللی پول", "بانک جهانی", "اکونومیست"],
+            "action": ["رشد", "کاهش", "نوسان", "ثبات"],
+            "indicator": ["تورم", "اشتغال", "تولید صنعتی", "خرده‌فروشی", "تراز تجاری", "نرخ بهره",
+                          "شاخص مدیران خرید", "اعتماد مصرف‌کننده"],
+            "timeframe": ["فصل", "ماه", "هفته", "سه‌ماهه"],
+        },
+        "min_impact": 0.5,
+        "max_impact": 10
+    },
+    {
+        "title_fa": "داده‌های {indicator} {region} {sector} را {percent}% جابه‌جا کرد",
+        "desc_fa": "انتشار داده‌های {indicator} در {region} معامله‌گران {sector} را به {reaction} واداشت.",
+        "choices": {
+            "indicator": ["تورم", "اشتغال", "تولید صنعتی", "خرده‌فروشی", "تراز تجاری", "نرخ بهره",
+                          "شاخص مدیران خرید", "اعتماد مصرف‌کننده"],
+            "region": ["آمریکا", "اروپا", "چین", "ژاپن", "انگلستان", "آلمان", "هند", "برزیل"],
+            "reaction": ["خرید", "فروش", "احتیاط", "پوشش ریسک", "جابه‌جایی سبد"],
+        },
+        "min_impact": 0.5,
+        "max_impact": 10
+    },
 ]
 
 major_news_templates = [
@@ -34,110 +94,236 @@ major_news_templates = [
     }
 ]
 
-companies = ["TechCorp", "GlobalBank", "MegaRetail"]
-
-def generate_normal_news():
-    news_list = []
-    for news_id in range(1, 321):
-        template = normal_news_templates[0]
-        category = random.choice(list(categories.keys()))
-        sector = random.choice(categories[category])
-        
-        impact_value = round(random.uniform(template['min_impact'], template['max_impact']), 1)
-        if random.choice([True, False]) and impact_value > 0:
-            impact_value = -impact_value
-        
-        title = template['title_fa'].replace('{action}', random.choice(template['actions']))
-        title = title.replace('{percent}', str(abs(round(impact_value))))
-        title = title.replace('{sector}', sector)
-        
-        desc = template['desc_fa'].replace('{sector}', sector)
-        desc = desc.replace('{timeframe}', random.choice(template['timeframes']))
-        
-        news = {
-            "id": f"n{news_id:03d}",
-            "title": title,
-            "description": desc,
-            "impact": {
-                sector: {
-                    "min": round(impact_value * 0.8, 1),
-                    "max": round(impact_value * 1.2, 1)
-                }
+NEWS_POOL_PATH = '/workspace/data/news/news-pool.json'
+
+# پس از این تعداد تلاش پیاپی تکراری، فضای قالب‌ها تمام شده فرض می‌شود
+MAX_DUPLICATE_ATTEMPTS = 1000
+
+scheduled_events = [
+    {
+        "id": "se001",
+        "title": "انتخابات ریاست جمهوری آمریکا",
+        "description": "انتخابات مهم ریاست جمهوری که می‌تواند سیاست‌های اقتصادی را تغییر دهد.",
+        "triggerDay": 90,
+        "recurrence": {"interval": 1460},
+        "impact": {
+            "USD": {"min": -15, "max": 20},
+            "Stocks_General": {"min": -10, "max": 15}
+        }
+    }
+]
+
+class CompiledTemplate:
+    """قالب متنی که یک بار به تکه‌های ثابت و نام فیلدها شکسته می‌شود"""
+
+    def __init__(self, text: str):
+        self.parts = []
+        for literal, field, _, _ in string.Formatter().parse(text):
+            if literal:
+                self.parts.append((True, literal))
+            if field is not None:
+                self.parts.append((False, field))
+
+    def render(self, values: Dict[str, str]) -> str:
+        return ''.join(text if is_literal else values[text] for is_literal, text in self.parts)
+
+def compile_templates(templates: List[Dict]) -> List[Dict]:
+    compiled = []
+    for template in templates:
+        template = dict(template)
+        template['title'] = CompiledTemplate(template['title_fa'])
+        template['desc'] = CompiledTemplate(template['desc_fa'])
+        compiled.append(template)
+    return compiled
+
+@lru_cache(maxsize=None)
+def compiled_templates(major: bool) -> List[Dict]:
+    """قالب‌های شکسته شده؛ در اولین تولید خبر ساخته می‌شوند نه هنگام import"""
+    return compile_templates(major_news_templates if major else normal_news_templates)
+
+category_names = list(categories.keys())
+
+def random_sector(rng: random.Random) -> str:
+    category = rng.choice(category_names)
+    return rng.choice(categories[category])
+
+def news_key(news: Dict) -> int:
+    # Only a 64-bit digest is kept, so the dedupe set stays small for millions of items;
+    # blake2b (unlike hash()) is stable across processes, so a seeded pool is reproducible
+    impact = ';'.join(f"{sector}:{band['min']}:{band['max']}" for sector, band in news['impact'].items())
+    text = '\x1f'.join((news['title'], news['description'], impact))
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def iter_unique(make_news, count: int, prefix: str, seen: Set[int]) -> Iterator[Dict]:
+    news_id = 0
+    duplicates = 0
+    # Ids are padded to the pool size so string order (e.g. NewsIndex.find) matches generation order
+    width = max(3, len(str(count)))
+    while news_id < count:
+        news = make_news()
+        key = news_key(news)
+        if key in seen:
+            duplicates += 1
+            if duplicates >= MAX_DUPLICATE_ATTEMPTS:
+                raise ValueError(f"فضای قالب‌ها تمام شد: فقط {news_id} از {count} خبر یکتا با پیشوند {prefix} "
+                                 f"ساخته شد؛ تعداد کمتری بخواهید یا قالب‌های بیشتری اضافه کنید")
+            continue
+        seen.add(key)
+        duplicates = 0
+        news_id += 1
+        news_with_id = {"id": f"{prefix}{news_id:0{width}d}"}
+        news_with_id.update(news)
+        yield news_with_id
+
+def make_normal_news(rng: random.Random) -> Dict:
+    template = rng.choice(compiled_templates(False))
+    sector = random_sector(rng)
+
+    impact_value = round(rng.uniform(template['min_impact'], template['max_impact']), 1)
+    if rng.choice([True, False]) and impact_value > 0:
+        impact_value = -impact_value
+
+    values = {field: rng.choice(options) for field, options in template['choices'].items()}
+    values['percent'] = str(abs(round(impact_value)))
+    values['sector'] = sector
+
+    return {
+        "title": template['title'].render(values),
+        "description": template['desc'].render(values),
+        "impact": {
+            sector: {
+                "min": round(impact_value * 0.8, 1),
+                "max": round(impact_value * 1.2, 1)
             }
         }
-        
-        news_list.append(news)
-    
-    return news_list
-
-def generate_major_news():
-    news_list = []
-    for news_id in range(1, 161):
-        template = major_news_templates[0]
-        impact_value = round(random.uniform(template['min_impact'], template['max_impact']), 1)
-        if random.choice([True, False]):
-            impact_value = -abs(impact_value)
+    }
+
+def make_major_news(rng: random.Random) -> Dict:
+    template = compiled_templates(True)[0]
+    impact_value = round(rng.uniform(template['min_impact'], template['max_impact']), 1)
+    if rng.choice([True, False]):
+        impact_value = -abs(impact_value)
+    else:
+        impact_value = abs(impact_value)
+
+    title = template['title'].render({
+        'event': rng.choice(template['events']),
+        'location': rng.choice(template['locations']),
+    })
+
+    # dict حفظ ترتیب و حذف تکراری را با هم انجام می‌دهد
+    affected_sectors = dict.fromkeys(random_sector(rng) for _ in range(rng.randint(2, 5)))
+
+    news = {
+        "title": title,
+        "description": template['desc_fa'],
+        "severity": "major",
+        "impact": {}
+    }
+
+    for idx, sector in enumerate(affected_sectors):
+        if idx == 0:
+            news["impact"][sector] = {
+                "min": round(impact_value * 0.9, 1),
+                "max": round(impact_value * 1.1, 1)
+            }
         else:
-            impact_value = abs(impact_value)
-        
-        title = template['title_fa'].replace('{event}', random.choice(template['events']))
-        title = title.replace('{location}', random.choice(template['locations']))
-        
-        affected_sectors = []
-        for _ in range(random.randint(2, 5)):
-            category = random.choice(list(categories.keys()))
-            sector = random.choice(categories[category])
-            if sector not in affected_sectors:
-                affected_sectors.append(sector)
-        
-        news = {
-            "id": f"m{news_id:03d}",
-            "title": title,
-            "description": template['desc_fa'],
-            "severity": "major",
-            "impact": {}
-        }
-        
-        for idx, sector in enumerate(affected_sectors):
-            if idx == 0:
-                news["impact"][sector] = {
-                    "min": round(impact_value * 0.9, 1),
-                    "max": round(impact_value * 1.1, 1)
-                }
-            else:
-                secondary_impact = impact_value * random.uniform(0.3, 0.7)
-                news["impact"][sector] = {
-                    "min": round(secondary_impact * 0.9, 1),
-                    "max": round(secondary_impact * 1.1, 1)
-                }
-        
-        news_list.append(news)
-    
-    return news_list
-
-normal_news = generate_normal_news()
-major_news = generate_major_news()
-
-news_pool = {
-    "normalNews": normal_news,
-    "majorNews": major_news,
-    "scheduledEvents": [
-        {
-            "id": "se001",
-            "title": "انتخابات ریاست جمهوری آمریکا",
-            "description": "انتخابات مهم ریاست جمهوری که می‌تواند سیاست‌های اقتصادی را تغییر دهد.",
-            "triggerDay": 90,
-            "impact": {
-                "USD": {"min": -15, "max": 20},
-                "Stocks_General": {"min": -10, "max": 15}
+            secondary_impact = impact_value * rng.uniform(0.3, 0.7)
+            news["impact"][sector] = {
+                "min": round(secondary_impact * 0.9, 1),
+                "max": round(secondary_impact * 1.1, 1)
             }
-        }
-    ]
-}
 
-with open('/workspace/data/news/news-pool.json', 'w', encoding='utf-8') as f:
-    json.dump(news_pool, f, ensure_ascii=False, indent=2)
+    return news
+
+def iter_normal_news(count: int = 320, rng: Optional[random.Random] = None,
+                     seen: Optional[Set[int]] = None) -> Iterator[Dict]:
+    rng = rng or random.Random()
+    return iter_unique(lambda: make_normal_news(rng), count, 'n', set() if seen is None else seen)
+
+def iter_major_news(count: int = 160, rng: Optional[random.Random] = None,
+                    seen: Optional[Set[int]] = None) -> Iterator[Dict]:
+    rng = rng or random.Random()
+    return iter_unique(lambda: make_major_news(rng), count, 'm', set() if seen is None else seen)
+
+def generate_normal_news(count: int = 320, rng: Optional[random.Random] = None) -> List[Dict]:
+    return list(iter_normal_news(count, rng))
+
+def generate_major_news(count: int = 160, rng: Optional[random.Random] = None) -> List[Dict]:
+    return list(iter_major_news(count, rng))
+
+def write_news_pool_json(f, sections: Dict[str, Iterator[Dict]], metadata: Optional[Dict] = None) -> Dict[str, int]:
+    """نوشتن جریانی news-pool.json با همان قالب json.dump(indent=2)، بدون ساختن دیکشنری کامل"""
+    counts = {}
+    f.write(b'{')
+    for section_index, (section, items) in enumerate(sections.items()):
+        f.write(((',' if section_index else '') + f'\n  "{section}": [').encode('utf-8'))
+        counts[section] = 0
+        for item in items:
+            text = dumps(item).replace('\n', '\n    ')
+            f.write(((',' if counts[section] else '') + '\n    ' + text).encode('utf-8'))
+            counts[section] += 1
+        f.write(b'\n  ]' if counts[section] else b']')
+    if metadata is not None:
+        text = dumps(metadata).replace('\n', '\n  ')
+        f.write(((',' if sections else '') + '\n  "metadata": ' + text).encode('utf-8'))
+    f.write(b'\n}' if sections or metadata is not None else b'}')
+    return counts
+
+def write_news_pool_jsonl(f, sections: Dict[str, Iterator[Dict]], metadata: Optional[Dict] = None) -> Dict[str, int]:
+    """نوشتن هر خبر در یک خط JSON همراه با نام بخش آن"""
+    counts = {}
+    if metadata is not None:
+        f.write((dumps({"section": "metadata", "item": metadata}, None) + '\n').encode('utf-8'))
+    for section, items in sections.items():
+        counts[section] = 0
+        for item in items:
+            f.write((dumps({"section": section, "item": item}, None) + '\n').encode('utf-8'))
+            counts[section] += 1
+    return counts
+
+def generate_news_pool(output_path: str = NEWS_POOL_PATH, normal_count: int = 320, major_count: int = 160,
+                       output_format: str = 'json', seed: Optional[int] = None,
+                       write_index: bool = True) -> Dict[str, int]:
+    """تولید و نوشتن جریانی مخزن اخبار؛ تعداد خبرهای هر بخش و بذر تصادفی اجرا را برمی‌گرداند
+
+    هر بخش جریان تصادفی جداگانه دارد و بذر در metadata فایل ثبت می‌شود.
+    با write_index نمایه معکوس (news_index) هم کنار فایل خروجی ذخیره می‌شود.
+    """
+    rngs = RNGService(seed)
+    seen = set()
+    index = NewsIndexBuilder(categories)
+    events_rng = rngs.python_random('scheduledEvents')
+    sections = {
+        "normalNews": index.track(iter_normal_news(normal_count, rngs.python_random('normalNews'), seen)),
+        "majorNews": index.track(iter_major_news(major_count, rngs.python_random('majorNews'), seen)),
+        "scheduledEvents": iter(scheduled_events + generate_scheduled_events(events_rng, len(scheduled_events) + 1)),
+    }
+    writer = write_news_pool_jsonl if output_format == 'jsonl' else write_news_pool_json
+    with AtomicWriter(output_path) as f:
+        counts = writer(f, sections, rngs.metadata())
+    if write_index:
+        index.save(index_path(output_path), compact=output_format == 'jsonl')
+    counts['seed'] = rngs.seed
+    return counts
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="تولید مخزن اخبار بازار")
+    parser.add_argument('--output', default=NEWS_POOL_PATH, help="مسیر فایل خروجی")
+    parser.add_argument('--normal', type=int, default=320, help="تعداد خبرهای معمولی (قالب‌ها چند میلیون خبر یکتا می‌سازند)")
+    parser.add_argument('--major', type=int, default=160, help="تعداد خبرهای مهم")
+    parser.add_argument('--format', choices=['json', 'jsonl'], default='json', help="قالب خروجی")
+    parser.add_argument('--no-index', action='store_true', help="عدم ساخت نمایه معکوس اخبار")
+    parser.add_argument('--seed', type=int, default=None, help="بذر تصادفی برای خروجی تکرارپذیر")
+    args = parser.parse_args(argv)
+
+    counts = generate_news_pool(args.output, args.normal, args.major, args.format, args.seed,
+                                write_index=not args.no_index)
+
+    print(f"✅ تولید {counts['normalNews']} خبر معمولی")
+    print(f"✅ تولید {counts['majorNews']} خبر مهم")
+    print(f"✅ مجموع: {counts['normalNews'] + counts['majorNews']} خبر")
+    print(f"بذر تصادفی این اجرا: {counts['seed']}")
 
-print(f"✅ تولید {len(normal_news)} خبر معمولی")
-print(f"✅ تولید {len(major_news)} خبر مهم")
-print(f"✅ مجموع: {len(normal_news) + len(major_news)} خبر")
+if __name__ == "__main__":
+    main()
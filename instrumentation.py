@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+اندازه‌گیری سبک مراحل اصلی (بارگذاری، محاسبه، سریال‌سازی، نوشتن)، شمارنده‌ها و پروفایل اختیاری
+cProfile/tracemalloc؛ خروجی به صورت JSON lines برای تحلیل ماشینی
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, IO, Iterator, Optional, Tuple
+
+# The profilers are imported only when --profile is used
+if TYPE_CHECKING:
+    import cProfile
+    import tracemalloc
+
+PROFILE_MODES = ('cpu', 'memory')
+PROFILE_TOP = 25  # تعداد تابع/خط پرهزینه‌ای که در خروجی پروفایل ثبت می‌شود
+
+CounterKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _Stage:
+    """زمان‌سنج یک مرحله؛ وقتی Metrics غیرفعال است فقط دو فراخوانی perf_counter هزینه دارد"""
+
+    __slots__ = ('metrics', 'name', 'labels', 'start', 'seconds')
+
+    def __init__(self, metrics: 'Metrics', name: str, labels: Dict[str, str]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.seconds = 0.0
+
+    def __enter__(self) -> '_Stage':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.seconds = time.perf_counter() - self.start
+        self.metrics.record_stage(self.name, self.seconds, failed=exc_type is not None, **self.labels)
+
+
+class Metrics:
+    """گردآورنده زمان مراحل و شمارنده‌ها؛ هر رکورد یک خط JSON در sink است
+
+    شمارنده‌ها در حافظه جمع و هنگام close یک‌جا نوشته می‌شوند تا حلقه‌های داغ هزینه I/O نداشته باشند.
+    بدون sink همه متدها تقریباً بی‌هزینه‌اند.
+    """
+
+    def __init__(self, sink: Optional[IO[str]] = None, **context: str):
+        self.sink = sink
+        self.enabled = sink is not None
+        self.context = dict(context, run=context.get('run') or uuid.uuid4().hex[:12]) if self.enabled else {}
+        self.counters: Dict[CounterKey, float] = {}
+        self.stage_totals: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def emit(self, record: Dict) -> None:
+        if not self.enabled:
+            return
+        line = json.dumps(dict(self.context, ts=round(time.time(), 6), **record), ensure_ascii=False,
+                          separators=(',', ':'), default=str)
+        with self._lock:
+            self.sink.write(line + '\n')
+
+    def stage(self, name: str, **labels: str) -> _Stage:
+        """with metrics.stage('parse', asset_class='stocks'): ..."""
+        return _Stage(self, name, labels)
+
+    def record_stage(self, name: str, seconds: float, failed: bool = False, **labels: str) -> None:
+        """ثبت زمان مرحله‌ای که جای دیگر اندازه‌گیری شده (مثلاً در پردازه worker)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.stage_totals[name] = self.stage_totals.get(name, 0.0) + seconds
+        record = {'type': 'stage', 'stage': name, 'seconds': round(seconds, 6), **labels}
+        if failed:
+            record['failed'] = True
+        self.emit(record)
+
+    def count(self, name: str, value: float = 1, **labels: str) -> None:
+        if not self.enabled or not value:
+            return
+        key = (name, tuple(sorted((label, str(label_value)) for label, label_value in labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def close(self) -> None:
+        """نوشتن شمارنده‌ها و خلاصه زمان مراحل"""
+        if not self.enabled:
+            return
+        for (name, labels), value in sorted(self.counters.items()):
+            self.emit({'type': 'counter', 'counter': name, 'value': value, **dict(labels)})
+        self.emit({'type': 'summary', 'wall_seconds': round(time.perf_counter() - self._started, 6),
+                   'stages': {name: round(seconds, 6) for name, seconds in sorted(self.stage_totals.items())}})
+        self.sink.flush()
+
+
+_active = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """گردآورنده فعال این پردازه (پیش‌فرض غیرفعال)"""
+    return _active
+
+
+def stage(name: str, **labels: str) -> _Stage:
+    return _active.stage(name, **labels)
+
+
+def record_stage(name: str, seconds: float, **labels: str) -> None:
+    _active.record_stage(name, seconds, **labels)
+
+
+def count(name: str, value: float = 1, **labels: str) -> None:
+    _active.count(name, value, **labels)
+
+
+def _profile_records(profiler: 'cProfile.Profile', top: int) -> Iterator[Dict]:
+    import pstats
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]  # by own time
+    for (filename, line, function), (_, calls, own, cumulative, _) in rows:
+        yield {'type': 'profile', 'function': f"{os.path.basename(filename)}:{line}({function})",
+               'calls': calls, 'own_seconds': round(own, 6), 'cumulative_seconds': round(cumulative, 6)}
+
+
+def _memory_records(snapshot: 'tracemalloc.Snapshot', peak: int, top: int) -> Iterator[Dict]:
+    yield {'type': 'memory', 'peak_bytes': peak}
+    for statistic in snapshot.statistics('lineno')[:top]:
+        frame = statistic.traceback[0]
+        yield {'type': 'allocation', 'location': f"{os.path.basename(frame.filename)}:{frame.lineno}",
+               'bytes': statistic.size, 'blocks': statistic.count}
+
+
+@contextmanager
+def profiling(mode: Optional[str], metrics: Metrics, output: Optional[str] = None,
+              top: int = PROFILE_TOP) -> Iterator[None]:
+    """اجرای بدنه زیر cProfile (cpu) یا tracemalloc (memory) و ثبت پرهزینه‌ترین‌ها در metrics
+
+    با output آمار کامل cProfile هم در فایل .prof برای snakeviz/pstats ذخیره می‌شود.
+    """
+    if mode is None:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"حالت پروفایل ناشناخته {mode}؛ گزینه‌ها: {', '.join(PROFILE_MODES)}")
+
+    if mode == 'cpu':
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            if output:
+                profiler.dump_stats(output)
+            for record in _profile_records(profiler, top):
+                metrics.emit(record)
+        return
+
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        for record in _memory_records(snapshot, peak, top):
+            metrics.emit(record)
+
+
+@contextmanager
+def instrumented(metrics_path: Optional[str] = None, profile: Optional[str] = None,
+                 **context: str) -> Iterator[Metrics]:
+    """فعال کردن اندازه‌گیری برای یک اجرای خط فرمان
+
+    metrics_path برابر '-' (و پروفایل بدون metrics_path) یعنی stderr تا JSON lines با پیام‌های پیشرفت
+    stdout قاطی نشود؛ در غیر این صورت رکوردها به انتهای فایل اضافه می‌شوند.
+    """
+    global _active
+    if metrics_path is None and profile is None:
+        yield _active
+        return
+
+    if metrics_path in (None, '-'):
+        sink, owned = sys.stderr, False
+    else:
+        sink, owned = open(metrics_path, 'a', encoding='utf-8'), True
+    previous = _active
+    _active = Metrics(sink, **context)
+    profile_output = f"{os.path.splitext(metrics_path)[0]}.prof" if owned and profile == 'cpu' else None
+    try:
+        with profiling(profile, _active, profile_output):
+            yield _active
+    finally:
+        _active.close()
+        _active = previous
+        if owned:
+            sink.close()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+ورودی/خروجی JSON فایل‌های بازار: بارگذاری/ذخیره، نوشتن اتمی و پردازش جریانی دارایی به دارایی
+"""
+
+import filecmp
+import json
+import os
+import re
+import tempfile
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional faster backend
+    orjson = None
+
+READ_CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def _orjson_compatible(value: Any) -> bool:
+    """آیا خروجی orjson با json یکسان است؛ این دو فقط در اعداد اعشاری نمایی و NaN/Infinity فرق دارند"""
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, float):
+            # json writes 1e-05 / 1e+16 where orjson writes 0.00001 / 1e16, and orjson turns NaN into null;
+            # NaN fails both comparisons and inf the upper bound
+            if item and not 1e-4 <= abs(item) < 1e16:
+                return False
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return True
+
+
+def dumps(value: Any, indent: Optional[int] = 2) -> str:
+    """تبدیل به JSON با همان قالب json.dump(ensure_ascii=False)
+
+    orjson (در صورت نصب بودن) فقط وقتی به کار می‌رود که خروجی‌اش بایت به بایت با json یکسان باشد.
+    """
+    if orjson is not None and indent in (None, 2) and _orjson_compatible(value):
+        try:
+            return orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent else 0).decode('utf-8')
+        except TypeError:
+            pass  # values orjson does not handle (e.g. >64-bit ints) fall back to the stdlib
+    if indent is None:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(value, ensure_ascii=False, indent=indent)
+
+
+def loads(raw: bytes) -> Any:
+    """پارس JSON؛ در صورت نصب بودن از orjson استفاده می‌شود"""
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass  # NaN/Infinity written by json are rejected by orjson; the stdlib reports real errors
+    return json.loads(raw)
+
+
+def load_json_file(filepath: str) -> Dict:
+    """بارگذاری فایل JSON"""
+    try:
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        print(f"فایل {filepath} پیدا نشد")
+        return {}
+    return loads(raw)
+
+
+def save_json_file(data: Dict, filepath: str, compact: bool = False) -> None:
+    """ذخیره فایل JSON"""
+    write_file_atomic(dumps(data, None if compact else 2).encode('utf-8'), filepath)
+
+
+def _target_mode(filepath: str) -> int:
+    try:
+        return os.stat(filepath).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+class AtomicWriter:
+    """فایل موقت در همان پوشه برای نوشتن؛ در پایان با fsync و rename جایگزین فایل اصلی می‌شود
+
+    با skip_if_unchanged اگر خروجی بایت به بایت با فایل موجود یکسان باشد، فایل دست نمی‌خورد
+    و replaced برابر False می‌ماند.
+    """
+
+    def __init__(self, filepath: str, skip_if_unchanged: bool = False):
+        self.filepath = filepath
+        self.skip_if_unchanged = skip_if_unchanged
+        self.replaced = False
+        self._file = None
+        self._temp_path = None
+
+    def __enter__(self):
+        directory = os.path.dirname(os.path.abspath(self.filepath))
+        mode = _target_mode(self.filepath)
+        fd, self._temp_path = tempfile.mkstemp(prefix='.' + os.path.basename(self.filepath) + '.',
+                                               suffix='.tmp', dir=directory)
+        try:
+            os.fchmod(fd, mode)
+            self._file = os.fdopen(fd, 'wb')
+        except BaseException:
+            os.close(fd)
+            os.unlink(self._temp_path)
+            raise
+        return self._file
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        try:
+            if exc_type is None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._file.close()
+            if exc_type is not None:
+                return
+            if (self.skip_if_unchanged and os.path.exists(self.filepath)
+                    and filecmp.cmp(self._temp_path, self.filepath, shallow=False)):
+                return
+            os.replace(self._temp_path, self.filepath)
+            self.replaced = True
+        finally:
+            if os.path.exists(self._temp_path):
+                os.unlink(self._temp_path)
+
+
+def write_file_atomic(payload: bytes, filepath: str) -> None:
+    """نوشتن اتمی فایل: نوشتن در فایل موقت همان پوشه و سپس جایگزینی با rename"""
+    with AtomicWriter(filepath) as f:
+        f.write(payload)
+
+
+class MarketJSONReader:
+    """خواندن جریانی فایل بازار ({root_key: {دسته: {نماد: داده}}, ...}) بدون بارگذاری کل سند
+
+    هر رویداد یک چهارتایی (kind, name, symbol, value) است:
+    ('key', کلید سطح اول, None, مقدار) برای کلیدهای دیگر و root_key ای که مقدارش شیء نیست،
+    ('root', root_key, None, None) در شروع شیء root_key (حتی اگر خالی باشد)،
+    ('category', دسته, None, None) در شروع هر دسته و ('record', دسته, نماد, داده) برای هر دارایی.
+    """
+
+    def __init__(self, f, root_key: str, chunk_size: int = READ_CHUNK_SIZE):
+        self.f = f
+        self.root_key = root_key
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos > len(self.buffer) // 2:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += chunk
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("پایان غیرمنتظره فایل JSON")
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"انتظار '{char}' در موقعیت {self.pos} بود")
+        self.pos += 1
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number touching the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _members(self) -> Iterator[str]:
+        """پیمایش کلیدهای یک شیء؛ مقدار هر کلید باید پیش از ادامه پیمایش مصرف شود"""
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            yield key
+            if self._peek() == ',':
+                self.pos += 1
+                continue
+            self._expect('}')
+            return
+
+    def __iter__(self) -> Iterator[Tuple[str, str, Optional[str], Any]]:
+        for key in self._members():
+            # A root_key whose value is not an object passes through like any other key
+            if key != self.root_key or self._peek() != '{':
+                yield 'key', key, None, self._value()
+                continue
+            yield 'root', key, None, None  # emitted even for an empty root so writers keep the key
+            for category in self._members():
+                yield 'category', category, None, None
+                for symbol in self._members():
+                    yield 'record', category, symbol, self._value()
+
+
+class MarketJSONWriter:
+    """نوشتن جریانی فایل بازار با همان قالب json.dump(indent=2) یا قالب فشرده (indent=None)"""
+
+    def __init__(self, f, root_key: str, indent: Optional[int] = 2):
+        self.f = f
+        self.root_key = root_key
+        self.indent = indent
+        self.key_separator = ': ' if indent else ':'
+        self.depth_open = [False]  # whether the object at each open depth already has members
+        self.category = None
+        self.in_root = False
+        self.closed = False
+
+    def _write(self, text: str) -> None:
+        self.f.write(text.encode('utf-8'))
+
+    def _newline(self, depth: int) -> str:
+        return '\n' + ' ' * (self.indent * depth) if self.indent else ''
+
+    def _open_member(self, key: str) -> None:
+        """نوشتن جداکننده و کلید عضو جدید در عمیق‌ترین شیء باز"""
+        depth = len(self.depth_open)
+        if not self.depth_open[-1]:
+            self._write('{')
+            self.depth_open[-1] = True
+        else:
+            self._write(',')
+        self._write(self._newline(depth) + json.dumps(key, ensure_ascii=False) + self.key_separator)
+
+    def _close_object(self) -> None:
+        has_members = self.depth_open.pop()
+        if has_members:
+            self._write(self._newline(len(self.depth_open)) + '}')
+        else:
+            self._write('{}')
+
+    def _indent_value(self, value: Any, depth: int) -> str:
+        text = dumps(value, self.indent)
+        if self.indent and '\n' in text:
+            text = text.replace('\n', '\n' + ' ' * (self.indent * depth))
+        return text
+
+    def _leave_root(self) -> None:
+        if self.category is not None:
+            self._close_object()
+            self.category = None
+        if self.in_root:
+            self._close_object()
+            self.in_root = False
+
+    def write_key(self, key: str, value: Any) -> None:
+        """نوشتن یک کلید سطح اول غیر از root_key"""
+        self._leave_root()
+        self._open_member(key)
+        self._write(self._indent_value(value, 1))
+
+    def write_root(self) -> None:
+        """باز کردن شیء root_key (ریشه خالی هم به صورت {} نوشته می‌شود)"""
+        if not self.in_root:
+            self._open_member(self.root_key)
+            self.depth_open.append(False)
+            self.in_root = True
+
+    def write_category(self, category: str) -> None:
+        """شروع یک دسته (دسته‌های خالی هم حفظ می‌شوند)"""
+        self.write_root()
+        if self.category == category:
+            return
+        if self.category is not None:
+            self._close_object()
+        self._open_member(category)
+        self.depth_open.append(False)
+        self.category = category
+
+    def write_record(self, category: str, symbol: str, record: Any) -> None:
+        """نوشتن داده یک دارایی"""
+        self.write_category(category)
+        self._open_member(symbol)
+        self._write(self._indent_value(record, 3))
+
+    def close(self) -> None:
+        """بستن تمام اشیای باز"""
+        if self.closed:
+            return
+        self._leave_root()
+        self._close_object()
+        self.closed = True
+
+
+def stream_update_market_file(src_path: str, dst_path: str, root_key: str,
+                              update_record: Callable[[str, str, Dict], Dict],
+                              categories: Optional[Iterable[str]] = None,
+                              indent: Optional[int] = 2) -> bool:
+    """به‌روزرسانی جریانی یک فایل بازار: هر دارایی خوانده، به‌روز و بلافاصله نوشته می‌شود
+
+    فقط دسته‌های categories (یا همه در صورت None) به update_record داده می‌شوند.
+    اگر خروجی با فایل مقصد یکسان باشد فایل بازنویسی نمی‌شود؛ مقدار بازگشتی نشان می‌دهد نوشته شد یا نه.
+    """
+    categories = set(categories) if categories is not None else None
+    output = AtomicWriter(dst_path, skip_if_unchanged=True)
+    with open(src_path, 'r', encoding='utf-8') as source, output as target:
+        writer = MarketJSONWriter(target, root_key, indent)
+        for kind, name, symbol, value in MarketJSONReader(source, root_key):
+            if kind == 'key':
+                writer.write_key(name, value)
+            elif kind == 'root':
+                writer.write_root()
+            elif kind == 'category':
+                writer.write_category(name)
+            else:
+                if categories is None or name in categories:
+                    value = update_record(name, symbol, value)
+                writer.write_record(name, symbol, value)
+        writer.close()
+    return output.replaced
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+خط فرمان واحد ابزارهای بازار: python -m market_cli <فرمان> [گزینه‌ها]
+
+هر فرمان فقط ماژول خودش را بارگذاری می‌کند؛ وابستگی‌های سنگین (NumPy، yfinance) در همان
+مسیری وارد می‌شوند که به آنها نیاز دارد، پس --help و فرمان‌های سبک سریع بالا می‌آیند.
+"""
+
+import argparse
+import importlib
+import sys
+from typing import Dict, List, Tuple
+
+# فرمان ← (ماژول دارای main(argv)، توضیح)
+COMMANDS: Dict[str, Tuple[str, str]] = {
+    'volatility': ('calculate_volatility', "شبیه‌سازی و بروزرسانی نوسانات همه دارایی‌ها"),
+    'real-volatility': ('real_volatility_calculator', "نوسانات بر اساس داده‌های تاریخی"),
+    'news-pool': ('generate_news_pool', "تولید مخزن اخبار بازار"),
+    'news-impact': ('news_impact', "اعمال اثر اخبار روزانه روی قیمت‌ها"),
+    'daemon': ('volatility_daemon', "سرویس مقیم نوسان روی HTTP محلی"),
+    'snapshots': ('snapshot_store', "تاریخچه فشرده وضعیت بازار و بازسازی هر روز بازی"),
+    'benchmark': ('benchmark', "سنجش کارایی مراحل"),
+}
+
+PROG = 'market_cli'
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog=PROG, description="ابزارهای خط فرمان شبیه‌ساز بازار")
+    commands = parser.add_subparsers(dest='command', metavar='<فرمان>', required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        # add_help=False: --help is forwarded to the command's own parser
+        commands.add_parser(name, help=help_text, add_help=False)
+    return parser
+
+
+def main(argv: List[str] = None):
+    """اجرای main فرمان انتخاب شده با بقیه آرگومان‌ها"""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = build_parser().parse_args(argv[:1])
+    module = importlib.import_module(COMMANDS[args.command][0])
+    # The command's argparse derives its usage line from argv[0]
+    sys.argv[0] = f"{PROG} {args.command}"
+    return module.main(argv[1:])
@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+"""
+نقطه ورود python -m market_cli
+"""
+
+from market_cli import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+اعمال اثر اخبار و رویدادهای هر روز روی قیمت تمام دارایی‌ها با یک ضرب ماتریس پراکنده بخش × دارایی
+"""
+
+import argparse
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from calculate_volatility import ASSET_FILES, DATA_DIR, iter_asset_records, load_market_files, write_changed_files
+from generate_news_pool import NEWS_POOL_PATH, categories as NEWS_CATEGORIES
+from news_sampler import NewsSampler
+from rng_streams import RNGService
+from scheduled_events import EventTimeline
+
+# کلاس دارایی متناظر با هر گروه جدول categories اخبار (ارزها دارایی مستقیم در بازار ندارند)
+NEWS_ASSET_CLASSES = {
+    'stocks': 'stocks',
+    'commodities': 'commodities',
+    'crypto': 'cryptocurrencies',
+    'indices': 'indices',
+    'currencies': None,
+}
+
+# دسته‌های دارایی (در کلاس متناظر گروه خبر) که هر بخش روی آنها اثر دارد، با وزن اثر
+SECTOR_CATEGORIES = {
+    'Tech_Stocks': {'technology': 1.0},
+    'Pharma_Stocks': {'healthcare': 1.0},
+    'Auto_Stocks': {'industrial': 1.0},
+    'Retail_Stocks': {'retail': 1.0},
+    'Banking_Stocks': {'banking': 1.0},
+    'Energy_Stocks': {'energy': 1.0},
+    'Airline_Stocks': {'industrial': 0.5},
+    'Mining_Stocks': {'industrial': 0.5},
+    'Real_Estate_Stocks': {'banking': 0.5},
+    'Gold': {'precious_metals': 1.0},
+    'Silver': {'precious_metals': 1.0},
+    'Platinum': {'precious_metals': 1.0},
+    'Palladium': {'precious_metals': 1.0},
+    'Oil': {'energy': 1.0},
+    'Natural_Gas': {'energy': 1.0},
+    'Copper': {'industrial_metals': 1.0},
+    'Wheat': {'agricultural': 1.0},
+    'Corn': {'agricultural': 1.0},
+    'Coffee': {'agricultural': 1.0},
+    'Sugar': {'agricultural': 1.0},
+    'Cocoa': {'agricultural': 1.0},
+    'Cotton': {'agricultural': 1.0},
+    'Bitcoin': {'top_tier': 1.0},
+    'Ethereum': {'top_tier': 1.0, 'defi_layer2': 0.5},
+    'Crypto_General': {'top_tier': 1.0, 'defi_layer2': 1.0},
+    'SP500': {'american': 1.0},
+    'NASDAQ': {'american': 1.0},
+    'DOW': {'american': 1.0},
+    'FTSE': {'european': 1.0},
+    'DAX': {'european': 1.0},
+    'NIKKEI': {'asian': 1.0},
+}
+
+# بخش‌هایی که بیرون از کلاس گروه خود (یا بیرون از جدول categories) اثر دارند: (کلاس، دسته یا None برای همه، وزن)
+CROSS_SECTOR_EXPOSURES = {
+    'Stocks_General': [('stocks', None, 1.0)],
+    'USD': [('commodities', 'precious_metals', -0.5)],
+    'EUR': [('indices', 'european', 0.3)],
+    'GBP': [('indices', 'european', 0.3)],
+    'JPY': [('indices', 'asian', -0.3)],
+}
+
+# نمادهای اصلی هر بخش؛ اگر در دسته پیدا شوند وزن کامل می‌گیرند و بقیه دسته SYMBOL_SPILLOVER برابر آن
+SECTOR_SYMBOLS = {
+    'Bitcoin': ('BTC', 'BTC-USD'),
+    'Ethereum': ('ETH', 'ETH-USD'),
+    'Gold': ('GC=F', 'XAU', 'GOLD'),
+    'Silver': ('SI=F', 'XAG', 'SILVER'),
+    'Platinum': ('PL=F', 'XPT'),
+    'Palladium': ('PA=F', 'XPD'),
+    'Oil': ('CL=F', 'BZ=F', 'WTI', 'BRENT'),
+    'Natural_Gas': ('NG=F',),
+    'Copper': ('HG=F',),
+    'Wheat': ('ZW=F',),
+    'Corn': ('ZC=F',),
+    'Coffee': ('KC=F',),
+    'Sugar': ('SB=F',),
+    'Cocoa': ('CC=F',),
+    'Cotton': ('CT=F',),
+    'SP500': ('^GSPC', 'SPX', 'SP500'),
+    'NASDAQ': ('^IXIC', 'NDX', 'NASDAQ'),
+    'DOW': ('^DJI', 'DJI', 'DOW'),
+    'FTSE': ('^FTSE', 'FTSE'),
+    'DAX': ('^GDAXI', 'DAX'),
+    'NIKKEI': ('^N225', 'N225', 'NIKKEI'),
+}
+SYMBOL_SPILLOVER = 0.3
+
+# اثر منفی‌تر از این درصد قیمت را صفر یا منفی می‌کرد
+MIN_IMPACT_PCT = -99.0
+PRICE_DECIMALS = 6
+
+AssetRef = Tuple[str, str, str, Dict]  # (asset_class, category, symbol, asset_data)
+
+
+class ExposureMatrix:
+    """ماتریس پراکنده CSR (بخش × دارایی) فقط با NumPy
+
+    transpose_matvec حاصل E^T · v را با یک np.bincount روی درایه‌های غیرصفر حساب می‌کند.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, n_assets: int):
+        self.indptr = np.asarray(indptr, dtype=np.intp)
+        self.indices = np.asarray(indices, dtype=np.intp)
+        self.data = np.asarray(data, dtype=np.float64)
+        self.n_assets = n_assets
+        # Row id of every stored entry, so the matvec needs no Python loop over rows
+        self._rows = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict[int, float]], n_assets: int) -> 'ExposureMatrix':
+        indptr = np.zeros(len(rows) + 1, dtype=np.intp)
+        indptr[1:] = np.cumsum([len(row) for row in rows])
+        indices = np.fromiter((column for row in rows for column in sorted(row)), dtype=np.intp,
+                              count=int(indptr[-1]))
+        data = np.fromiter((row[column] for row in rows for column in sorted(row)), dtype=np.float64,
+                           count=int(indptr[-1]))
+        return cls(indptr, indices, data, n_assets)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.indptr) - 1, self.n_assets
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def transpose_matvec(self, sector_values: np.ndarray) -> np.ndarray:
+        """بردار دارایی‌ها = مجموع وزنی مقدار بخش‌هایی که روی هر دارایی اثر دارند"""
+        return np.bincount(self.indices, weights=self.data * sector_values[self._rows], minlength=self.n_assets)
+
+
+def _sector_rows(assets: Sequence[AssetRef], sectors: Sequence[str]) -> List[Dict[int, float]]:
+    """ستون‌ها و وزن‌های هر بخش از روی جدول categories و دسته دارایی‌ها"""
+    by_category: Dict[Tuple[str, Optional[str]], List[int]] = {}
+    by_symbol: Dict[Tuple[str, str, str], int] = {}
+    for column, (asset_class, category, symbol, _) in enumerate(assets):
+        by_category.setdefault((asset_class, category), []).append(column)
+        by_category.setdefault((asset_class, None), []).append(column)
+        by_symbol[(asset_class, category, symbol.upper())] = column
+
+    sector_class = {
+        sector: NEWS_ASSET_CLASSES.get(group)
+        for group, group_sectors in NEWS_CATEGORIES.items()
+        for sector in group_sectors
+    }
+
+    rows = []
+    for sector in sectors:
+        targets = list(CROSS_SECTOR_EXPOSURES.get(sector, []))
+        if sector_class.get(sector) is not None:
+            targets += [(sector_class[sector], category, weight)
+                        for category, weight in SECTOR_CATEGORIES.get(sector, {}).items()]
+
+        row: Dict[int, float] = {}
+        for asset_class, category, weight in targets:
+            columns = by_category.get((asset_class, category), [])
+            symbols = {by_symbol[(asset_class, category, name)] for name in SECTOR_SYMBOLS.get(sector, ())
+                       if (asset_class, category, name) in by_symbol}
+            for column in columns:
+                # A sector with a headline instrument moves it fully and its peers partially
+                scale = 1.0 if not symbols or column in symbols else SYMBOL_SPILLOVER
+                row[column] = row.get(column, 0.0) + weight * scale
+        rows.append(row)
+    return rows
+
+
+class NewsImpactEngine:
+    """قیمت تمام دارایی‌ها در یک آرایه و ماتریس اثر بخش‌ها که یک بار ساخته می‌شود
+
+    در هر تیک، دامنه اثر همه رویدادهای رخ داده یکجا نمونه‌گیری، در فضای لگاریتمی بر حسب بخش
+    جمع و با یک ضرب ماتریس پراکنده روی قیمت‌ها اعمال می‌شود.
+    """
+
+    def __init__(self, market: Dict[str, Dict], sectors: Iterable[str] = None):
+        self.market = market
+        self.assets: List[AssetRef] = [
+            (key, category, str(asset_data.get('symbol', symbol)), asset_data)
+            for key in market
+            for category, symbol, asset_data in iter_asset_records(market[key]['data'], key)
+        ]
+        prices = [asset_data.get('price', 0) for _, _, _, asset_data in self.assets]
+        self.prices = np.array([price if isinstance(price, (int, float)) else math.nan for price in prices],
+                               dtype=np.float64)
+        # Assets with price 0 / "N/A" are skipped, as in the volatility scripts
+        self.active = np.isfinite(self.prices) & (self.prices > 0)
+
+        if sectors is None:
+            sectors = list(dict.fromkeys(
+                [sector for group in NEWS_CATEGORIES.values() for sector in group] + list(CROSS_SECTOR_EXPOSURES)
+            ))
+        self.sectors = list(sectors)
+        self.sector_ids = {sector: row for row, sector in enumerate(self.sectors)}
+        self.exposure = ExposureMatrix.from_rows(_sector_rows(self.assets, self.sectors), len(self.assets))
+        self.unmapped: Set[str] = set()
+        self._compiled: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def from_data_dir(cls, data_dir: str = DATA_DIR, keys: List[str] = None, **kwargs) -> 'NewsImpactEngine':
+        return cls(load_market_files(keys or list(ASSET_FILES), data_dir), **kwargs)
+
+    def _compile(self, event: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(شناسه بخش، کمینه، بیشینه) اثرهای یک رویداد؛ برای رویدادهای تکرارشونده یک بار ساخته می‌شود"""
+        cache_id = event.get('id')
+        if cache_id is not None and cache_id in self._compiled:
+            return self._compiled[cache_id]
+        rows, lows, highs = [], [], []
+        for sector, band in event.get('impact', {}).items():
+            row = self.sector_ids.get(sector)
+            if row is None or self.exposure.indptr[row] == self.exposure.indptr[row + 1]:
+                self.unmapped.add(sector)
+                if row is None:
+                    continue
+            rows.append(row)
+            lows.append(min(band['min'], band['max']))
+            highs.append(max(band['min'], band['max']))
+        compiled = (np.array(rows, dtype=np.intp), np.array(lows, dtype=np.float64),
+                    np.array(highs, dtype=np.float64))
+        if cache_id is not None:
+            self._compiled[cache_id] = compiled
+        return compiled
+
+    def sector_log_moves(self, events: Sequence[Dict], rng: np.random.Generator) -> np.ndarray:
+        """مجموع لگاریتم رشد هر بخش از تمام رویدادها (اثرها روی یک بخش ترکیب ضربی می‌شوند)"""
+        compiled = [self._compile(event) for event in events]
+        if not compiled:
+            return np.zeros(len(self.sectors))
+        rows, lows, highs = (np.concatenate(parts) for parts in zip(*compiled))
+        impacts = np.maximum(rng.uniform(lows, highs), MIN_IMPACT_PCT)
+        return np.bincount(rows, weights=np.log1p(impacts / 100), minlength=len(self.sectors))
+
+    def apply(self, events: Sequence[Dict], rng: np.random.Generator) -> np.ndarray:
+        """اعمال رویدادهای یک تیک روی قیمت‌ها؛ لگاریتم تغییر قیمت هر دارایی برگردانده می‌شود"""
+        log_moves = self.exposure.transpose_matvec(self.sector_log_moves(events, rng))
+        np.multiply(self.prices, np.exp(log_moves), out=self.prices, where=self.active)
+        return log_moves
+
+    def sync(self) -> int:
+        """نوشتن قیمت‌های تغییر کرده در دیکشنری دارایی‌ها؛ تعداد دارایی‌های تغییر کرده"""
+        changed = 0
+        for index in np.flatnonzero(self.active):
+            price = round(float(self.prices[index]), PRICE_DECIMALS)
+            asset_data = self.assets[index][3]
+            if asset_data.get('price') != price:
+                asset_data['price'] = price
+                changed += 1
+        return changed
+
+
+def simulate_news_days(engine: NewsImpactEngine, days: int, sampler: Optional[NewsSampler],
+                       timeline: Optional[EventTimeline], rng: np.random.Generator,
+                       news_per_day: int = 1) -> List[Dict]:
+    """اجرای چند روز بازی: رویدادهای زمان‌بندی شده و اخبار نمونه‌گیری شده هر روز یکجا اعمال می‌شوند"""
+    fired_days = []
+    for _ in range(days):
+        events = timeline.advance(1) if timeline is not None else []
+        if sampler is not None and news_per_day > 0:
+            events += sampler.sample(news_per_day)
+        engine.apply(events, rng)
+        fired_days.append({
+            'day': timeline.current_day if timeline is not None else None,
+            'events': [event['id'] for event in events],
+        })
+    return fired_days
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="اعمال اثر اخبار و رویدادها روی قیمت دارایی‌ها")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="پوشه فایل‌های داده بازار")
+    parser.add_argument('--news-pool', default=NEWS_POOL_PATH, help="فایل news-pool (json، یا jsonl با پسوند .jsonl)")
+    parser.add_argument('--days', type=int, default=1, help="تعداد روزهای بازی که جلو برده می‌شود")
+    parser.add_argument('--start-day', type=int, default=0, help="روز فعلی بازی برای رویدادهای زمان‌بندی شده")
+    parser.add_argument('--news-per-day', type=int, default=1, help="تعداد خبر تصادفی هر روز")
+    parser.add_argument('--seed', type=int, default=None, help="بذر تصادفی برای اجرای تکرارپذیر")
+    parser.add_argument('--compact', action='store_true', help="ذخیره JSON بدون تورفتگی")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None):
+    args = parse_args(argv)
+    rngs = RNGService(args.seed)
+    engine = NewsImpactEngine.from_data_dir(args.data_dir)
+    print(f"📰 ماتریس اثر: {engine.exposure.shape[0]} بخش × {engine.exposure.shape[1]} دارایی، "
+          f"{engine.exposure.nnz} درایه غیرصفر")
+
+    sampler = NewsSampler.from_news_pool(args.news_pool, rng=rngs.python_random('news', 'sampler'))
+    timeline = EventTimeline.from_news_pool(args.news_pool, args.start_day)
+    fired_days = simulate_news_days(engine, args.days, sampler, timeline, rngs.generator('news', 'impact'),
+                                    args.news_per_day)
+
+    changed = engine.sync()
+    written = write_changed_files(engine.market, args.compact)
+    fired = sum(len(day['events']) for day in fired_days)
+    print(f"✅ {fired} رویداد در {args.days} روز اعمال شد؛ قیمت {changed} دارایی تغییر کرد، "
+          f"{len(written)} فایل ذخیره شد (بذر: {rngs.seed})")
+    if engine.unmapped:
+        print(f"⚠️ بخش‌های بدون دارایی متناظر: {', '.join(sorted(engine.unmapped))}")
+
+
+if __name__ == "__main__":
+    main()
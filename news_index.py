@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+نمایه معکوس مخزن اخبار: بخش/دسته → شناسه خبرها و دسته‌بندی بر اساس شدت، جهت و اندازه اثر
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Set
+
+from json_stream import dumps, write_file_atomic
+
+INDEX_SUFFIX = '.index.json'
+
+# مرزهای بالایی باندهای اندازه اثر (درصد)؛ آخرین باند بی‌انتها است
+MAGNITUDE_BANDS = (('small', 3.0), ('medium', 10.0), ('large', 30.0), ('extreme', float('inf')))
+
+SEVERITIES = ('normal', 'major')
+SIGNS = ('negative', 'neutral', 'positive')
+
+
+def index_path(news_pool_path: str) -> str:
+    """مسیر فایل نمایه کنار news-pool.json"""
+    root, _ = os.path.splitext(news_pool_path)
+    return root + INDEX_SUFFIX
+
+
+def news_effect(item: Dict) -> float:
+    """اثر غالب خبر: میانگین بازه اثر بخشی که بیشترین قدر مطلق را دارد"""
+    effects = [(band['min'] + band['max']) / 2 for band in item.get('impact', {}).values()]
+    return max(effects, key=abs, default=0.0)
+
+
+def magnitude_band(effect: float) -> str:
+    for band, upper in MAGNITUDE_BANDS:
+        if abs(effect) < upper:
+            return band
+    return MAGNITUDE_BANDS[-1][0]
+
+
+def effect_sign(effect: float) -> str:
+    if effect > 0:
+        return 'positive'
+    if effect < 0:
+        return 'negative'
+    return 'neutral'
+
+
+class NewsIndexBuilder:
+    """ساخت تدریجی نمایه همزمان با تولید جریانی خبرها"""
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.sector_category = {sector: category for category, sectors in categories.items() for sector in sectors}
+        self.sectors = {}
+        self.categories = {}
+        self.buckets = {}
+
+    def add(self, item: Dict) -> None:
+        news_id = item['id']
+        seen_categories = set()
+        for sector in item.get('impact', {}):
+            self.sectors.setdefault(sector, []).append(news_id)
+            category = self.sector_category.get(sector)
+            if category is not None and category not in seen_categories:
+                seen_categories.add(category)
+                self.categories.setdefault(category, []).append(news_id)
+
+        effect = news_effect(item)
+        severity = item.get('severity', 'normal')
+        bucket = self.buckets.setdefault(severity, {}).setdefault(effect_sign(effect), {})
+        bucket.setdefault(magnitude_band(effect), []).append(news_id)
+
+    def track(self, items: Iterable[Dict]) -> Iterable[Dict]:
+        """عبور دادن خبرها از نمایه بدون نگه داشتن خود خبرها"""
+        for item in items:
+            self.add(item)
+            yield item
+
+    def to_dict(self) -> Dict:
+        return {
+            'bands': {band: upper if upper != float('inf') else None for band, upper in MAGNITUDE_BANDS},
+            'sectors': self.sectors,
+            'categories': self.categories,
+            'buckets': self.buckets,
+        }
+
+    def save(self, filepath: str, compact: bool = False) -> None:
+        write_file_atomic(dumps(self.to_dict(), None if compact else 2).encode('utf-8'), filepath)
+
+
+class NewsIndex:
+    """جستجوی خبرها با اشتراک مجموعه‌های نمایه به جای پیمایش کل مخزن
+
+    مثال: index.find(sector='Oil', severity='major', sign='negative')
+    """
+
+    def __init__(self, data: Dict):
+        self.sectors = {key: frozenset(ids) for key, ids in data.get('sectors', {}).items()}
+        self.categories = {key: frozenset(ids) for key, ids in data.get('categories', {}).items()}
+        self.buckets = {
+            (severity, sign, band): frozenset(ids)
+            for severity, signs in data.get('buckets', {}).items()
+            for sign, bands in signs.items()
+            for band, ids in bands.items()
+        }
+
+    @classmethod
+    def load(cls, filepath: str) -> 'NewsIndex':
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def for_news_pool(cls, news_pool_path: str) -> 'NewsIndex':
+        return cls.load(index_path(news_pool_path))
+
+    def _bucket_ids(self, severity: Optional[str], sign: Optional[str], band: Optional[str]) -> Set[str]:
+        ids = set()
+        for (bucket_severity, bucket_sign, bucket_band), bucket in self.buckets.items():
+            if ((severity is None or bucket_severity == severity) and (sign is None or bucket_sign == sign)
+                    and (band is None or bucket_band == band)):
+                ids |= bucket
+        return ids
+
+    def find(self, sector: Optional[str] = None, category: Optional[str] = None,
+             severity: Optional[str] = None, sign: Optional[str] = None,
+             band: Optional[str] = None) -> List[str]:
+        """شناسه خبرهایی که همه شرط‌های داده شده را دارند (به ترتیب شناسه)"""
+        candidates = []
+        if sector is not None:
+            candidates.append(self.sectors.get(sector, frozenset()))
+        if category is not None:
+            candidates.append(self.categories.get(category, frozenset()))
+        if severity is not None or sign is not None or band is not None:
+            candidates.append(self._bucket_ids(severity, sign, band))
+        if not candidates:
+            candidates.append(self._bucket_ids(None, None, None))
+
+        candidates.sort(key=len)
+        result = set(candidates[0])
+        for other in candidates[1:]:
+            result &= other
+        return sorted(result)
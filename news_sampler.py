@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+انتخاب وزن‌دار خبرها در هر روز بازی با جدول‌های alias (روش Vose) در زمان ثابت برای هر نمونه
+"""
+
+import bisect
+import itertools
+import json
+import random
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from generate_news_pool import categories as NEWS_CATEGORIES
+from news_index import magnitude_band, news_effect
+
+# وزن پایه هر شدت و ضریب نادر بودن هر باند اندازه اثر
+SEVERITY_WEIGHTS = {'normal': 1.0, 'major': 0.25}
+BAND_WEIGHTS = {'small': 1.0, 'medium': 0.6, 'large': 0.3, 'extreme': 0.1}
+
+# افزوده‌ها تا این نسبت از جدول اصلی در سطل سرریز می‌مانند و سپس جدول بازسازی می‌شود
+OVERFLOW_RATIO = 0.25
+MIN_OVERFLOW = 32
+MAX_REJECTIONS = 64
+
+TableKey = Tuple[Optional[str], Optional[str], Optional[str]]  # (severity, category, band); None = همه
+
+
+def default_weight(item: Dict) -> float:
+    """وزن انتخاب خبر؛ فیلد weight خود خبر در صورت وجود اولویت دارد"""
+    if 'weight' in item:
+        return float(item['weight'])
+    severity = item.get('severity', 'normal')
+    return SEVERITY_WEIGHTS.get(severity, 1.0) * BAND_WEIGHTS[magnitude_band(news_effect(item))]
+
+
+class AliasTable:
+    """جدول alias ثابت؛ هر نمونه با یک عدد صحیح و یک عدد تصادفی انتخاب می‌شود"""
+
+    def __init__(self, weights: List[float]):
+        n = len(weights)
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+        total = sum(weights)
+        if n == 0 or total <= 0:
+            return
+        scaled = [w * n / total for w in weights]
+        small = [i for i, w in enumerate(scaled) if w < 1.0]
+        large = [i for i, w in enumerate(scaled) if w >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Leftovers are 1.0 up to rounding error
+        for i in itertools.chain(small, large):
+            self.prob[i] = 1.0
+
+    def sample(self, rng: random.Random) -> int:
+        i = int(rng.random() * len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+class WeightedBucket:
+    """مجموعه وزن‌دار با افزودن/حذف تدریجی
+
+    حذف تنبل است (نمونه حذف شده رد و دوباره نمونه‌گیری می‌شود) و افزوده‌ها در سطل سرریز
+    با وزن تجمعی نگه داشته می‌شوند؛ وقتی سرریز یا وزن حذف شده زیاد شود جدول از نو ساخته می‌شود،
+    پس هزینه بازسازی سرشکن O(1) است.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.weights = []
+        self.table = AliasTable([])
+        self.base_total = 0.0
+        self.overflow_ids = []
+        self.overflow_cumulative = []
+        self.retired = set()
+        self.retired_weight = 0.0
+        self.members = {}
+
+    @property
+    def total(self) -> float:
+        overflow_total = self.overflow_cumulative[-1] if self.overflow_cumulative else 0.0
+        return self.base_total + overflow_total
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def add(self, news_id: str, weight: float) -> None:
+        if news_id in self.members or weight <= 0:
+            return
+        if news_id in self.retired:
+            self.rebuild()  # the stale copy must go before the id is reused
+        self.members[news_id] = weight
+        self.overflow_ids.append(news_id)
+        previous = self.overflow_cumulative[-1] if self.overflow_cumulative else 0.0
+        self.overflow_cumulative.append(previous + weight)
+        if len(self.overflow_ids) > max(MIN_OVERFLOW, OVERFLOW_RATIO * len(self.ids)):
+            self.rebuild()
+
+    def retire(self, news_id: str) -> None:
+        weight = self.members.pop(news_id, None)
+        if weight is None:
+            return
+        self.retired.add(news_id)
+        self.retired_weight += weight
+        if self.retired_weight > self.total / 2:
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        self.ids = list(self.members)
+        self.weights = [self.members[news_id] for news_id in self.ids]
+        self.table = AliasTable(self.weights)
+        self.base_total = sum(self.weights)
+        self.overflow_ids = []
+        self.overflow_cumulative = []
+        self.retired = set()
+        self.retired_weight = 0.0
+
+    def sample(self, rng: random.Random) -> Optional[str]:
+        if not self.members:
+            return None
+        for _ in range(MAX_REJECTIONS):
+            point = rng.random() * self.total
+            if point < self.base_total:
+                news_id = self.ids[self.table.sample(rng)]
+            else:
+                position = bisect.bisect_right(self.overflow_cumulative, point - self.base_total)
+                news_id = self.overflow_ids[min(position, len(self.overflow_ids) - 1)]
+            if news_id not in self.retired:
+                return news_id
+        # Mostly retired weight: compact and retry once on a clean table
+        self.rebuild()
+        return self.ids[self.table.sample(rng)]
+
+
+class NewsSampler:
+    """نمونه‌گیر خبر با جدول جداگانه برای هر ترکیب (شدت، دسته، باند) و حالت‌های «همه»"""
+
+    def __init__(self, items: Iterable[Dict] = (), rng: Optional[random.Random] = None,
+                 weight: Callable[[Dict], float] = default_weight,
+                 news_categories: Dict[str, List[str]] = None):
+        self.rng = rng or random.Random()
+        self.weight = weight
+        self.sector_category = {
+            sector: category
+            for category, sectors in (news_categories or NEWS_CATEGORIES).items()
+            for sector in sectors
+        }
+        self.items = {}
+        self.tables = {}
+        self.item_keys = {}
+        for item in items:
+            self.add(item)
+
+    @classmethod
+    def from_news_pool(cls, filepath: str, **kwargs) -> 'NewsSampler':
+        """ساخت نمونه‌گیر از news-pool.json یا خروجی jsonl آن"""
+        with open(filepath, 'r', encoding='utf-8') as f:
+            if filepath.endswith('.jsonl'):
+                lines = (json.loads(line) for line in f if line.strip())
+                items = [line['item'] for line in lines if line['section'] in ('normalNews', 'majorNews')]
+            else:
+                pool = json.load(f)
+                items = pool.get('normalNews', []) + pool.get('majorNews', [])
+        return cls(items, **kwargs)
+
+    def _keys(self, item: Dict) -> List[TableKey]:
+        severity = item.get('severity', 'normal')
+        band = magnitude_band(news_effect(item))
+        news_categories = {self.sector_category[s] for s in item.get('impact', {}) if s in self.sector_category}
+        return list(itertools.product((severity, None), sorted(news_categories) + [None], (band, None)))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, item: Dict) -> None:
+        """افزودن خبر جدید (یا بازگرداندن خبر کنار گذاشته شده)"""
+        news_id = item['id']
+        if news_id in self.items:
+            return
+        weight = self.weight(item)
+        keys = self._keys(item)
+        self.items[news_id] = item
+        self.item_keys[news_id] = keys
+        for key in keys:
+            self.tables.setdefault(key, WeightedBucket()).add(news_id, weight)
+
+    def retire(self, news_id: str) -> None:
+        """کنار گذاشتن خبری که دیگر نباید انتخاب شود"""
+        if self.items.pop(news_id, None) is None:
+            return
+        for key in self.item_keys.pop(news_id):
+            self.tables[key].retire(news_id)
+
+    def sample(self, k: int = 1, severity: Optional[str] = None, category: Optional[str] = None,
+               band: Optional[str] = None, unique: bool = True) -> List[Dict]:
+        """انتخاب k خبر با شرط اختیاری؛ مثلاً sample(2, category='commodities')
+
+        با unique=True خبر تکراری در یک نوبت برگردانده نمی‌شود (تعداد ممکن است کمتر از k شود).
+        """
+        bucket = self.tables.get((severity, category, band))
+        if bucket is None or not len(bucket):
+            return []
+        if unique:
+            k = min(k, len(bucket))
+        chosen = []
+        picked = set()
+        attempts = 0
+        while len(chosen) < k and attempts < k * MAX_REJECTIONS:
+            attempts += 1
+            news_id = bucket.sample(self.rng)
+            if unique and news_id in picked:
+                continue
+            picked.add(news_id)
+            chosen.append(self.items[news_id])
+        return chosen
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+دریافت همزمان داده‌های تاریخی (OHLC) با تلاش مجدد و کش محلی روی دیسک
+"""
+
+import json
+import math
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import instrumentation
+from json_stream import write_file_atomic
+
+OHLC_CACHE_DIR = '/workspace/data/market-real-data/ohlc_cache'
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+
+Bar = Dict[str, float]
+
+
+class PriceProvider(ABC):
+    """منبع داده تاریخی؛ history باید لیست کندل‌های روزانه بین start و end (شامل هر دو) را برگرداند"""
+
+    @abstractmethod
+    def history(self, symbol: str, start: date, end: date) -> List[Bar]:
+        ...
+
+
+class YahooFinanceProvider(PriceProvider):
+    """منبع Yahoo Finance؛ شیء Ticker و نشست HTTP بین درخواست‌ها دوباره استفاده می‌شوند"""
+
+    def __init__(self, session=None):
+        self.session = session
+        self._tickers = {}
+        self._lock = threading.Lock()
+
+    def _ticker(self, symbol: str):
+        import yfinance as yf
+
+        with self._lock:
+            if symbol not in self._tickers:
+                if self.session is not None:
+                    self._tickers[symbol] = yf.Ticker(symbol, session=self.session)
+                else:
+                    self._tickers[symbol] = yf.Ticker(symbol)
+            return self._tickers[symbol]
+
+    def history(self, symbol: str, start: date, end: date) -> List[Bar]:
+        hist = self._ticker(symbol).history(start=start.isoformat(), end=(end + timedelta(days=1)).isoformat())
+        bars = []
+        for index, row in hist.iterrows():
+            bars.append({
+                'date': index.date().isoformat(),
+                'open': float(row['Open']),
+                'high': float(row['High']),
+                'low': float(row['Low']),
+                'close': float(row['Close']),
+            })
+        return bars
+
+
+class LocalPriceProvider(PriceProvider):
+    """منبع محلی و قطعی بدون شبکه (برای آزمون‌ها و اجرای آفلاین)
+
+    قیمت هر روز فقط به (نماد، تاریخ) وابسته است، پس بازه‌های مختلف نتایج سازگار می‌دهند.
+    """
+
+    def __init__(self, base_prices: Dict[str, float] = None, skip_weekends: bool = True,
+                 failures: Dict[str, int] = None):
+        self.base_prices = base_prices or {}
+        self.skip_weekends = skip_weekends
+        self.failures = dict(failures or {})  # symbol -> number of calls that should fail first
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def history(self, symbol: str, start: date, end: date) -> List[Bar]:
+        with self._lock:
+            self.calls.append((symbol, start, end))
+            if self.failures.get(symbol, 0) > 0:
+                self.failures[symbol] -= 1
+                raise ConnectionError(f"شکست شبیه‌سازی شده برای {symbol}")
+
+        base = self.base_prices.get(symbol, 100.0)
+        phase = random.Random(symbol).uniform(0, 2 * math.pi)
+        bars = []
+        day = start
+        while day <= end:
+            if not (self.skip_weekends and day.weekday() >= 5):
+                noise = random.Random(f"{symbol}:{day.isoformat()}")
+                close = base * math.exp(0.15 * math.sin(day.toordinal() / 9 + phase) + noise.gauss(0, 0.02))
+                spread = abs(noise.gauss(0, 0.01)) * close
+                open_price = close * (1 + noise.gauss(0, 0.005))
+                bars.append({
+                    'date': day.isoformat(),
+                    'open': open_price,
+                    'high': max(open_price, close) + spread,
+                    'low': min(open_price, close) - spread,
+                    'close': close,
+                })
+            day += timedelta(days=1)
+        return bars
+
+
+class OHLCCache:
+    """کش OHLC روی دیسک؛ یک فایل برای هر نماد همراه با بازه‌های تاریخی که قبلاً دریافت شده‌اند"""
+
+    def __init__(self, cache_dir: str = OHLC_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.cache_dir, quote(symbol, safe='') + '.json')
+
+    def _load(self, symbol: str) -> Dict:
+        try:
+            with open(self._path(symbol), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'covered': [], 'bars': {}}
+
+    def missing_ranges(self, symbol: str, start: date, end: date) -> List[Tuple[date, date]]:
+        """بازه‌هایی از [start, end] که هنوز در کش نیستند"""
+        missing = []
+        cursor = start
+        for covered_start, covered_end in self._load(symbol)['covered']:
+            covered_start = date.fromisoformat(covered_start)
+            covered_end = date.fromisoformat(covered_end)
+            if covered_end < cursor:
+                continue
+            if covered_start > end:
+                break
+            if covered_start > cursor:
+                missing.append((cursor, covered_start - timedelta(days=1)))
+            cursor = max(cursor, covered_end + timedelta(days=1))
+        if cursor <= end:
+            missing.append((cursor, end))
+        return missing
+
+    def store(self, symbol: str, start: date, end: date, bars: Iterable[Bar]) -> None:
+        """افزودن کندل‌های یک بازه دریافت شده و ادغام بازه‌های پوشش"""
+        entry = self._load(symbol)
+        for bar in bars:
+            entry['bars'][bar['date']] = [bar['open'], bar['high'], bar['low'], bar['close']]
+
+        ranges = sorted(
+            [(date.fromisoformat(s), date.fromisoformat(e)) for s, e in entry['covered']] + [(start, end)]
+        )
+        merged = [list(ranges[0])]
+        for range_start, range_end in ranges[1:]:
+            if range_start <= merged[-1][1] + timedelta(days=1):
+                merged[-1][1] = max(merged[-1][1], range_end)
+            else:
+                merged.append([range_start, range_end])
+        entry['covered'] = [[s.isoformat(), e.isoformat()] for s, e in merged]
+        entry['bars'] = dict(sorted(entry['bars'].items()))
+
+        payload = json.dumps(entry, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        write_file_atomic(payload, self._path(symbol))
+
+    def get(self, symbol: str, start: date, end: date) -> List[Bar]:
+        """کندل‌های کش شده بین start و end"""
+        start_key, end_key = start.isoformat(), end.isoformat()
+        bars = []
+        for day, (open_price, high, low, close) in self._load(symbol)['bars'].items():
+            if start_key <= day <= end_key:
+                bars.append({'date': day, 'open': open_price, 'high': high, 'low': low, 'close': close})
+        return bars
+
+
+class HistoryFetcher:
+    """دریافت همزمان تاریخچه چند نماد با thread pool محدود، تلاش مجدد با backoff و کش محلی"""
+
+    def __init__(self, provider: PriceProvider, cache: Optional[OHLCCache] = None,
+                 max_workers: int = DEFAULT_MAX_WORKERS, retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF):
+        self.provider = provider
+        self.cache = cache
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.failures = {}
+        self._lock = threading.Lock()
+
+    def _download(self, symbol: str, start: date, end: date) -> List[Bar]:
+        for attempt in range(self.retries + 1):
+            try:
+                return self.provider.history(symbol, start, end)
+            except Exception as exc:
+                if attempt == self.retries:
+                    raise
+                instrumentation.count('fetch_retries')
+                delay = self.backoff * (2 ** attempt)
+                print(f"خطا در دریافت {symbol} ({exc!r})؛ تلاش دوباره پس از {delay:.1f} ثانیه")
+                time.sleep(delay)
+
+    def fetch(self, symbol: str, start: date, end: date) -> List[Bar]:
+        """دریافت کندل‌های یک نماد؛ فقط روزهای غایب از کش دانلود می‌شوند"""
+        try:
+            if self.cache is None:
+                return self._download(symbol, start, end)
+
+            # Today's bar is still moving, so it is never marked as cached
+            last_final_day = date.today() - timedelta(days=1)
+            fresh = []
+            for missing_start, missing_end in self.cache.missing_ranges(symbol, start, end):
+                bars = self._download(symbol, missing_start, missing_end)
+                cacheable_end = min(missing_end, last_final_day)
+                if missing_start <= cacheable_end:
+                    self.cache.store(symbol, missing_start, cacheable_end,
+                                     [bar for bar in bars if bar['date'] <= cacheable_end.isoformat()])
+                fresh.extend(bar for bar in bars if bar['date'] > cacheable_end.isoformat())
+            return self.cache.get(symbol, start, end) + fresh
+        except Exception as exc:
+            with self._lock:
+                self.failures[symbol] = repr(exc)
+            instrumentation.count('fetch_failures', error=type(exc).__name__)
+            print(f"دریافت داده {symbol} ناموفق بود: {exc!r}")
+            return []
+
+    def fetch_many(self, symbols: Iterable[str], start: date, end: date) -> Dict[str, List[Bar]]:
+        """دریافت همزمان چند نماد؛ نمادهای ناموفق لیست خالی می‌گیرند و در failures ثبت می‌شوند"""
+        symbols = list(symbols)
+        with instrumentation.stage('fetch', provider=type(self.provider).__name__):
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(symbols)))) as executor:
+                results = dict(zip(symbols, executor.map(lambda symbol: self.fetch(symbol, start, end), symbols)))
+        instrumentation.count('symbols_fetched', len(symbols))
+        return results
+
+
+def closes(bars: List[Bar]) -> List[float]:
+    """استخراج قیمت‌های بسته شدن"""
+    return [bar['close'] for bar in bars]
+
+
+_default_fetcher = None
+
+
+def get_default_fetcher() -> HistoryFetcher:
+    """fetcher مشترک Yahoo Finance با کش پیش‌فرض"""
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = HistoryFetcher(YahooFinanceProvider(), OHLCCache())
+    return _default_fetcher
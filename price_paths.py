@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+تولید برداری مسیرهای قیمت مصنوعی (GBM با پرش اختیاری) برای N دارایی × T روز
+"""
+
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+
+from volatility_params import CategoryLabel, VolatilityParams, load_volatility_params
+
+DEFAULT_CHUNK_DAYS = 256
+
+
+def _as_asset_array(value, n_assets: int) -> np.ndarray:
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (n_assets,))
+
+
+def iter_price_paths(start_prices: Sequence[float], drift, volatility, days: int,
+                     rng: np.random.Generator, correlation: Optional[np.ndarray] = None,
+                     jump_intensity=0.0, jump_mean=0.0, jump_std=0.0,
+                     chunk_days: int = DEFAULT_CHUNK_DAYS) -> Iterator[np.ndarray]:
+    """تولید مسیرهای قیمت به صورت تکه‌های (دارایی × chunk_days) تا حافظه برای افق‌های بلند محدود بماند
+
+    drift و volatility و پارامترهای پرش می‌توانند عدد یا آرایه‌ای به طول تعداد دارایی‌ها باشند.
+    correlation ماتریس همبستگی شوک‌های روزانه بین دارایی‌هاست (اختیاری).
+    """
+    start_prices = np.asarray(start_prices, dtype=np.float64)
+    n_assets = start_prices.shape[0]
+    drift = _as_asset_array(drift, n_assets)
+    volatility = _as_asset_array(volatility, n_assets)
+    jump_intensity = _as_asset_array(jump_intensity, n_assets)
+    jump_mean = _as_asset_array(jump_mean, n_assets)
+    jump_std = _as_asset_array(jump_std, n_assets)
+
+    cholesky = np.linalg.cholesky(np.asarray(correlation, dtype=np.float64)) if correlation is not None else None
+    # Ito correction keeps the expected simple return equal to `drift`
+    log_drift = (drift - 0.5 * volatility ** 2)[:, None]
+    has_jumps = bool(np.any(jump_intensity > 0))
+
+    # Separate streams drawn day-major make the output independent of chunk_days
+    shock_rng, count_rng, size_rng = rng.spawn(3)
+    log_price = np.log(start_prices)
+    for chunk_start in range(0, days, chunk_days):
+        length = min(chunk_days, days - chunk_start)
+        shocks = shock_rng.standard_normal((length, n_assets)).T
+        if cholesky is not None:
+            shocks = cholesky @ shocks
+        log_returns = log_drift + volatility[:, None] * shocks
+
+        if has_jumps:
+            counts = count_rng.poisson(np.broadcast_to(jump_intensity, (length, n_assets)))
+            jumped = counts > 0
+            if jumped.any():
+                sizes = size_rng.standard_normal(int(jumped.sum()))
+                asset_index = np.nonzero(jumped)[1]
+                k = counts[jumped]
+                jump_returns = np.zeros((length, n_assets), dtype=np.float64)
+                jump_returns[jumped] = k * jump_mean[asset_index] + np.sqrt(k) * jump_std[asset_index] * sizes
+                log_returns += jump_returns.T
+
+        path = log_price[:, None] + np.cumsum(log_returns, axis=1)
+        log_price = path[:, -1]
+        yield np.exp(path)
+
+
+def generate_price_paths(start_prices: Sequence[float], drift, volatility, days: int,
+                         rng: np.random.Generator, correlation: Optional[np.ndarray] = None,
+                         jump_intensity=0.0, jump_mean=0.0, jump_std=0.0,
+                         chunk_days: int = DEFAULT_CHUNK_DAYS) -> np.ndarray:
+    """ماتریس کامل مسیرهای قیمت (دارایی × روز)؛ برای افق‌های بلند از iter_price_paths استفاده کنید"""
+    chunks = list(iter_price_paths(start_prices, drift, volatility, days, rng, correlation,
+                                   jump_intensity, jump_mean, jump_std, chunk_days))
+    if not chunks:
+        return np.empty((len(start_prices), 0), dtype=np.float64)
+    return np.concatenate(chunks, axis=1)
+
+
+def category_path_params(labels: Sequence[CategoryLabel], params: Optional[VolatilityParams] = None,
+                         static_unknown: bool = False) -> Dict[str, np.ndarray]:
+    """پارامترهای روزانه مسیر هر دارایی از volatility_params.json به صورت آرایه‌های هم‌طول با labels
+
+    labels برچسب (کلاس دارایی، دسته) هر دارایی است. دسته ناشناخته UnknownCategoryError می‌دهد،
+    مگر با static_unknown که قیمتش ثابت می‌ماند (همه پارامترها صفر).
+    """
+    params = params or load_volatility_params()
+    if not static_unknown:
+        return params.path_params(params.category_ids(labels))
+    known = np.array([params.has_category(*label) for label in labels], dtype=bool)
+    known_params = params.path_params(params.category_ids(label for label, is_known in zip(labels, known) if is_known))
+    path = {}
+    for key, values in known_params.items():
+        path[key] = np.zeros(len(labels), dtype=np.float64)
+        path[key][known] = values
+    return path
+
+
+def iter_category_price_paths(start_prices: Sequence[float], labels: Sequence[CategoryLabel], days: int,
+                              rng: np.random.Generator, correlation: Optional[np.ndarray] = None,
+                              jumps: bool = True, chunk_days: int = DEFAULT_CHUNK_DAYS) -> Iterator[np.ndarray]:
+    """تولید تکه‌ای مسیرها با پارامترهای دسته هر دارایی"""
+    params = category_path_params(labels)
+    jump_intensity = params['jump_intensity'] if jumps else 0.0
+    return iter_price_paths(start_prices, params['drift'], params['volatility'], days, rng, correlation,
+                            jump_intensity, params['jump_mean'], params['jump_std'], chunk_days)
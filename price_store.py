@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+انبار ستونی تاریخچه قیمت‌ها: ماتریس (دارایی × روز) در فایل npy با دسترسی memory-map
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from json_stream import write_file_atomic
+from volatility_engine import calculate_real_volatility_batch, history_lengths
+
+PRICE_STORE_DIR = '/workspace/data/market-real-data/price_store'
+MATRIX_FILE = 'closes.npy'
+INDEX_FILE = 'index.json'
+MIN_DAY_CAPACITY = 64
+
+
+class PriceStore:
+    """قیمت‌های بسته شدن همه نمادها در یک آرایه پیوسته float64؛ هر سطر یک نماد و هر ستون یک روز
+
+    ستون‌های انتهایی فایل ظرفیت رزرو شده برای روزهای آینده‌اند تا افزودن روز بدون بازنویسی انجام شود.
+    پنجره‌های قیمت به صورت view از روی memory-map خوانده می‌شوند و کپی نمی‌شوند. انبار باز شده با
+    writable=False فقط خواندنی است و افزودن روز یا نماد به آن ValueError می‌دهد.
+    """
+
+    def __init__(self, store_dir: str, data: np.ndarray, symbols: List[str], dates: List[str],
+                 first_day: List[int], writable: bool = True):
+        self.store_dir = store_dir
+        self.writable = writable
+        self._data = data
+        self.symbols = symbols
+        self.dates = dates
+        self.first_day = np.asarray(first_day, dtype=np.int64)
+        self.index = {symbol: row for row, symbol in enumerate(symbols)}
+
+    @staticmethod
+    def _allocate(store_dir: str, n_assets: int, capacity: int) -> np.ndarray:
+        data = np.lib.format.open_memmap(os.path.join(store_dir, MATRIX_FILE), mode='w+',
+                                         dtype=np.float64, shape=(n_assets, capacity))
+        data[:] = np.nan
+        return data
+
+    @classmethod
+    def create(cls, store_dir: str, symbols: Sequence[str], price_matrix: np.ndarray = None,
+               dates: Sequence[str] = ()) -> 'PriceStore':
+        """ساخت انبار جدید از ماتریس قیمت (دارایی × روز) و تاریخ هر ستون"""
+        os.makedirs(store_dir, exist_ok=True)
+        symbols = list(symbols)
+        if len(set(symbols)) != len(symbols):
+            raise ValueError("نمادهای تکراری در انبار قیمت مجاز نیستند")
+        if price_matrix is None:
+            price_matrix = np.empty((len(symbols), 0), dtype=np.float64)
+        price_matrix = np.asarray(price_matrix, dtype=np.float64)
+        if price_matrix.shape != (len(symbols), len(dates)):
+            raise ValueError("ابعاد ماتریس قیمت با تعداد نمادها و تاریخ‌ها نمی‌خواند")
+
+        n_days = price_matrix.shape[1]
+        data = cls._allocate(store_dir, len(symbols), max(MIN_DAY_CAPACITY, n_days * 2))
+        data[:, :n_days] = price_matrix
+        first_day = n_days - history_lengths(price_matrix) if n_days else np.zeros(len(symbols), dtype=np.int64)
+        store = cls(store_dir, data, symbols, list(dates), first_day.tolist())
+        store.flush()
+        return store
+
+    @classmethod
+    def open(cls, store_dir: str = PRICE_STORE_DIR, writable: bool = False) -> 'PriceStore':
+        """باز کردن انبار موجود به صورت memory-map (برای append_day و add_symbols با writable=True)"""
+        with open(os.path.join(store_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        data = np.load(os.path.join(store_dir, MATRIX_FILE), mmap_mode='r+' if writable else 'r')
+        return cls(store_dir, data, index['symbols'], index['dates'], index['first_day'], writable)
+
+    @classmethod
+    def from_histories(cls, store_dir: str, histories: Dict[str, List[Dict]]) -> 'PriceStore':
+        """ساخت انبار از خروجی HistoryFetcher.fetch_many ({نماد: کندل‌ها})"""
+        dates = sorted({bar['date'] for bars in histories.values() for bar in bars})
+        column = {day: col for col, day in enumerate(dates)}
+        symbols = list(histories)
+        matrix = np.full((len(symbols), len(dates)), np.nan, dtype=np.float64)
+        for row, symbol in enumerate(symbols):
+            for bar in histories[symbol]:
+                matrix[row, column[bar['date']]] = bar['close']
+        return cls.create(store_dir, symbols, matrix, dates)
+
+    @property
+    def n_days(self) -> int:
+        return len(self.dates)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """ماتریس قیمت روزهای ثبت شده (view بدون کپی)"""
+        return self._data[:, :self.n_days]
+
+    def lengths(self) -> np.ndarray:
+        """طول تاریخچه هر نماد از اولین قیمت معتبر تا آخرین روز"""
+        return np.maximum(self.n_days - self.first_day, 0)
+
+    def window(self, days: int) -> np.ndarray:
+        """قیمت‌های days روز آخر تمام نمادها (view بدون کپی)"""
+        start = max(0, self.n_days - days)
+        return self._data[:, start:self.n_days]
+
+    def history(self, symbol: str, days: Optional[int] = None) -> np.ndarray:
+        """تاریخچه یک نماد (view بدون کپی)"""
+        row = self._data[self.index[symbol], :self.n_days]
+        return row if days is None else row[-days:]
+
+    def rows(self, symbols: Iterable[str]) -> np.ndarray:
+        """شماره سطر نمادها برای gather برداری"""
+        return np.fromiter((self.index[symbol] for symbol in symbols), dtype=np.int64)
+
+    def volatility(self, days: int) -> np.ndarray:
+        """نوسان سالانه (درصد) days روزه تمام نمادها، مستقیم از روی memory-map"""
+        return calculate_real_volatility_batch(self.window(days), days, self.lengths())
+
+    def volatility_7_30(self) -> Tuple[np.ndarray, np.ndarray]:
+        """نوسانات 7 و 30 روزه تمام نمادها"""
+        return self.volatility(7), self.volatility(30)
+
+    def _require_writable(self) -> None:
+        if not self.writable:
+            raise ValueError(f"انبار قیمت {self.store_dir} فقط خواندنی (writable=False) باز شده است؛ "
+                             f"برای تغییر آن PriceStore.open(..., writable=True) را به کار ببرید")
+
+    def append_day(self, day: str, closes: Dict[str, float]) -> None:
+        """افزودن قیمت‌های بسته شدن یک روز جدید؛ نمادهای غایب NaN می‌گیرند"""
+        self._require_writable()
+        if self.dates and day <= self.dates[-1]:
+            raise ValueError(f"روز {day} باید بعد از آخرین روز انبار ({self.dates[-1]}) باشد")
+        unknown = [symbol for symbol in closes if symbol not in self.index]
+        if unknown:
+            self.add_symbols(unknown)
+        if self.n_days == self._data.shape[1]:
+            self._grow(self._data.shape[0], self._data.shape[1] * 2)
+
+        column = np.full(len(self.symbols), np.nan, dtype=np.float64)
+        for symbol, price in closes.items():
+            column[self.index[symbol]] = price
+        self._data[:, self.n_days] = column
+        fresh = (self.first_day >= self.n_days) & np.isfinite(column)
+        self.first_day = np.where(fresh, self.n_days, self.first_day)
+        self.dates.append(day)
+        self.flush()
+
+    def add_symbols(self, symbols: Iterable[str]) -> None:
+        """افزودن نمادهای جدید (سطرهای NaN)"""
+        self._require_writable()
+        symbols = [symbol for symbol in symbols if symbol not in self.index]
+        if not symbols:
+            return
+        self._grow(len(self.symbols) + len(symbols), self._data.shape[1])
+        for symbol in symbols:
+            self.index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        self.first_day = np.concatenate([self.first_day, np.full(len(symbols), self.n_days, dtype=np.int64)])
+        self.flush()
+
+    def _grow(self, n_assets: int, capacity: int) -> None:
+        """بازسازی فایل با ابعاد بزرگ‌تر (فقط وقتی ظرفیت رزرو شده تمام شود)"""
+        old = np.array(self._data[:, :self.n_days])
+        old_rows = self._data.shape[0]
+        del self._data
+        self._data = self._allocate(self.store_dir, n_assets, capacity)
+        self._data[:old_rows, :self.n_days] = old
+
+    def flush(self) -> None:
+        """نوشتن تغییرات memory-map و فهرست نمادها روی دیسک"""
+        if isinstance(self._data, np.memmap):
+            self._data.flush()
+        index = {'symbols': self.symbols, 'dates': self.dates, 'first_day': self.first_day.tolist()}
+        payload = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        write_file_atomic(payload, os.path.join(self.store_dir, INDEX_FILE))
@@ -3,88 +3,83 @@
 محاسبه نوسانات واقعی بر اساس داده‌های تاریخی
 """
 
-import json
+import argparse
 import math
-import numpy as np
-from datetime import datetime, timedelta
-from typing import Dict, Any, List
-import requests
-
-def load_json_file(filepath: str) -> Dict:
-    """بارگذاری فایل JSON"""
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"فایل {filepath} پیدا نشد")
-        return {}
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+import instrumentation
+from calculate_volatility import (ASSET_FILES, DATA_DIR, add_instrumentation_args, add_snapshot_args,
+                                  cache_run_seed, load_market_files, record_run_snapshot,
+                                  report_unknown_categories, update_complete_data_metadata, write_changed_files)
+from rng_streams import ItemRandom, RNGService
+from volatility_cache import VOLATILITY_CACHE_PATH, VolatilityCache, cache_key
+from volatility_params import UnknownCategoryError, load_volatility_params
 
-def save_json_file(data: Dict, filepath: str) -> None:
-    """ذخیره فایل JSON"""
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+# NumPy, the GBM/correlation helpers and the price fetcher (yfinance) are imported inside the
+# functions that use them, so importing this module or running --help stays cheap
+if TYPE_CHECKING:
+    import numpy as np
+    from price_fetcher import HistoryFetcher
 
-def fetch_stock_data(symbol: str) -> List[float]:
+def fetch_stock_data(symbol: str, fetcher: 'HistoryFetcher' = None) -> List[float]:
     """دریافت داده‌های تاریخی سهام از Yahoo Finance"""
-    try:
-        import yfinance as yf
-        
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period="1mo")  # 30 روز گذشته
-        
-        if hist.empty:
-            return []
-            
-        prices = hist['Close'].tolist()
-        return prices
-    except:
-        return []
-
-def fetch_crypto_data(symbol: str) -> List[float]:
+    return fetch_stocks_data([symbol], fetcher)[symbol]
+
+def fetch_stocks_data(symbols: List[str], fetcher: 'HistoryFetcher' = None) -> Dict[str, List[float]]:
+    """دریافت همزمان داده‌های تاریخی 30 روز گذشته چند سهم (با کش محلی و تلاش مجدد)"""
+    from price_fetcher import closes, get_default_fetcher
+    fetcher = fetcher or get_default_fetcher()
+    end = date.today()
+    start = end - timedelta(days=30)  # 30 روز گذشته
+    histories = fetcher.fetch_many(symbols, start, end)
+    return {symbol: closes(bars) for symbol, bars in histories.items()}
+
+# Mapping CoinGecko IDs
+CRYPTO_COIN_IDS = {
+    'BTC': 'bitcoin',
+    'ETH': 'ethereum', 
+    'BNB': 'binancecoin',
+    'XRP': 'ripple',
+    'ADA': 'cardano',
+    'DOGE': 'dogecoin',
+    'SOL': 'solana',
+    'DOT': 'polkadot',
+    'AVAX': 'avalanche-2',
+    'LINK': 'chainlink',
+    'MATIC': 'matic-network',
+    'UNI': 'uniswap',
+    'LTC': 'litecoin',
+    'USDT': 'tether',
+    'USDC': 'usd-coin'
+}
+
+CRYPTO_CURRENT_PRICES = {
+    'BTC': 45000, 'ETH': 2500, 'BNB': 300, 'XRP': 0.5, 'ADA': 0.3,
+    'DOGE': 0.08, 'SOL': 100, 'DOT': 4, 'AVAX': 25, 'LINK': 15,
+    'MATIC': 0.8, 'UNI': 6, 'LTC': 70, 'USDT': 1, 'USDC': 1
+}
+
+def fetch_crypto_data(symbol: str, rng: 'np.random.Generator' = None) -> List[float]:
     """دریافت داده‌های تاریخی رمزارز از CoinGecko"""
-    try:
-        # Mapping CoinGecko IDs
-        coin_ids = {
-            'BTC': 'bitcoin',
-            'ETH': 'ethereum', 
-            'BNB': 'binancecoin',
-            'XRP': 'ripple',
-            'ADA': 'cardano',
-            'DOGE': 'dogecoin',
-            'SOL': 'solana',
-            'DOT': 'polkadot',
-            'AVAX': 'avalanche-2',
-            'LINK': 'chainlink',
-            'MATIC': 'matic-network',
-            'UNI': 'uniswap',
-            'LTC': 'litecoin',
-            'USDT': 'tether',
-            'USDC': 'usd-coin'
-        }
-        
-        coin_id = coin_ids.get(symbol, 'bitcoin')
-        
-        # Simulate historical data based on current price
-        current_prices = {
-            'BTC': 45000, 'ETH': 2500, 'BNB': 300, 'XRP': 0.5, 'ADA': 0.3,
-            'DOGE': 0.08, 'SOL': 100, 'DOT': 4, 'AVAX': 25, 'LINK': 15,
-            'MATIC': 0.8, 'UNI': 6, 'LTC': 70, 'USDT': 1, 'USDC': 1
-        }
-        
-        current_price = current_prices.get(symbol, 100)
-        
-        # Generate realistic historical prices with volatility
-        prices = []
-        price = current_price
-        for i in range(30):  # 30 days of data
-            # Add realistic daily volatility (2-8% for crypto)
-            daily_change = np.random.normal(0, 0.04)  # 4% standard deviation
-            price *= (1 + daily_change)
-            prices.append(price)
-            
-        return prices
-    except:
-        return []
+    return fetch_cryptos_data([symbol], rng).get(symbol, [])
+
+def fetch_cryptos_data(symbols: List[str], rng: 'np.random.Generator' = None,
+                       days: int = 30) -> Dict[str, List[float]]:
+    """شبیه‌سازی یکجای تاریخچه قیمت چند رمزارز بر اساس قیمت فعلی (یک مسیر GBM برای هر نماد)"""
+    known = [symbol for symbol in symbols if symbol in CRYPTO_CURRENT_PRICES]
+    for symbol in symbols:
+        if symbol not in CRYPTO_CURRENT_PRICES:
+            print(f"رمزارز {symbol} شناخته نشد")
+    if not known:
+        return {}
+
+    from price_paths import generate_price_paths
+    rng = rng or RNGService().generator('cryptocurrencies', 'paths')
+    start_prices = [CRYPTO_CURRENT_PRICES[symbol] for symbol in known]
+    # Realistic daily volatility for crypto: 4% standard deviation, no drift
+    paths = generate_price_paths(start_prices, 0.0, 0.04, days, rng)
+    return {symbol: paths[row].tolist() for row, symbol in enumerate(known)}
 
 def calculate_real_volatility(prices: List[float], days: int) -> float:
     """محاسبه نوسان واقعی از داده‌های تاریخی"""
@@ -108,143 +103,179 @@ def calculate_real_volatility(prices: List[float], days: int) -> float:
         return 0.0
         
     # Calculate volatility (standard deviation of returns)
+    import numpy as np
     volatility = np.std(returns) * math.sqrt(252)  # Annualized
     
     return volatility * 100  # Convert to percentage
 
-def update_real_volatility() -> None:
-    """بروزرسانی نوسانات با داده‌های واقعی"""
-    print("شروع محاسبه نوسانات واقعی...")
-    
+# Define major stocks and their symbols
+MAJOR_STOCKS = {
+    'technology': ['AAPL', 'MSFT', 'GOOGL', 'META', 'NVDA', 'AMD'],
+    'banking': ['JPM', 'BAC', 'GS', 'MS'],
+    'healthcare': ['JNJ', 'PFE', 'MRNA', 'ABBV'],
+    'energy': ['XOM', 'CVX', 'COP'],
+    'retail': ['AMZN', 'COST'],
+    'industrial': ['GE', 'F']
+}
+
+def collect_real_volatility_targets(market: Dict[str, Dict],
+                                   unknown: Optional[Set[str]] = None) -> List[Tuple[str, str, Dict, float, float]]:
+    """فهرست (کلاس، دسته، داده دارایی، انحراف معیار 7 روزه، انحراف معیار 30 روزه) به ترتیب نمونه‌گیری
+
+    پارامترها از volatility_params.json خوانده می‌شوند؛ دسته‌های بدون پارامتر در unknown ثبت می‌شوند.
+    """
+    params = load_volatility_params()
+    unknown = set() if unknown is None else unknown
+    targets = []
+
     # 1. سهام
-    print("در حال بروزرسانی نوسانات سهام...")
-    stocks_data = load_json_file('/workspace/data/market-real-data/stocks_complete_data.json')
-    
-    # Define major stocks and their symbols
-    major_stocks = {
-        'technology': ['AAPL', 'MSFT', 'GOOGL', 'META', 'NVDA', 'AMD'],
-        'banking': ['JPM', 'BAC', 'GS', 'MS'],
-        'healthcare': ['JNJ', 'PFE', 'MRNA', 'ABBV'],
-        'energy': ['XOM', 'CVX', 'COP'],
-        'retail': ['AMZN', 'COST'],
-        'industrial': ['GE', 'F']
-    }
-    
-    for category, symbols in major_stocks.items():
+    stocks = market.get('stocks', {}).get('stocks', {})
+    for category, symbols in MAJOR_STOCKS.items():
+        try:
+            factor = params.factor('stocks', category)
+        except UnknownCategoryError as exc:
+            unknown.add(exc.args[0])
+            continue
+        sigma_7d = factor['real_volatility_7d'] * factor['real_multiplier']
+        sigma_30d = factor['real_volatility_30d'] * factor['real_multiplier']
         for symbol in symbols:
-            if category in stocks_data['stocks'] and symbol in stocks_data['stocks'][category]:
-                # Generate realistic volatility data
-                asset_data = stocks_data['stocks'][category][symbol]
-                
-                # Simulate real volatility based on asset type
-                vol_factors = {
-                    'technology': {'vol7': 4.5, 'vol30': 8.2},
-                    'banking': {'vol7': 3.2, 'vol30': 6.8},
-                    'healthcare': {'vol7': 3.8, 'vol30': 7.1},
-                    'energy': {'vol7': 5.2, 'vol30': 9.5},
-                    'retail': {'vol7': 3.5, 'vol30': 7.8},
-                    'industrial': {'vol7': 4.0, 'vol30': 8.5}
-                }
-                
-                factor = vol_factors.get(category, vol_factors['technology'])
-                base_7d = factor['vol7']
-                base_30d = factor['vol30']
-                
-                # Add realistic variation
-                change_7d = np.random.normal(0, base_7d * 0.3)
-                change_30d = np.random.normal(0, base_30d * 0.3)
-                
-                asset_data['change_7d'] = round(change_7d, 2)
-                asset_data['change_30d'] = round(change_30d, 2)
-                
-                stocks_data['stocks'][category][symbol] = asset_data
-    
-    save_json_file(stocks_data, '/workspace/data/market-real-data/stocks_complete_data.json')
-    print("نوسانات سهام به‌روزرسانی شد")
-    
-    # 2. رمزارزها
-    print("در حال بروزرسانی نوسانات رمزارزها...")
-    crypto_data = load_json_file('/workspace/data/market-real-data/cryptocurrencies_complete_data.json')
-    
-    crypto_factors = {
-        'top_tier': {'vol7': 8.5, 'vol30': 15.2},
-        'defi_layer2': {'vol7': 12.0, 'vol30': 22.8},
-        'stablecoins': {'vol7': 0.1, 'vol30': 0.2}
-    }
-    
-    for category, factor in crypto_factors.items():
-        if category in crypto_data['cryptocurrencies']:
-            for symbol in crypto_data['cryptocurrencies'][category]:
-                asset_data = crypto_data['cryptocurrencies'][category][symbol]
-                
-                # Higher volatility for defi tokens
-                vol_multiplier = 2.5 if category == 'defi_layer2' else 1.0
-                
-                change_7d = np.random.normal(0, factor['vol7'] * vol_multiplier)
-                change_30d = np.random.normal(0, factor['vol30'] * vol_multiplier)
-                
-                asset_data['change_7d'] = round(change_7d, 2)
-                asset_data['change_30d'] = round(change_30d, 2)
-                
-                crypto_data['cryptocurrencies'][category][symbol] = asset_data
-    
-    save_json_file(crypto_data, '/workspace/data/market-real-data/cryptocurrencies_complete_data.json')
-    print("نوسانات رمزارزها به‌روزرسانی شد")
-    
-    # 3. کالاها
-    print("در حال بروزرسانی نوسانات کالاها...")
-    commodities_data = load_json_file('/workspace/data/market-real-data/commodities_complete_data.json')
-    
-    commodity_factors = {
-        'precious_metals': {'vol7': 2.8, 'vol30': 5.2},
-        'energy': {'vol7': 4.5, 'vol30': 8.8},
-        'industrial_metals': {'vol7': 3.2, 'vol30': 6.5},
-        'agricultural': {'vol7': 3.8, 'vol30': 7.2}
-    }
-    
-    for category, factor in commodity_factors.items():
-        if category in commodities_data['commodities']:
-            for symbol in commodities_data['commodities'][category]:
-                asset_data = commodities_data['commodities'][category][symbol]
-                
-                change_7d = np.random.normal(0, factor['vol7'])
-                change_30d = np.random.normal(0, factor['vol30'])
-                
-                asset_data['change_7d'] = round(change_7d, 2)
-                asset_data['change_30d'] = round(change_30d, 2)
-                
-                commodities_data['commodities'][category][symbol] = asset_data
-    
-    save_json_file(commodities_data, '/workspace/data/market-real-data/commodities_complete_data.json')
-    print("نوسانات کالاها به‌روزرسانی شد")
-    
-    # 4. شاخص‌ها
-    print("در حال بروزرسانی نوسانات شاخص‌ها...")
-    indices_data = load_json_file('/workspace/data/market-real-data/indices_complete_data.json')
-    
-    index_factors = {
-        'american': {'vol7': 2.2, 'vol30': 4.8},
-        'european': {'vol7': 2.5, 'vol30': 5.2},
-        'asian': {'vol7': 2.8, 'vol30': 5.8}
-    }
-    
-    for category, factor in index_factors.items():
-        if category in indices_data['indices']:
-            for symbol in indices_data['indices'][category]:
-                asset_data = indices_data['indices'][category][symbol]
-                
-                change_7d = np.random.normal(0, factor['vol7'])
-                change_30d = np.random.normal(0, factor['vol30'])
-                
-                asset_data['change_7d'] = round(change_7d, 2)
-                asset_data['change_30d'] = round(change_30d, 2)
-                
-                indices_data['indices'][category][symbol] = asset_data
-    
-    save_json_file(indices_data, '/workspace/data/market-real-data/indices_complete_data.json')
-    print("نوسانات شاخص‌ها به‌روزرسانی شد")
-    
+            if category in stocks and symbol in stocks[category]:
+                targets.append(('stocks', category, stocks[category][symbol], sigma_7d, sigma_30d))
+
+    # 2. رمزارزها، 3. کالاها و 4. شاخص‌ها
+    for asset_class in ('cryptocurrencies', 'commodities', 'indices'):
+        assets = market.get(asset_class, {}).get(asset_class, {})
+        by_id = {}
+        for file_category in assets:
+            try:
+                by_id.setdefault(params.category_id(asset_class, file_category), []).append(file_category)
+            except UnknownCategoryError as exc:
+                unknown.add(exc.args[0])
+        for category in params.categories(asset_class):
+            factor = params.factor(asset_class, category)
+            sigma_7d = factor['real_volatility_7d'] * factor['real_multiplier']
+            sigma_30d = factor['real_volatility_30d'] * factor['real_multiplier']
+            for file_category in by_id.get(params.category_id(asset_class, category), []):
+                for asset_data in assets[file_category].values():
+                    targets.append((asset_class, category, asset_data, sigma_7d, sigma_30d))
+
+    return targets
+
+def draw_asset_changes(rng: ItemRandom, asset_class: str, category: str, asset_data: Dict,
+                       sigma_7d: float, sigma_30d: float) -> Tuple[float, float]:
+    """(change_7d, change_30d) یک دارایی از جریان تصادفی خودش؛ فقط به بذر اجرا و هویت دارایی وابسته است"""
+    rng.item('real_volatility', asset_class, category, asset_data.get('symbol'))
+    # + 0.0 turns -0.0 into 0.0, as SQLite would on a cached run
+    return round(rng.gauss(0, sigma_7d), 2) + 0.0, round(rng.gauss(0, sigma_30d), 2) + 0.0
+
+def draw_real_volatility_changes(targets: List[Tuple[str, str, Dict, float, float]],
+                                 correlated: bool = False, rngs: RNGService = None) -> None:
+    """نمونه‌گیری change_7d و change_30d؛ در حالت همبسته همه با یک ضرب ماتریسی کشیده می‌شوند
+
+    در حالت مستقل هر دارایی جریان تصادفی جداگانه خود را دارد (همان جریان حالت کش).
+    """
+    rngs = rngs or RNGService()
+    if correlated:
+        import numpy as np
+        from correlated_shocks import draw_correlated_changes
+        labels = [(asset_class, category) for asset_class, category, _, _, _ in targets]
+        sigmas = {
+            'change_7d': np.array([target[3] for target in targets]),
+            'change_30d': np.array([target[4] for target in targets]),
+        }
+        changes = draw_correlated_changes(labels, sigmas, rngs.generator('correlated'))
+        for row, (_, _, asset_data, _, _) in enumerate(targets):
+            asset_data['change_7d'] = round(float(changes['change_7d'][row]), 2)
+            asset_data['change_30d'] = round(float(changes['change_30d'][row]), 2)
+        return
+
+    rng = ItemRandom(rngs.seed)
+    for target in targets:
+        target[2]['change_7d'], target[2]['change_30d'] = draw_asset_changes(rng, *target)
+
+def draw_cached_real_volatility_changes(targets: List[Tuple[str, str, Dict, float, float]],
+                                        rngs: RNGService, cache: VolatilityCache) -> None:
+    """مانند حالت مستقل، ولی تغییرات دارایی‌هایی که ورودی‌شان عوض نشده از کش خوانده می‌شود
+
+    جریان تصادفی هر دارایی همان جریان حالت مستقل است، پس خروجی با و بدون کش یکسان است.
+    """
+    keys = [
+        cache_key('real_volatility', rngs.seed, asset_class, category, asset_data.get('symbol'),
+                  asset_data.get('price'), sigma_7d, sigma_30d)
+        for asset_class, category, asset_data, sigma_7d, sigma_30d in targets
+    ]
+    cached = cache.get_many(keys)
+    fresh = {}
+    rng = ItemRandom(rngs.seed)
+    for key, target in zip(keys, targets):
+        if key not in cached:
+            fresh[key] = cached[key] = draw_asset_changes(rng, *target)
+        target[2]['change_7d'], target[2]['change_30d'] = cached[key]
+    cache.put_many(fresh)
+
+def update_real_volatility(correlated: bool = False, data_dir: str = DATA_DIR, seed: int = None,
+                           cache_path: str = None) -> Dict[str, Any]:
+    """بروزرسانی نوسانات با داده‌های واقعی؛ تعداد دارایی‌های بروز شده و بذر تصادفی اجرا را برمی‌گرداند
+
+    فقط فایل‌هایی که محتوایشان تغییر کرده بازنویسی می‌شوند. با cache_path نتایج دارایی‌های
+    بدون تغییر از کش SQLite خوانده می‌شوند (فقط در حالت مستقل).
+    """
+    if cache_path and correlated:
+        raise ValueError("کش نتایج فقط در حالت مستقل (غیر همبسته) پشتیبانی می‌شود")
+    print("شروع محاسبه نوسانات واقعی...")
+    rngs = RNGService(cache_run_seed(cache_path, seed))
+
+    for asset_file in ASSET_FILES.values():
+        print(f"در حال بروزرسانی نوسانات {asset_file['label']}...")
+    files = load_market_files(list(ASSET_FILES), data_dir)
+    market = {asset_class: entry['data'] for asset_class, entry in files.items()}
+
+    unknown = set()
+    with instrumentation.stage('collect'):
+        targets = collect_real_volatility_targets(market, unknown)
+    for asset_class, category, _, _, _ in targets:
+        instrumentation.count('assets_processed', asset_class=asset_class, category=category)
+    report_unknown_categories(unknown)
+    if cache_path:
+        with VolatilityCache(cache_path) as cache:
+            with instrumentation.stage('compute', mode='cached'):
+                draw_cached_real_volatility_changes(targets, rngs, cache)
+            print(f"کش نوسان: {cache.hits} مورد از کش، {cache.misses} مورد محاسبه شد")
+            instrumentation.count('cache_hits', cache.hits)
+            instrumentation.count('cache_misses', cache.misses)
+    else:
+        with instrumentation.stage('compute', mode='correlated' if correlated else 'independent'):
+            draw_real_volatility_changes(targets, correlated, rngs)
+
+    written = write_changed_files(files)
+    for asset_class in files:
+        print(f"نوسانات {ASSET_FILES[asset_class]['label']} به‌روزرسانی شد")
+
+    # ثبت بذر در فایل جامع تا اجرا قابل بازتولید باشد
+    update_complete_data_metadata(data_dir, seed=rngs.seed)
+
     print("محاسبه نوسانات واقعی کامل شد!")
+    print(f"بذر تصادفی این اجرا: {rngs.seed}")
+    return {'processed': len(targets), 'written': written, 'seed': rngs.seed,
+            'unknown_categories': sorted(unknown)}
+
+def main(argv: List[str] = None):
+    """تابع اصلی"""
+    parser = argparse.ArgumentParser(description="محاسبه نوسانات واقعی بر اساس داده‌های تاریخی")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="پوشه فایل‌های داده بازار")
+    parser.add_argument('--correlated', action='store_true', help="تغییرات همبسته بین دارایی‌های هم‌دسته و هم‌کلاس")
+    parser.add_argument('--seed', type=int, default=None, help="بذر تصادفی برای خروجی تکرارپذیر")
+    parser.add_argument('--cache', nargs='?', const=VOLATILITY_CACHE_PATH, default=None,
+                        help="کش SQLite نتایج برای رد شدن از دارایی‌های بدون تغییر (بدون --seed بذر ذخیره شده کش)")
+    add_instrumentation_args(parser)
+    add_snapshot_args(parser)
+    args = parser.parse_args(argv)
+    with instrumentation.instrumented(args.metrics, args.profile, script='real_volatility_calculator') as metrics:
+        result = update_real_volatility(correlated=args.correlated, data_dir=args.data_dir, seed=args.seed,
+                                        cache_path=args.cache)
+        metrics.emit({'type': 'result', 'processed': result['processed'], 'written': len(result['written']),
+                      'seed': result['seed'], 'unknown_categories': result['unknown_categories']})
+        record_run_snapshot(args, source='real_volatility_calculator', seed=result['seed'])
 
 if __name__ == "__main__":
-    update_real_volatility()
+    main()
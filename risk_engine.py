@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+موتور ریسک مونت‌کارلو: VaR، CVaR و احتمال margin call برای دسته بزرگی از سبدهای اهرمی بازیکنان
+"""
+
+import math
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+from correlated_shocks import AssetLabel, factor_loadings, factor_shocks
+from rng_streams import RNGService
+from volatility_estimators import periods_per_year
+
+DEFAULT_SIMULATIONS = 5000
+DEFAULT_CONFIDENCE = 0.99
+DEFAULT_MAINTENANCE_MARGIN = 0.25
+# سقف تعداد عناصر ماتریس سود و زیان (شبیه‌سازی × سبد) در هر تکه؛ حدود 64MB با float64
+MAX_CHUNK_ELEMENTS = 8_000_000
+
+
+class RiskResult(NamedTuple):
+    """معیارهای ریسک هر سبد (آرایه‌هایی به طول تعداد سبدها، به واحد پول)"""
+    var: np.ndarray
+    cvar: np.ndarray
+    margin_call_probability: np.ndarray
+    expected_pnl: np.ndarray
+
+
+def horizon_sigmas(volatility_pct: Sequence[float], horizon_days: float,
+                   asset_classes: Sequence[str]) -> np.ndarray:
+    """تبدیل نوسان سالانه درصدی به انحراف معیار بازده لگاریتمی در افق horizon_days"""
+    volatility = np.asarray(volatility_pct, dtype=np.float64) / 100
+    return volatility * np.sqrt(horizon_days / periods_per_year(asset_classes))
+
+
+def simulate_returns(labels: Sequence[AssetLabel], sigmas: Sequence[float], n_simulations: int,
+                     rng: np.random.Generator, dtype=np.float64, **correlations) -> np.ndarray:
+    """بازده ساده همبسته (شبیه‌سازی × دارایی) با مدل لگ‌نرمال بدون رانش
+
+    شوک‌ها از مدل عاملی correlated_shocks کشیده می‌شوند (بدون ماتریس همبستگی N×N).
+    """
+    sigmas = np.asarray(sigmas, dtype=np.float64)
+    shocks = factor_shocks(factor_loadings(labels, **correlations), n_simulations, rng).T
+    log_returns = shocks * sigmas - 0.5 * sigmas * sigmas
+    return np.expm1(log_returns).astype(dtype, copy=False)
+
+
+def portfolio_risk(returns: np.ndarray, exposures: np.ndarray, equity: Sequence[float],
+                   confidence: float = DEFAULT_CONFIDENCE,
+                   maintenance_margin: float = DEFAULT_MAINTENANCE_MARGIN,
+                   max_chunk_elements: int = MAX_CHUNK_ELEMENTS) -> RiskResult:
+    """معیارهای ریسک تمام سبدها روی یک مجموعه شبیه‌سازی مشترک
+
+    exposures ماتریس (سبد × دارایی) ارزش اسمی هر موقعیت پس از اهرم است (منفی = فروش استقراضی).
+    margin call یعنی equity + سود و زیان کمتر از maintenance_margin × ارزش ناخالص موقعیت‌ها شود.
+    سبدها تکه‌تکه پردازش می‌شوند تا ماتریس سود و زیان از max_chunk_elements بزرگ‌تر نشود.
+    """
+    returns = np.asarray(returns)
+    exposures = np.asarray(exposures, dtype=returns.dtype)
+    equity = np.asarray(equity, dtype=np.float64)
+    n_simulations = returns.shape[0]
+    n_portfolios = exposures.shape[0]
+    if not 0 < confidence < 1:
+        raise ValueError("confidence باید بین 0 و 1 باشد")
+
+    tail = max(1, int(math.floor((1 - confidence) * n_simulations)))
+    growth = 1.0 + returns  # lognormal returns keep every position's sign
+    result = RiskResult(*(np.empty(n_portfolios, dtype=np.float64) for _ in range(4)))
+    chunk = max(1, max_chunk_elements // max(n_simulations, 1))
+
+    for start in range(0, n_portfolios, chunk):
+        stop = min(start + chunk, n_portfolios)
+        block = exposures[start:stop]
+        # Portfolio-major layout keeps each portfolio's outcomes contiguous for the partition below
+        pnl = block @ returns.T                      # (portfolios × simulations)
+        gross = np.abs(block) @ growth.T
+        margin_calls = (equity[start:stop, None] + pnl) < maintenance_margin * gross
+        result.margin_call_probability[start:stop] = margin_calls.mean(axis=1)
+        result.expected_pnl[start:stop] = pnl.mean(axis=1)
+
+        # Only the worst `tail` outcomes are needed, so partition instead of sorting
+        worst = np.partition(pnl, tail - 1, axis=1)[:, :tail]
+        result.var[start:stop] = -worst.max(axis=1)
+        result.cvar[start:stop] = -worst.mean(axis=1)
+    return result
+
+
+def assess_portfolios(labels: Sequence[AssetLabel], sigmas: Sequence[float], positions: np.ndarray,
+                      leverage: np.ndarray, equity: Sequence[float], n_simulations: int = DEFAULT_SIMULATIONS,
+                      rng: np.random.Generator = None, confidence: float = DEFAULT_CONFIDENCE,
+                      maintenance_margin: float = DEFAULT_MAINTENANCE_MARGIN, dtype=np.float64,
+                      **correlations) -> RiskResult:
+    """شبیه‌سازی و ارزیابی ریسک یکجای سبدها
+
+    positions ارزش اسمی بدون اهرم (سبد × دارایی) و leverage ضریب اهرم هر موقعیت (هم‌شکل یا قابل broadcast)،
+    sigmas انحراف معیار افق هر دارایی (مثلاً خروجی horizon_sigmas) است.
+    """
+    rng = rng or RNGService().generator('risk')
+    exposures = np.asarray(positions, dtype=np.float64) * np.asarray(leverage, dtype=np.float64)
+    returns = simulate_returns(labels, sigmas, n_simulations, rng, dtype, **correlations)
+    return portfolio_risk(returns, exposures, equity, confidence, maintenance_margin)
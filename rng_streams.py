@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+سرویس مشترک جریان‌های تصادفی قطعی بر پایه numpy SeedSequence برای اجرای تکرارپذیر و موازی
+"""
+
+import hashlib
+import random
+import struct
+import zlib
+from typing import TYPE_CHECKING, List, Optional, Union
+
+if TYPE_CHECKING:
+    import numpy as np
+
+StreamName = Union[str, int]
+_TO_UNIT = 1.0 / (1 << 53)
+
+
+def _spawn_key(names) -> tuple:
+    # crc32 gives a stable integer per name across processes (unlike hash() with PYTHONHASHSEED)
+    return tuple(name if isinstance(name, int) else zlib.crc32(str(name).encode('utf-8')) for name in names)
+
+
+class ItemRandom(random.Random):
+    """random.Random ارزان برای چند عدد تصادفی هر مورد (مثلاً هر دارایی)
+
+    item(*names) جریان را به مسیر (بذر اجرا، نام‌ها) می‌برد و اعداد از blake2b(مسیر، شمارنده) ساخته
+    می‌شوند، پس هر مورد مستقل از ترتیب و پردازه همان اعداد را می‌گیرد. random.Random(seed) برای
+    هر دارایی حدود 6 میکروثانیه صرف ساختن حالت Mersenne Twister می‌کند.
+    """
+
+    def __init__(self, run_seed: int):
+        self.run_seed = run_seed
+        self._prefix = f"{run_seed}\x1f".encode('utf-8')
+        super().__init__(None)
+
+    def seed(self, a: Optional[Union[str, int]] = None, version: int = 2) -> None:
+        self.item(a)
+
+    def item(self, *names: StreamName) -> 'ItemRandom':
+        """شروع جریان مورد names (مانند seed)"""
+        self._path = self._prefix + '\x1f'.join(map(str, names)).encode('utf-8')
+        self._counter = 0
+        self._values: List[float] = []
+        self.gauss_next = None
+        return self
+
+    def random(self) -> float:
+        if not self._values:
+            digest = hashlib.blake2b(self._path, digest_size=32, salt=self._counter.to_bytes(8, 'little')).digest()
+            self._counter += 1
+            # Top 53 bits of each 64-bit word; stored reversed so pop() returns them in order
+            words = struct.unpack('<4Q', digest)
+            self._values = [(words[3] >> 11) * _TO_UNIT, (words[2] >> 11) * _TO_UNIT,
+                            (words[1] >> 11) * _TO_UNIT, (words[0] >> 11) * _TO_UNIT]
+        return self._values.pop()
+
+    def getrandbits(self, k: int) -> int:
+        value = 0
+        for _ in range(0, k, 52):
+            value = (value << 52) | int(self.random() * (1 << 53)) >> 1
+        return value >> (-k % 52)
+
+    def getstate(self):
+        return self._path, self._counter, list(self._values), self.gauss_next
+
+    def setstate(self, state) -> None:
+        self._path, self._counter, values, self.gauss_next = state
+        self._values = list(values)
+
+    def __reduce__(self):
+        return self.__class__, (self.run_seed,), self.getstate()
+
+
+class RNGService:
+    """منبع جریان‌های مستقل با نام؛ هر جریان فقط به (seed، نام) وابسته است
+
+    service.generator('stocks', 'technology', 3) همیشه همان دنباله را می‌دهد، مستقل از اینکه
+    در کدام پردازه و به چه ترتیبی ساخته شود. seed بدون مقدار از آنتروپی سیستم گرفته و در
+    self.seed نگه داشته می‌شود تا در metadata خروجی ثبت شود.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        import numpy as np  # loaded on first use so CLI start-up and --help stay light
+        self.root = np.random.SeedSequence(seed)
+        self.seed = int(self.root.entropy)
+
+    def sequence(self, *names: StreamName) -> 'np.random.SeedSequence':
+        """SeedSequence فرزند برای مسیر نام داده شده"""
+        import numpy as np
+        return np.random.SeedSequence(self.seed, spawn_key=_spawn_key(names))
+
+    def generator(self, *names: StreamName) -> 'np.random.Generator':
+        """numpy Generator مستقل برای مسیر نام داده شده"""
+        import numpy as np
+        return np.random.Generator(np.random.PCG64(self.sequence(*names)))
+
+    def stream_seed(self, *names: StreamName) -> int:
+        """بذر صحیح 128 بیتی جریان (برای فرستادن به پردازه دیگر یا ساخت random.Random)"""
+        state = self.sequence(*names).generate_state(4, 'uint32')
+        return int.from_bytes(state.astype('<u4').tobytes(), 'little')
+
+    def item_random(self) -> ItemRandom:
+        """جریان ارزان هر مورد؛ item_random().item('stocks', 'AAPL') فقط به (seed، نام‌ها) وابسته است"""
+        return ItemRandom(self.seed)
+
+    def python_random(self, *names: StreamName) -> random.Random:
+        """random.Random مستقل برای کدهایی که از ماژول random استفاده می‌کنند"""
+        return random.Random(self.stream_seed(*names))
+
+    def worker_generators(self, name: StreamName, workers: int) -> List['np.random.Generator']:
+        """یک Generator برای هر worker؛ جریان worker i به تعداد کل workers وابسته نیست"""
+        return [self.generator(name, 'worker', index) for index in range(workers)]
+
+    def metadata(self) -> dict:
+        return {'seed': self.seed}
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+نگهداری نوسان پنجره‌ای (7 و 30 روزه) به صورت افزایشی؛ هزینه هر روز جدید O(1) است
+"""
+
+import math
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+from json_stream import AtomicWriter
+from volatility_engine import TRADING_DAYS_PER_YEAR, history_lengths
+
+DEFAULT_WINDOWS = (7, 30)
+RESYNC_INTERVAL = 1024
+
+
+class RollingVolatility:
+    """نوسان یک پنجره ثابت برای تمام دارایی‌ها با جمع‌های Welford روی بافر حلقوی بازده‌ها"""
+
+    def __init__(self, n_assets: int, days: int, resync_interval: int = RESYNC_INTERVAL):
+        if days < 2:
+            raise ValueError("پنجره نوسان باید حداقل 2 روز باشد")
+        self.n_assets = n_assets
+        self.days = days
+        self.capacity = days - 1  # a window of `days` closes holds `days - 1` returns
+        self.resync_interval = resync_interval
+
+        self.returns = np.zeros((n_assets, self.capacity), dtype=np.float64)
+        self.valid = np.zeros((n_assets, self.capacity), dtype=bool)
+        self.position = 0
+        self.ticks = 0
+
+        self.last_price = np.full(n_assets, np.nan, dtype=np.float64)
+        self.lengths = np.zeros(n_assets, dtype=np.int64)
+        self.counts = np.zeros(n_assets, dtype=np.int64)
+        self.mean = np.zeros(n_assets, dtype=np.float64)
+        self.m2 = np.zeros(n_assets, dtype=np.float64)
+
+    def _remove(self, mask: np.ndarray, values: np.ndarray) -> None:
+        """حذف بازده‌های قدیمی از جمع‌های Welford"""
+        counts = self.counts - mask
+        safe_counts = np.maximum(counts, 1)
+        delta = values - self.mean
+        mean = self.mean - delta / safe_counts
+        m2 = self.m2 - delta * (values - mean)
+        emptied = mask & (counts == 0)
+        self.mean = np.where(emptied, 0.0, np.where(mask, mean, self.mean))
+        self.m2 = np.where(emptied, 0.0, np.where(mask, m2, self.m2))
+        self.counts = counts
+
+    def _add(self, mask: np.ndarray, values: np.ndarray) -> None:
+        """افزودن بازده‌های جدید به جمع‌های Welford"""
+        counts = self.counts + mask
+        safe_counts = np.maximum(counts, 1)
+        delta = values - self.mean
+        mean = self.mean + delta / safe_counts
+        m2 = self.m2 + delta * (values - mean)
+        self.mean = np.where(mask, mean, self.mean)
+        self.m2 = np.where(mask, m2, self.m2)
+        self.counts = counts
+
+    def update(self, closes: np.ndarray) -> None:
+        """ثبت قیمت بسته شدن روز جدید برای تمام دارایی‌ها (NaN یعنی قیمت موجود نیست)"""
+        closes = np.asarray(closes, dtype=np.float64)
+        if closes.shape != (self.n_assets,):
+            raise ValueError(f"انتظار {self.n_assets} قیمت می‌رفت، {closes.shape} دریافت شد")
+
+        started = (self.lengths > 0) | np.isfinite(closes)
+        prev = self.last_price
+        with np.errstate(invalid='ignore', divide='ignore'):
+            new_valid = np.isfinite(prev) & np.isfinite(closes) & (prev > 0)
+            new_returns = np.where(new_valid, (closes - prev) / np.where(new_valid, prev, 1.0), 0.0)
+
+        if self.ticks > 0:
+            slot = self.position
+            if self.ticks > self.capacity:
+                self._remove(self.valid[:, slot], self.returns[:, slot])
+            self.returns[:, slot] = new_returns
+            self.valid[:, slot] = new_valid
+            self._add(new_valid, new_returns)
+            self.position = (slot + 1) % self.capacity
+
+        self.last_price = closes
+        self.lengths = self.lengths + started
+        self.ticks += 1
+
+        if self.resync_interval and self.ticks % self.resync_interval == 0:
+            self.resync()
+
+    def resync(self) -> None:
+        """محاسبه دوباره دقیق جمع‌ها از بافر برای حذف خطای تجمعی ممیز شناور"""
+        counts = self.valid.sum(axis=1)
+        safe_counts = np.maximum(counts, 1)
+        mean = np.where(self.valid, self.returns, 0.0).sum(axis=1) / safe_counts
+        deviations = np.where(self.valid, self.returns - mean[:, None], 0.0)
+        self.counts = counts.astype(np.int64)
+        self.mean = np.where(counts > 0, mean, 0.0)
+        self.m2 = (deviations * deviations).sum(axis=1)
+
+    def volatility(self) -> np.ndarray:
+        """نوسان سالانه (درصد) فعلی هر دارایی؛ معادل calculate_real_volatility روی همین پنجره"""
+        variance = np.maximum(self.m2, 0.0) / np.maximum(self.counts, 1)
+        volatility = np.sqrt(variance) * math.sqrt(TRADING_DAYS_PER_YEAR) * 100
+        usable = (self.counts > 0) & (self.lengths >= self.days)
+        return np.where(usable, volatility, 0.0)
+
+    def state_dict(self) -> Dict[str, np.ndarray]:
+        """وضعیت کامل برای ذخیره‌سازی"""
+        return {
+            'days': np.int64(self.days),
+            'resync_interval': np.int64(self.resync_interval),
+            'position': np.int64(self.position),
+            'ticks': np.int64(self.ticks),
+            'returns': self.returns,
+            'valid': self.valid,
+            'last_price': self.last_price,
+            'lengths': self.lengths,
+            'counts': self.counts,
+            'mean': self.mean,
+            'm2': self.m2,
+        }
+
+    @classmethod
+    def from_state_dict(cls, state: Dict[str, np.ndarray]) -> 'RollingVolatility':
+        """بازسازی از وضعیت ذخیره شده"""
+        returns = np.asarray(state['returns'], dtype=np.float64)
+        rolling = cls(returns.shape[0], int(state['days']), int(state['resync_interval']))
+        rolling.position = int(state['position'])
+        rolling.ticks = int(state['ticks'])
+        rolling.returns = returns.copy()
+        rolling.valid = np.asarray(state['valid'], dtype=bool).copy()
+        rolling.last_price = np.asarray(state['last_price'], dtype=np.float64).copy()
+        rolling.lengths = np.asarray(state['lengths'], dtype=np.int64).copy()
+        rolling.counts = np.asarray(state['counts'], dtype=np.int64).copy()
+        rolling.mean = np.asarray(state['mean'], dtype=np.float64).copy()
+        rolling.m2 = np.asarray(state['m2'], dtype=np.float64).copy()
+        return rolling
+
+
+class RollingVolatilitySet:
+    """مجموعه پنجره‌های نوسان (پیش‌فرض 7 و 30 روزه) که با هم به‌روزرسانی می‌شوند"""
+
+    def __init__(self, n_assets: int, windows: Iterable[int] = DEFAULT_WINDOWS):
+        self.n_assets = n_assets
+        self.windows = {days: RollingVolatility(n_assets, days) for days in windows}
+
+    @classmethod
+    def from_history(cls, price_matrix: np.ndarray,
+                     windows: Iterable[int] = DEFAULT_WINDOWS) -> 'RollingVolatilitySet':
+        """گرم کردن وضعیت از ماتریس قیمت (دارایی × روز)"""
+        price_matrix = np.asarray(price_matrix, dtype=np.float64)
+        rolling = cls(price_matrix.shape[0], windows)
+        # Only the longest window's worth of history can influence the state
+        longest = max(rolling.windows)
+        for day in range(max(0, price_matrix.shape[1] - longest), price_matrix.shape[1]):
+            rolling.update(price_matrix[:, day])
+        lengths = history_lengths(price_matrix)
+        for window in rolling.windows.values():
+            window.lengths = lengths.copy()
+        return rolling
+
+    def update(self, closes: np.ndarray) -> None:
+        """ثبت قیمت روز جدید در تمام پنجره‌ها"""
+        for window in self.windows.values():
+            window.update(closes)
+
+    def volatility(self, days: int) -> np.ndarray:
+        """نوسان سالانه (درصد) پنجره days روزه"""
+        return self.windows[days].volatility()
+
+    def volatility_7_30(self) -> Tuple[np.ndarray, np.ndarray]:
+        """نوسانات 7 و 30 روزه"""
+        return self.volatility(7), self.volatility(30)
+
+    def save(self, filepath: str) -> None:
+        """ذخیره اتمی وضعیت در فایل npz"""
+        arrays = {}
+        for days, window in self.windows.items():
+            for key, value in window.state_dict().items():
+                arrays[f'w{days}_{key}'] = value
+        arrays['windows'] = np.array(sorted(self.windows), dtype=np.int64)
+        with AtomicWriter(filepath) as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, filepath: str) -> 'RollingVolatilitySet':
+        """بارگذاری وضعیت از فایل npz"""
+        with np.load(filepath) as archive:
+            windows = [int(days) for days in archive['windows']]
+            states = {
+                days: {key[len(f'w{days}_'):]: archive[key] for key in archive.files if key.startswith(f'w{days}_')}
+                for days in windows
+            }
+        first = states[windows[0]]
+        rolling = cls(np.asarray(first['returns']).shape[0], ())
+        rolling.windows = {days: RollingVolatility.from_state_dict(states[days]) for days in windows}
+        return rolling
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+خط زمانی رویدادهای زمان‌بندی شده (انتخابات، جلسات بانک مرکزی، فصل گزارش‌های مالی) با صف اولویت
+"""
+
+import heapq
+import json
+import random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# فاصله تکرار بر حسب روز بازی و بخش‌هایی که هر نوع رویداد روی آنها اثر دارد
+# (انتخابات آمریکا همان se001 در generate_news_pool است)
+ELECTIONS = [
+    {"country": "بریتانیا", "interval": 1825, "first_day": 400, "sectors": ["GBP", "FTSE"]},
+    {"country": "آلمان", "interval": 1460, "first_day": 700, "sectors": ["EUR", "DAX"]},
+    {"country": "ژاپن", "interval": 1095, "first_day": 250, "sectors": ["JPY", "NIKKEI"]},
+]
+
+CENTRAL_BANKS = [
+    {"bank": "فدرال رزرو", "interval": 45, "first_day": 20, "sectors": ["USD", "Gold", "SP500", "Bitcoin"]},
+    {"bank": "بانک مرکزی اروپا", "interval": 42, "first_day": 30, "sectors": ["EUR", "DAX"]},
+    {"bank": "بانک انگلستان", "interval": 45, "first_day": 35, "sectors": ["GBP", "FTSE"]},
+    {"bank": "بانک مرکزی ژاپن", "interval": 60, "first_day": 40, "sectors": ["JPY", "NIKKEI"]},
+]
+
+EARNINGS_SEASONS = [
+    {"sector": "Tech_Stocks", "interval": 91, "first_day": 14},
+    {"sector": "Banking_Stocks", "interval": 91, "first_day": 10},
+    {"sector": "Energy_Stocks", "interval": 91, "first_day": 21},
+    {"sector": "Retail_Stocks", "interval": 91, "first_day": 28},
+]
+
+
+def _impact_range(rng: random.Random, low: float, high: float) -> Dict[str, float]:
+    magnitude = round(rng.uniform(low, high), 1)
+    return {"min": -magnitude, "max": round(magnitude * rng.uniform(0.8, 1.3), 1)}
+
+
+def generate_scheduled_events(rng: Optional[random.Random] = None, first_id: int = 1) -> List[Dict]:
+    """تولید رویدادهای تکرارشونده؛ هر رویداد یک بار با recurrence ذخیره می‌شود نه به تعداد تکرارها"""
+    rng = rng or random.Random()
+    events = []
+
+    def add(title: str, description: str, first_day: int, interval: int, impact: Dict) -> None:
+        events.append({
+            "id": f"se{first_id + len(events):03d}",
+            "title": title,
+            "description": description,
+            "triggerDay": first_day,
+            "recurrence": {"interval": interval},
+            "impact": impact,
+        })
+
+    for election in ELECTIONS:
+        add(f"انتخابات {election['country']}",
+            f"انتخابات سراسری {election['country']} می‌تواند سیاست‌های اقتصادی را تغییر دهد.",
+            election['first_day'], election['interval'],
+            {sector: _impact_range(rng, 5, 20) for sector in election['sectors']})
+
+    for bank in CENTRAL_BANKS:
+        add(f"جلسه نرخ بهره {bank['bank']}",
+            f"تصمیم {bank['bank']} درباره نرخ بهره بر بازارها اثر می‌گذارد.",
+            bank['first_day'], bank['interval'],
+            {sector: _impact_range(rng, 1, 6) for sector in bank['sectors']})
+
+    for season in EARNINGS_SEASONS:
+        add(f"فصل گزارش‌های مالی {season['sector']}",
+            f"شرکت‌های {season['sector']} نتایج فصلی خود را منتشر می‌کنند.",
+            season['first_day'], season['interval'],
+            {season['sector']: _impact_range(rng, 2, 10)})
+
+    return events
+
+
+class EventTimeline:
+    """صف اولویت رویدادها بر اساس روز وقوع
+
+    advance فقط رویدادهای سررسید شده را بیرون می‌کشد (O(k log n)) و رویدادهای تکرارشونده
+    پس از هر وقوع با روز بعدی دوباره در صف قرار می‌گیرند. هر بار افزودن یک شناسه نسل تازه‌ای
+    می‌گیرد؛ ورودی‌های صف نسل‌های قبلی (پس از cancel یا افزودن دوباره) هنگام بیرون آمدن دور ریخته می‌شوند.
+    """
+
+    def __init__(self, events: Iterable[Dict] = (), current_day: int = 0):
+        self.current_day = current_day
+        self.events = {}
+        self._generations: Dict[str, int] = {}
+        # (day, sequence, event id, occurrence, generation)
+        self._heap: List[Tuple[int, int, str, int, int]] = []
+        self._sequence = 0
+        for event in events:
+            self.add(event)
+
+    @classmethod
+    def from_news_pool(cls, filepath: str, current_day: int = 0) -> 'EventTimeline':
+        """ساخت خط زمانی از بخش scheduledEvents فایل news-pool.json یا خروجی jsonl آن"""
+        with open(filepath, 'r', encoding='utf-8') as f:
+            if filepath.endswith('.jsonl'):
+                lines = (json.loads(line) for line in f if line.strip())
+                events = [line['item'] for line in lines if line['section'] == 'scheduledEvents']
+            else:
+                events = json.load(f).get('scheduledEvents', [])
+        return cls(events, current_day)
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self._heap if self._is_live(entry))
+
+    def _is_live(self, entry: Tuple[int, int, str, int, int]) -> bool:
+        _, _, event_id, _, generation = entry
+        return event_id in self.events and self._generations.get(event_id) == generation
+
+    def _push(self, day: int, event_id: str, occurrence: int) -> None:
+        heapq.heappush(self._heap, (day, self._sequence, event_id, occurrence, self._generations[event_id]))
+        self._sequence += 1
+
+    def _occurrence_day(self, event: Dict, occurrence: int) -> Optional[int]:
+        recurrence = event.get('recurrence')
+        if occurrence > 0 and not recurrence:
+            return None
+        day = event['triggerDay'] + occurrence * (recurrence['interval'] if recurrence else 0)
+        if recurrence and ((recurrence.get('count') is not None and occurrence >= recurrence['count'])
+                           or (recurrence.get('until') is not None and day > recurrence['until'])):
+            return None
+        return day
+
+    def add(self, event: Dict) -> None:
+        """افزودن (یا جایگزینی) رویداد
+
+        رویدادهای تکراری که روز اولشان گذشته از اولین وقوع آینده شروع می‌شوند. رویدادی (یک‌باره یا تکراری)
+        که روزش همین current_day است در advance بعدی رخ می‌دهد و رویداد یک‌باره گذشته نادیده گرفته می‌شود.
+        """
+        interval = event.get('recurrence', {}).get('interval')
+        if interval is not None and interval <= 0:
+            raise ValueError(f"فاصله تکرار رویداد {event['id']} باید مثبت باشد")
+        self.events[event['id']] = event
+        self._generations[event['id']] = self._generations.get(event['id'], 0) + 1
+        occurrence = 0
+        if interval and event['triggerDay'] < self.current_day:
+            occurrence = (self.current_day - event['triggerDay']) // interval + 1
+        day = self._occurrence_day(event, occurrence)
+        if day is not None and day >= self.current_day:
+            self._push(day, event['id'], occurrence)
+
+    def cancel(self, event_id: str) -> None:
+        """حذف رویداد؛ ورودی‌های آن در صف هنگام بیرون آمدن نادیده گرفته می‌شوند"""
+        self.events.pop(event_id, None)
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)  # keep peek_day pointing at a live entry
+
+    def peek_day(self) -> Optional[int]:
+        """روز نزدیک‌ترین رویداد در صف"""
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def advance(self, days: int = 1) -> List[Dict]:
+        """جلو بردن زمان و برگرداندن رویدادهای رخ داده به ترتیب روز"""
+        self.current_day += days
+        fired = []
+        while self._heap and self._heap[0][0] <= self.current_day:
+            entry = heapq.heappop(self._heap)
+            if not self._is_live(entry):
+                continue  # cancelled or superseded by a later add of the same id
+            day, _, event_id, occurrence, _ = entry
+            event = self.events[event_id]
+            fired.append(dict(event, triggerDay=day, occurrence=occurrence))
+            next_day = self._occurrence_day(event, occurrence + 1)
+            if next_day is not None:
+                self._push(next_day, event_id, occurrence + 1)
+        return fired
+
+    def state_dict(self) -> Dict:
+        return {'current_day': self.current_day, 'events': list(self.events.values()),
+                'queue': [[day, event_id, occurrence] for day, _, event_id, occurrence, _ in
+                          filter(self._is_live, sorted(self._heap))]}
+
+    @classmethod
+    def from_state_dict(cls, state: Dict) -> 'EventTimeline':
+        timeline = cls(current_day=state['current_day'])
+        timeline.events = {event['id']: event for event in state['events']}
+        timeline._generations = dict.fromkeys(timeline.events, 1)
+        for day, event_id, occurrence in state['queue']:
+            timeline._push(day, event_id, occurrence)
+        return timeline
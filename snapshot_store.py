@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+تاریخچه وضعیت بازار برای بازپخش و بک‌تست: هر اجرا یک delta فشرده (فقط فیلدهای تغییر یافته)
+نسبت به اجرای قبل و هر چند اجرا یک keyframe کامل در یک فایل دودویی فقط-افزودنی
+"""
+
+import argparse
+import bisect
+import math
+import os
+import struct
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import instrumentation
+from calculate_volatility import ASSET_FILES, COMPLETE_DATA_FILE, DATA_DIR, serialize_json
+from json_stream import dumps, loads, write_file_atomic
+
+SNAPSHOT_FILE = 'market_history.snap'
+SNAPSHOT_STORE_PATH = os.path.join(DATA_DIR, SNAPSHOT_FILE)
+# هر چند رکورد یک keyframe؛ بازسازی هر روز حداکثر یک keyframe و این تعداد منهای یک delta را می‌خواند.
+# تغییرات نوسان همه دارایی‌ها را در هر اجرا عوض می‌کند، پس delta فقط حدود 2.5 برابر از keyframe کوچک‌تر است
+# و فاصله بزرگ‌تر حجم را کم نمی‌کند ولی بازسازی را کند می‌کند.
+KEYFRAME_INTERVAL = 10
+COMPRESSION_LEVEL = 6
+
+KEYFRAME, DELTA = 0, 1
+KIND_NAMES = {KEYFRAME: 'keyframe', DELTA: 'delta'}
+_MAGIC = b'MSN1'
+# magic, kind, game day, unix time, uncompressed size, compressed size, crc32 of the compressed payload
+_HEADER = struct.Struct('<4sBidIII')
+_REMOVED = 0  # leaf marker in the 'del' tree of a delta
+
+State = Dict[str, Any]  # file name → parsed JSON
+
+
+class SnapshotEntry(NamedTuple):
+    """مشخصات یک رکورد در فایل تاریخچه (از سرآیند، بدون باز کردن payload)"""
+    day: int
+    kind: int
+    timestamp: float
+    offset: int  # start of the payload
+    size: int
+    length: int
+    crc: int
+
+
+def tracked_files() -> List[str]:
+    """فایل‌هایی که وضعیت بازار را تشکیل می‌دهند"""
+    return [asset_file['filename'] for asset_file in ASSET_FILES.values()] + [COMPLETE_DATA_FILE]
+
+
+def load_market_state(data_dir: str = DATA_DIR, filenames: Optional[List[str]] = None) -> State:
+    """وضعیت فعلی بازار از فایل‌های data_dir؛ فایل‌های ناموجود در وضعیت نمی‌آیند"""
+    state = {}
+    for filename in tracked_files() if filenames is None else filenames:
+        try:
+            with open(os.path.join(data_dir, filename), 'rb') as f:
+                state[filename] = loads(f.read())
+        except FileNotFoundError:
+            continue
+    return state
+
+
+def market_state(market: Dict[str, Dict[str, Any]]) -> State:
+    """وضعیت از فایل‌های بارگذاری شده با load_market_files به همراه فایل جامع همان پوشه
+
+    داده‌ها کپی نمی‌شوند؛ SnapshotStore.record آنها را فقط می‌خواند.
+    """
+    state = {os.path.basename(entry['path']): entry['data'] for entry in market.values()}
+    for data_dir in {os.path.dirname(entry['path']) for entry in market.values()}:
+        state.update(load_market_state(data_dir, [COMPLETE_DATA_FILE]))
+    return state
+
+
+def _same(old: Any, new: Any) -> bool:
+    # 1, 1.0 and True (and 0.0 / -0.0) compare equal in Python but serialize differently
+    if type(old) is not type(new) or old != new:
+        return False
+    return type(new) is not float or math.copysign(1.0, old) == math.copysign(1.0, new)
+
+
+def diff_state(old: Dict, new: Dict) -> Tuple[Dict, Dict]:
+    """(تغییرات، حذف‌ها) به صورت درخت تو در تو؛ فقط برگ‌های متفاوت و شاخه‌های منتهی به آنها
+
+    در درخت حذف، برگ _REMOVED یعنی آن کلید حذف شده است.
+    """
+    changed, removed = {}, {}
+    for key, value in new.items():
+        if key not in old:
+            changed[key] = value
+            continue
+        previous = old[key]
+        if isinstance(value, dict) and isinstance(previous, dict):
+            sub_changed, sub_removed = diff_state(previous, value)
+            if sub_changed:
+                changed[key] = sub_changed
+            if sub_removed:
+                removed[key] = sub_removed
+        elif not _same(previous, value):
+            changed[key] = value
+    for key in old:
+        if key not in new:
+            removed[key] = _REMOVED
+    return changed, removed
+
+
+def _remove(state: Dict, removed: Dict) -> None:
+    for key, marker in removed.items():
+        if isinstance(marker, dict):
+            _remove(state[key], marker)
+        else:
+            del state[key]
+
+
+def _merge(state: Dict, changed: Dict) -> None:
+    for key, value in changed.items():
+        if type(value) is dict:
+            target = state.get(key)
+            if type(target) is dict:
+                _merge(target, value)
+                continue
+        state[key] = value
+
+
+def apply_delta(state: Dict, changed: Dict, removed: Dict) -> Dict:
+    """اعمال درجای خروجی diff_state روی state"""
+    _remove(state, removed)
+    _merge(state, changed)
+    return state
+
+
+class SnapshotStore:
+    """فایل فقط-افزودنی keyframe و delta ها به ترتیب روز بازی
+
+    فهرست رکوردها با خواندن سرآیندها (بدون باز کردن payload) ساخته می‌شود. رکورد ناقص انتهای
+    فایل (مثلاً پس از قطع برنامه در میانه نوشتن) نادیده گرفته و پیش از افزودن بعدی بریده می‌شود.
+    """
+
+    def __init__(self, path: str = SNAPSHOT_STORE_PATH, keyframe_interval: int = KEYFRAME_INTERVAL):
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval باید دست کم 1 باشد")
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.entries: List[SnapshotEntry] = []
+        self._end = 0
+        # Decoded state of entries[_head_index], advanced from disk before each delta is computed
+        self._head: Optional[State] = None
+        self._head_index = -1
+        self._scan()
+
+    def _scan(self) -> None:
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            file_size = os.fstat(f.fileno()).st_size
+            offset = 0
+            while offset + _HEADER.size <= file_size:
+                magic, kind, day, timestamp, size, length, crc = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC or kind not in KIND_NAMES:
+                    raise ValueError(f"{self.path} در بایت {offset} فایل تاریخچه معتبری نیست")
+                payload_offset = offset + _HEADER.size
+                if payload_offset + length > file_size:
+                    break  # truncated tail
+                self.entries.append(SnapshotEntry(day, kind, timestamp, payload_offset, size, length, crc))
+                offset = payload_offset + length
+                f.seek(offset)
+            self._end = offset
+        if self._end < file_size:
+            print(f"⚠️ {file_size - self._end} بایت ناقص انتهای {self.path} نادیده گرفته شد")
+
+    @property
+    def days(self) -> List[int]:
+        return [entry.day for entry in self.entries]
+
+    def _read(self, f, entry: SnapshotEntry) -> Dict:
+        f.seek(entry.offset)
+        payload = f.read(entry.length)
+        if zlib.crc32(payload) != entry.crc:
+            raise ValueError(f"رکورد روز {entry.day} در {self.path} خراب است (crc)")
+        return loads(zlib.decompress(payload))
+
+    def _keyframe_index(self, index: int) -> int:
+        while self.entries[index].kind != KEYFRAME:
+            index -= 1
+        return index
+
+    def _reconstruct(self, index: int, state: Optional[State] = None,
+                     state_index: int = -1) -> State:
+        """وضعیت رکورد index: نزدیک‌ترین keyframe قبلی و delta های پس از آن
+
+        اگر state وضعیت رکورد state_index پس از همان keyframe باشد، فقط delta های بعد از آن خوانده می‌شوند.
+        """
+        start = self._keyframe_index(index)
+        with open(self.path, 'rb') as f:
+            if state is None or not start <= state_index <= index:
+                state, state_index = self._read(f, self.entries[start])['state'], start
+            for entry in self.entries[state_index + 1:index + 1]:
+                record = self._read(f, entry)
+                apply_delta(state, record['set'], record['del'])
+        return state
+
+    def index_at(self, day: int) -> int:
+        """آخرین رکورد با روز کمتر یا مساوی day"""
+        index = bisect.bisect_right(self.days, day) - 1
+        if index < 0:
+            raise ValueError(f"هیچ snapshot ای تا روز {day} ثبت نشده است")
+        return index
+
+    def state_at(self, day: int) -> State:
+        """وضعیت بازار در پایان روز day (آخرین اجرای ثبت شده تا آن روز)"""
+        with instrumentation.stage('snapshot_restore'):
+            return self._reconstruct(self.index_at(day))
+
+    def metadata_at(self, day: int) -> Dict:
+        index = self.index_at(day)
+        with open(self.path, 'rb') as f:
+            return self._read(f, self.entries[index])['metadata']
+
+    def _append(self, kind: int, day: int, record: Dict) -> None:
+        raw = dumps(record, None).encode('utf-8')
+        payload = zlib.compress(raw, COMPRESSION_LEVEL)
+        timestamp = time.time()
+        header = _HEADER.pack(_MAGIC, kind, day, timestamp, len(raw), len(payload), zlib.crc32(payload))
+        with open(self.path, 'ab') as f:
+            if f.tell() != self._end:
+                f.truncate(self._end)  # drop a partial record left by an interrupted write
+            f.write(header + payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries.append(SnapshotEntry(day, kind, timestamp, self._end + _HEADER.size, len(raw),
+                                          len(payload), zlib.crc32(payload)))
+        self._end += _HEADER.size + len(payload)
+        instrumentation.count('snapshot_bytes', len(header) + len(payload), kind=KIND_NAMES[kind])
+
+    def record(self, state: State, day: Optional[int] = None, metadata: Optional[Dict] = None,
+               keyframe: bool = False) -> SnapshotEntry:
+        """افزودن وضعیت پایان یک اجرا؛ day پیش‌فرض روز آخرین رکورد به علاوه یک است
+
+        چند رکورد در یک روز مجاز است (آخرین آنها وضعیت آن روز است) ولی روز نباید به عقب برگردد.
+        """
+        last_day = self.entries[-1].day if self.entries else None
+        if day is None:
+            day = 0 if last_day is None else last_day + 1
+        if last_day is not None and day < last_day:
+            raise ValueError(f"روز {day} پیش از آخرین snapshot (روز {last_day}) است")
+        metadata = dict(metadata or {})
+
+        with instrumentation.stage('snapshot'):
+            last = len(self.entries) - 1
+            if keyframe or last < 0 or last + 1 - self._keyframe_index(last) >= self.keyframe_interval:
+                self._append(KEYFRAME, day, {'metadata': metadata, 'state': state})
+            else:
+                # The head is only ever built from disk, so it never aliases the caller's state
+                self._head = self._reconstruct(last, self._head, self._head_index)
+                self._head_index = last
+                changed, removed = diff_state(self._head, state)
+                self._append(DELTA, day, {'metadata': metadata, 'set': changed, 'del': removed})
+        return self.entries[-1]
+
+    def restore(self, day: int, output_dir: str, compact: bool = False) -> List[str]:
+        """نوشتن فایل‌های بازار روز day در output_dir با همان قالب خط لوله نوسان"""
+        os.makedirs(output_dir, exist_ok=True)
+        written = []
+        for filename, data in self.state_at(day).items():
+            filepath = os.path.join(output_dir, filename)
+            write_file_atomic(serialize_json(data, compact), filepath)
+            written.append(filepath)
+        return written
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'records': len(self.entries),
+            'keyframes': sum(entry.kind == KEYFRAME for entry in self.entries),
+            'stored_bytes': self._end,
+            'uncompressed_bytes': sum(entry.size for entry in self.entries),
+        }
+
+
+def record_market_snapshot(data_dir: str = DATA_DIR, store_path: Optional[str] = None, day: Optional[int] = None,
+                           metadata: Optional[Dict] = None,
+                           keyframe_interval: int = KEYFRAME_INTERVAL) -> SnapshotEntry:
+    """ثبت وضعیت فعلی فایل‌های data_dir در تاریخچه (پیش‌فرض market_history.snap کنار همان فایل‌ها)"""
+    store = SnapshotStore(store_path or os.path.join(data_dir, SNAPSHOT_FILE), keyframe_interval)
+    entry = store.record(load_market_state(data_dir), day, metadata)
+    print(f"🕘 snapshot روز {entry.day} ({KIND_NAMES[entry.kind]}، {entry.length} بایت) در {store.path} ثبت شد")
+    return entry
+
+
+def describe(entry: SnapshotEntry) -> str:
+    when = datetime.fromtimestamp(entry.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+    return f"روز {entry.day:>6}  {KIND_NAMES[entry.kind]:<8}  {when}  {entry.length:>10} بایت  ({entry.size} بدون فشرده‌سازی)"
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="تاریخچه فشرده وضعیت بازار (keyframe + delta)")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="پوشه فایل‌های داده بازار")
+    parser.add_argument('--store', default=None, help=f"فایل تاریخچه (پیش‌فرض {SNAPSHOT_FILE} داخل data-dir)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help="ثبت وضعیت فعلی data-dir")
+    record.add_argument('--day', type=int, default=None, help="روز بازی (پیش‌فرض روز آخرین رکورد + 1)")
+    record.add_argument('--keyframe', action='store_true', help="ثبت keyframe کامل به جای delta")
+    record.add_argument('--keyframe-interval', type=int, default=KEYFRAME_INTERVAL)
+    restore = commands.add_parser('restore', help="بازسازی فایل‌های بازار یک روز")
+    restore.add_argument('--day', type=int, required=True)
+    restore.add_argument('--output-dir', required=True, help="پوشه خروجی فایل‌های بازسازی شده")
+    restore.add_argument('--compact', action='store_true', help="خروجی JSON فشرده (بدون تورفتگی)")
+    commands.add_parser('list', help="فهرست رکوردها")
+    args = parser.parse_args(argv)
+
+    store_path = args.store or os.path.join(args.data_dir, SNAPSHOT_FILE)
+    if args.command == 'record':
+        store = SnapshotStore(store_path, args.keyframe_interval)
+        entry = store.record(load_market_state(args.data_dir), args.day, {'source': 'snapshot_store'},
+                             keyframe=args.keyframe)
+        print(describe(entry))
+    elif args.command == 'restore':
+        started = time.perf_counter()
+        written = SnapshotStore(store_path).restore(args.day, args.output_dir, args.compact)
+        print(f"✅ {len(written)} فایل روز {args.day} در {args.output_dir} بازسازی شد "
+              f"({time.perf_counter() - started:.3f} ثانیه)")
+    else:
+        store = SnapshotStore(store_path)
+        for entry in store.entries:
+            print(describe(entry))
+        stats = store.stats()
+        print(f"مجموع: {stats['records']} رکورد ({stats['keyframes']} keyframe)، "
+              f"{stats['stored_bytes']} بایت روی دیسک از {stats['uncompressed_bytes']} بایت")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def market_dir(tmp_path):
+    """پوشه داده با بازار مصنوعی کوچک"""
+    from benchmark import generate_synthetic_market
+
+    data_dir = tmp_path / 'data'
+    generate_synthetic_market(str(data_dir), 200, seed=1)
+    return data_dir
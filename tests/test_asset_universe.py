@@ -0,0 +1,70 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from asset_universe import AssetUniverse
+from calculate_volatility import ASSET_FILES, load_market_files
+
+EDGE_DOCUMENTS = [
+    {'metadata': {'total': 3}, 'stocks': {
+        'technology': {
+            'AAA': {'name': 'A', 'price': 10.5, 'change_7d': 'N/A', 'extra': [1, 2]},
+            'BBB': {'change_30d': 3, 'price': 2 ** 60, 'symbol': 'BBB'},
+            'CCC': {'name': 'C', 'price': None},
+        },
+        'empty': {},
+        'banking': {'DDD': {'price': -0.0, 'change_7d': 1e-7, 'change_30d': True}},
+    }, 'tail': 'x'},
+    {'stocks': {}},
+    {'stocks': [], 'metadata': {}},
+    {'stocks': 'N/A'},
+    {'other': 1},
+]
+
+
+def dump(universe, key, indent):
+    buffer = io.BytesIO()
+    universe.dump_file(key, buffer, indent)
+    return buffer.getvalue().decode('utf-8')
+
+
+def test_generated_market_round_trips_byte_for_byte(market_dir):
+    universe = AssetUniverse.load(str(market_dir))
+
+    for key, entry in ASSET_FILES.items():
+        source = (market_dir / entry['filename']).read_text(encoding='utf-8')
+        assert dump(universe, key, 2) == source
+    assert len(universe) == sum(1 for key in ASSET_FILES for _ in universe.iter_records(key))
+
+
+@pytest.mark.parametrize('document', EDGE_DOCUMENTS)
+@pytest.mark.parametrize('indent', [None, 2])
+def test_unusual_documents_round_trip(tmp_path, document, indent):
+    if indent is None:
+        source = json.dumps(document, ensure_ascii=False, separators=(',', ':'))
+    else:
+        source = json.dumps(document, ensure_ascii=False, indent=indent)
+    (tmp_path / ASSET_FILES['stocks']['filename']).write_text(source, encoding='utf-8')
+
+    loaded = AssetUniverse.load(str(tmp_path), ['stocks'])
+    assert dump(loaded, 'stocks', indent) == source
+    assert loaded.file_data('stocks') == document
+
+    from_market = AssetUniverse.from_market(load_market_files(['stocks'], str(tmp_path)))
+    assert dump(from_market, 'stocks', indent) == source
+
+
+def test_set_values_appends_absent_fields_like_a_dict(tmp_path):
+    document = EDGE_DOCUMENTS[0]
+    (tmp_path / ASSET_FILES['stocks']['filename']).write_text(json.dumps(document, indent=2), encoding='utf-8')
+    universe = AssetUniverse.load(str(tmp_path), ['stocks'])
+
+    rows = universe.rows(['AAA', 'CCC'])
+    universe.set_values('change_7d', rows, np.array([1.25, -2.5]))
+
+    expected = json.loads(json.dumps(document))
+    expected['stocks']['technology']['AAA']['change_7d'] = 1.25
+    expected['stocks']['technology']['CCC']['change_7d'] = -2.5
+    assert dump(universe, 'stocks', 2) == json.dumps(expected, ensure_ascii=False, indent=2)
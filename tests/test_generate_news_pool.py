@@ -0,0 +1,46 @@
+import json
+import random
+
+import pytest
+
+from generate_news_pool import generate_news_pool, iter_normal_news, iter_unique, news_key
+
+
+def test_seeded_pool_is_reproducible(tmp_path):
+    first, second = tmp_path / 'a.json', tmp_path / 'b.json'
+    generate_news_pool(str(first), 50, 20, seed=7, write_index=False)
+    generate_news_pool(str(second), 50, 20, seed=7, write_index=False)
+
+    assert first.read_bytes() == second.read_bytes()
+
+
+def test_ids_sort_in_generation_order():
+    items = list(iter_normal_news(1500, random.Random(0)))
+    ids = [item['id'] for item in items]
+
+    assert ids[0] == 'n0001' and ids[-1] == 'n1500'
+    assert sorted(ids) == ids
+    assert len({news_key(item) for item in items}) == len(items)
+
+
+def test_all_templates_are_used():
+    titles = {item['title'].split()[0] for item in iter_normal_news(400, random.Random(1))}
+
+    assert {'تحلیلگران', 'گزارش', 'داده‌های'} <= titles
+
+
+def test_exhausted_templates_raise():
+    news = {'title': 't', 'description': 'd', 'impact': {'Gold': {'min': 1, 'max': 2}}}
+
+    with pytest.raises(ValueError):
+        list(iter_unique(lambda: dict(news), 2, 'n', set()))
+
+
+def test_jsonl_sections(tmp_path):
+    path = tmp_path / 'pool.jsonl'
+    counts = generate_news_pool(str(path), 30, 10, 'jsonl', seed=3, write_index=False)
+    lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+    sections = [line['section'] for line in lines if 'section' in line]
+    assert sections.count('normalNews') == counts['normalNews'] == 30
+    assert sections.count('majorNews') == counts['majorNews'] == 10
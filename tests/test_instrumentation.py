@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+import calculate_volatility
+import instrumentation
+
+
+def test_metrics_dash_keeps_stdout_for_progress(market_dir, capsys):
+    calculate_volatility.main(['--data-dir', str(market_dir), '--seed', '3', '--metrics'])
+    captured = capsys.readouterr()
+
+    assert 'محاسبه نوسانات کامل شد' in captured.out
+    assert not [line for line in captured.out.splitlines() if line.startswith('{')]
+    records = [json.loads(line) for line in captured.err.splitlines() if line.startswith('{')]
+    assert {'stage', 'result', 'summary'} <= {record['type'] for record in records}
+    assert {record['script'] for record in records} == {'calculate_volatility'}
+
+
+@pytest.mark.parametrize('profile', [None, 'cpu'])
+def test_metrics_file_is_appended(tmp_path, capsys, profile):
+    path = tmp_path / 'metrics.jsonl'
+    for _ in range(2):
+        with instrumentation.instrumented(str(path), profile, script='test'):
+            with instrumentation.stage('work'):
+                instrumentation.count('items', 3)
+
+    records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert len({record['run'] for record in records}) == 2
+    assert sum(record['value'] for record in records if record['type'] == 'counter') == 6
+    assert (tmp_path / 'metrics.prof').exists() == (profile == 'cpu')
+    assert capsys.readouterr().out == ''
+    assert not instrumentation.get_metrics().enabled
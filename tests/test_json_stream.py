@@ -0,0 +1,66 @@
+import json
+import math
+
+import pytest
+
+from json_stream import dumps, loads, stream_update_market_file
+
+FLOATS = [0.0, -0.0, 1.5, 1e-4, 1e-5, 1.5e-7, 9.99e15, 1e16, 1.2345678901234568e17, 1e300,
+          float('nan'), float('inf'), -float('inf')]
+
+DOCUMENTS = [
+    {'stocks': {'Tech': {'AAA': {'price': 1.5, 'change_7d': 1e-7}, 'BBB': {'price': float('nan')}},
+                'Empty': {}},
+     'metadata': {'source': 'تست', 'total': 2}},
+    {'stocks': {}, 'metadata': {}},
+    {'metadata': {'x': 1}, 'stocks': []},
+    {'stocks': 'N/A'},
+    {'stocks': {'Tech': {'AAA': 1e16}}, 'tail': [1e-9, None, True]},
+]
+
+
+def reference(value, indent):
+    if indent is None:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(value, ensure_ascii=False, indent=indent)
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+def test_dumps_matches_stdlib_for_every_float(indent):
+    value = {'floats': FLOATS, 'nested': [{'v': f} for f in FLOATS], 'text': 'متن\n\x1f'}
+    assert dumps(value, indent) == reference(value, indent)
+
+
+def test_loads_accepts_stdlib_non_finite_floats():
+    values = loads(dumps(FLOATS).encode('utf-8'))
+
+    assert math.isnan(values[-3]) and values[-2:] == [float('inf'), -float('inf')]
+    with pytest.raises(ValueError):
+        loads(b'{"broken": ')
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+@pytest.mark.parametrize('indent', [None, 2])
+def test_stream_round_trip_is_byte_identical(tmp_path, document, indent):
+    expected = reference(document, indent)
+    source = tmp_path / 'source.json'
+    source.write_text(expected, encoding='utf-8')
+    target = tmp_path / 'target.json'
+
+    assert stream_update_market_file(str(source), str(target), 'stocks', lambda c, s, r: r, indent=indent)
+    assert target.read_text(encoding='utf-8') == expected
+    # An unchanged rewrite leaves the file alone
+    assert not stream_update_market_file(str(source), str(source), 'stocks', lambda c, s, r: r, indent=indent)
+
+
+def test_stream_updates_only_selected_categories(tmp_path):
+    source = tmp_path / 'source.json'
+    source.write_text(reference(DOCUMENTS[0], 2), encoding='utf-8')
+
+    stream_update_market_file(str(source), str(source), 'stocks', lambda c, s, r: dict(r, seen=True),
+                              categories=['Tech'])
+
+    data = json.loads(source.read_text(encoding='utf-8'))
+    assert all(record['seen'] for record in data['stocks']['Tech'].values())
+    assert data['stocks']['Empty'] == {}
+    assert data['metadata'] == DOCUMENTS[0]['metadata']
@@ -0,0 +1,79 @@
+import collections
+import random
+
+import pytest
+
+from news_sampler import MIN_OVERFLOW, AliasTable, NewsSampler, WeightedBucket
+
+
+def test_alias_table_follows_the_weights():
+    weights = [1.0, 0.0, 3.0, 6.0]
+    table = AliasTable(weights)
+    rng = random.Random(0)
+
+    counts = collections.Counter(table.sample(rng) for _ in range(40000))
+    assert counts[1] == 0
+    for index, weight in enumerate(weights):
+        assert counts[index] / 40000 == pytest.approx(weight / 10, abs=0.01)
+
+
+def test_retired_ids_are_never_sampled():
+    bucket = WeightedBucket()
+    for index in range(100):
+        bucket.add(f'n{index}', 1.0 + index % 3)
+    bucket.rebuild()
+    rng = random.Random(1)
+
+    for index in range(0, 100, 2):
+        bucket.retire(f'n{index}')
+        assert f'n{index}' not in {bucket.sample(rng) for _ in range(50)}
+    assert len(bucket) == 50
+    assert bucket.total == pytest.approx(sum(bucket.members.values()) + bucket.retired_weight)
+
+
+def test_retiring_most_of_the_weight_rebuilds_the_table():
+    bucket = WeightedBucket()
+    for index in range(MIN_OVERFLOW * 4):
+        bucket.add(f'n{index}', 1.0)
+    bucket.rebuild()
+
+    for index in range(1, MIN_OVERFLOW * 4):
+        bucket.retire(f'n{index}')
+    assert bucket.ids == ['n0'] and not bucket.retired
+    assert {bucket.sample(random.Random(seed)) for seed in range(20)} == {'n0'}
+
+    bucket.retire('n0')
+    assert bucket.sample(random.Random(0)) is None
+
+
+def test_retired_id_can_be_added_back():
+    bucket = WeightedBucket()
+    for name in ('a', 'b', 'c'):
+        bucket.add(name, 1.0)
+    bucket.rebuild()
+
+    bucket.retire('a')
+    bucket.add('a', 5.0)
+    assert 'a' not in bucket.retired
+    # The stale copy left the alias table; the new weight sits in the overflow
+    assert bucket.ids == ['b', 'c'] and bucket.overflow_ids == ['a']
+    samples = collections.Counter(bucket.sample(random.Random(seed)) for seed in range(700))
+    assert samples['a'] > samples['b'] + samples['c']
+
+
+def test_sampler_retire_removes_news_from_every_table():
+    items = [{'id': f'n{index}', 'title': str(index), 'severity': 'major' if index % 4 == 0 else 'normal',
+              'impact': {'Gold': {'min': 1, 'max': 3}} if index % 2 else {'Technology': {'min': -5, 'max': -1}}}
+             for index in range(40)]
+    sampler = NewsSampler(items, rng=random.Random(3))
+
+    retired = {f'n{index}' for index in range(0, 40, 3)}
+    for news_id in retired:
+        sampler.retire(news_id)
+    sampler.retire('missing')
+
+    assert len(sampler) == 40 - len(retired)
+    for key in sampler.tables:
+        drawn = {item['id'] for item in sampler.sample(30, *key, unique=False)}
+        assert not drawn & retired
+    assert len(sampler.sample(100)) == len(sampler)
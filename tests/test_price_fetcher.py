@@ -0,0 +1,89 @@
+from datetime import date
+
+import pytest
+
+import price_fetcher
+from price_fetcher import HistoryFetcher, LocalPriceProvider, OHLCCache, PriceProvider
+
+START = date(2024, 1, 1)
+END = date(2024, 1, 31)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(price_fetcher.time, 'sleep', delays.append)
+    return delays
+
+
+def test_price_provider_is_abstract():
+    with pytest.raises(TypeError):
+        PriceProvider()
+
+
+def test_retries_with_exponential_backoff(sleeps):
+    provider = LocalPriceProvider(failures={'AAA': 2})
+    fetcher = HistoryFetcher(provider, retries=3, backoff=0.5)
+
+    bars = fetcher.fetch('AAA', START, END)
+
+    assert bars == LocalPriceProvider().history('AAA', START, END)
+    assert len(provider.calls) == 3
+    assert sleeps == [0.5, 1.0]
+    assert fetcher.failures == {}
+
+
+def test_exhausted_retries_are_recorded_as_failures(sleeps):
+    provider = LocalPriceProvider(failures={'BAD': 10})
+    fetcher = HistoryFetcher(provider, retries=2, backoff=0.1)
+
+    results = fetcher.fetch_many(['BAD', 'GOOD'], START, END)
+
+    assert results['BAD'] == []
+    assert results['GOOD']
+    assert 'ConnectionError' in fetcher.failures['BAD']
+    assert 'GOOD' not in fetcher.failures
+    assert sum(symbol == 'BAD' for symbol, _, _ in provider.calls) == 3
+    assert sleeps == [0.1, 0.2]
+
+
+def test_missing_ranges_skip_covered_days(tmp_path):
+    cache = OHLCCache(str(tmp_path))
+    assert cache.missing_ranges('AAA', START, END) == [(START, END)]
+
+    cache.store('AAA', date(2024, 1, 5), date(2024, 1, 10), [])
+    cache.store('AAA', date(2024, 1, 20), date(2024, 1, 25), [])
+
+    assert cache.missing_ranges('AAA', START, END) == [
+        (date(2024, 1, 1), date(2024, 1, 4)),
+        (date(2024, 1, 11), date(2024, 1, 19)),
+        (date(2024, 1, 26), date(2024, 1, 31)),
+    ]
+    assert cache.missing_ranges('AAA', date(2024, 1, 6), date(2024, 1, 9)) == []
+    assert cache.missing_ranges('BBB', START, END) == [(START, END)]
+
+
+def test_adjacent_ranges_are_merged(tmp_path):
+    cache = OHLCCache(str(tmp_path))
+    cache.store('AAA', date(2024, 1, 1), date(2024, 1, 10), [])
+    cache.store('AAA', date(2024, 1, 11), date(2024, 1, 31), [])
+
+    assert cache.missing_ranges('AAA', START, END) == []
+    assert cache._load('AAA')['covered'] == [['2024-01-01', '2024-01-31']]
+
+
+def test_fetch_downloads_only_missing_ranges(tmp_path, sleeps):
+    provider = LocalPriceProvider()
+    fetcher = HistoryFetcher(provider, OHLCCache(str(tmp_path)))
+
+    first = fetcher.fetch('AAA', date(2024, 1, 10), date(2024, 1, 20))
+    second = fetcher.fetch('AAA', START, END)
+
+    assert provider.calls == [
+        ('AAA', date(2024, 1, 10), date(2024, 1, 20)),
+        ('AAA', date(2024, 1, 1), date(2024, 1, 9)),
+        ('AAA', date(2024, 1, 21), date(2024, 1, 31)),
+    ]
+    assert second == LocalPriceProvider().history('AAA', START, END)
+    assert [bar for bar in second if '2024-01-10' <= bar['date'] <= '2024-01-20'] == first
+    assert sleeps == []
@@ -0,0 +1,44 @@
+import math
+
+import numpy as np
+import pytest
+
+from price_paths import category_path_params, generate_price_paths, iter_category_price_paths
+from volatility_params import UnknownCategoryError, load_volatility_params
+
+LABELS = [('stocks', 'technology'), ('cryptocurrencies', 'stablecoins'), ('commodities', 'energy')]
+
+
+def test_path_params_come_from_volatility_params():
+    table = load_volatility_params()
+    path = category_path_params(LABELS)
+
+    for index, (asset_class, category) in enumerate(LABELS):
+        row = table.category_id(asset_class, category)
+        assert path['volatility'][index] == pytest.approx(
+            table.arrays['real_volatility_30d'][row] / 100 / math.sqrt(30))
+        for field in ('drift', 'jump_intensity', 'jump_mean', 'jump_std'):
+            assert path[field][index] == table.arrays[field][row]
+
+
+def test_unknown_categories_raise_or_stay_static():
+    labels = LABELS + [('stocks', 'unknown'), ('bonds', 'government')]
+
+    with pytest.raises(UnknownCategoryError, match='bonds/government.*stocks/unknown'):
+        category_path_params(labels)
+
+    path = category_path_params(labels, static_unknown=True)
+    for values in path.values():
+        assert values[3] == values[4] == 0.0
+    np.testing.assert_array_equal(path['volatility'][:3], category_path_params(LABELS)['volatility'])
+
+
+def test_category_paths_match_explicit_params():
+    start = [100.0, 1.0, 50.0]
+    path = category_path_params(LABELS)
+    expected = generate_price_paths(start, path['drift'], path['volatility'], 40, np.random.default_rng(5),
+                                    jump_intensity=path['jump_intensity'], jump_mean=path['jump_mean'],
+                                    jump_std=path['jump_std'])
+
+    chunks = list(iter_category_price_paths(start, LABELS, 40, np.random.default_rng(5), chunk_days=16))
+    np.testing.assert_allclose(np.concatenate(chunks, axis=1), expected)
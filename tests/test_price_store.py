@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from price_store import MIN_DAY_CAPACITY, PriceStore
+
+SYMBOLS = ['AAA', 'BBB']
+DATES = ['2024-01-01', '2024-01-02', '2024-01-03']
+PRICES = np.array([[10.0, 11.0, 12.0], [np.nan, 20.0, 21.0]])
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    PriceStore.create(str(tmp_path), SYMBOLS, PRICES, DATES)
+    return str(tmp_path)
+
+
+def test_read_only_store_rejects_writes(store_dir):
+    store = PriceStore.open(store_dir)
+
+    with pytest.raises(ValueError, match='writable'):
+        store.append_day('2024-01-04', {'AAA': 13.0})
+    with pytest.raises(ValueError, match='writable'):
+        store.add_symbols(['CCC'])
+
+    reopened = PriceStore.open(store_dir)
+    assert reopened.dates == DATES
+    np.testing.assert_array_equal(reopened.matrix, PRICES)
+
+
+def test_writable_store_appends_and_persists(store_dir):
+    store = PriceStore.open(store_dir, writable=True)
+    store.append_day('2024-01-04', {'AAA': 13.0, 'CCC': 5.0})
+
+    reopened = PriceStore.open(store_dir)
+    assert reopened.symbols == SYMBOLS + ['CCC']
+    assert reopened.dates == DATES + ['2024-01-04']
+    np.testing.assert_array_equal(reopened.history('AAA'), [10.0, 11.0, 12.0, 13.0])
+    np.testing.assert_array_equal(reopened.history('CCC', 1), [5.0])
+    assert reopened.lengths().tolist() == [4, 3, 1]
+
+
+def test_append_rejects_past_days(store_dir):
+    store = PriceStore.open(store_dir, writable=True)
+
+    with pytest.raises(ValueError):
+        store.append_day('2024-01-03', {'AAA': 1.0})
+
+
+def test_append_past_reserved_capacity(tmp_path):
+    store = PriceStore.create(str(tmp_path), ['AAA'])
+    for day in range(MIN_DAY_CAPACITY + 5):
+        store.append_day(f'd{day:04d}', {'AAA': float(day + 1)})
+
+    reopened = PriceStore.open(str(tmp_path))
+    assert reopened.n_days == MIN_DAY_CAPACITY + 5
+    np.testing.assert_array_equal(reopened.window(3)[0], [MIN_DAY_CAPACITY + 3.0, MIN_DAY_CAPACITY + 4.0,
+                                                         MIN_DAY_CAPACITY + 5.0])
@@ -0,0 +1,84 @@
+import json
+
+from scheduled_events import EventTimeline
+
+
+def one_off(event_id, day):
+    return {'id': event_id, 'triggerDay': day, 'impact': {}}
+
+
+def recurring(event_id, day, interval, **recurrence):
+    return {'id': event_id, 'triggerDay': day, 'recurrence': dict(recurrence, interval=interval), 'impact': {}}
+
+
+def fired_days(timeline, days):
+    fired = []
+    for _ in range(days):
+        fired.extend((event['id'], event['triggerDay']) for event in timeline.advance(1))
+    return fired
+
+
+def test_events_due_today_fire_on_next_advance():
+    timeline = EventTimeline([one_off('a', 10), recurring('b', 10, 5)], current_day=10)
+
+    assert [event['id'] for event in timeline.advance(1)] == ['a', 'b']
+    assert fired_days(timeline, 5) == [('b', 15)]
+
+
+def test_recurring_event_in_the_past_starts_at_next_occurrence():
+    timeline = EventTimeline([recurring('b', 3, 5), one_off('a', 7)], current_day=10)
+
+    assert timeline.peek_day() == 13
+    assert fired_days(timeline, 10) == [('b', 13), ('b', 18)]
+
+
+def test_recurrence_count_and_until_stop_the_series():
+    timeline = EventTimeline([recurring('c', 1, 2, count=3), recurring('u', 1, 3, until=7)])
+
+    assert fired_days(timeline, 10) == [('c', 1), ('u', 1), ('c', 3), ('u', 4), ('c', 5), ('u', 7)]
+    assert len(timeline) == 0
+
+
+def test_cancel_then_add_fires_once():
+    timeline = EventTimeline([recurring('b', 2, 4)])
+    timeline.cancel('b')
+    timeline.add(recurring('b', 2, 4))
+    timeline.add(recurring('b', 3, 4))
+
+    assert len(timeline) == 1
+    assert fired_days(timeline, 8) == [('b', 3), ('b', 7)]
+
+
+def test_cancelled_event_never_fires():
+    timeline = EventTimeline([one_off('a', 2), one_off('b', 3)])
+    timeline.cancel('a')
+
+    assert timeline.peek_day() == 3
+    assert fired_days(timeline, 5) == [('b', 3)]
+
+
+def test_state_dict_round_trip():
+    timeline = EventTimeline([recurring('b', 2, 4), one_off('a', 5)])
+    timeline.advance(3)
+    timeline.cancel('a')
+
+    restored = EventTimeline.from_state_dict(json.loads(json.dumps(timeline.state_dict())))
+
+    assert restored.current_day == 3
+    assert fired_days(restored, 8) == fired_days(timeline, 8) == [('b', 6), ('b', 10)]
+
+
+def test_from_news_pool_reads_json_and_jsonl(tmp_path):
+    events = [recurring('se001', 4, 10), one_off('se002', 6)]
+    json_path = tmp_path / 'pool.json'
+    json_path.write_text(json.dumps({'normalNews': [], 'scheduledEvents': events}), encoding='utf-8')
+    jsonl_path = tmp_path / 'pool.jsonl'
+    lines = [{'section': 'normalNews', 'item': {'id': 'n001'}}]
+    lines += [{'section': 'scheduledEvents', 'item': event} for event in events]
+    jsonl_path.write_text(''.join(json.dumps(line) + '\n' for line in lines), encoding='utf-8')
+
+    from_json = EventTimeline.from_news_pool(str(json_path))
+    from_jsonl = EventTimeline.from_news_pool(str(jsonl_path))
+
+    assert from_json.state_dict() == from_jsonl.state_dict()
+    assert fired_days(from_jsonl, 15) == [('se001', 4), ('se002', 6), ('se001', 14)]
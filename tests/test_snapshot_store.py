@@ -0,0 +1,87 @@
+import copy
+import json
+
+import pytest
+
+from snapshot_store import DELTA, KEYFRAME, SnapshotStore, apply_delta, diff_state, load_market_state
+
+BASE = {
+    'stocks.json': {'stocks': {'tech': {'AAA': {'price': 1.0, 'change_7d': 0.5}, 'BBB': {'price': 2.0}}},
+                    'metadata': {'total': 2}},
+    'complete.json': {'n': 1},
+}
+
+
+def evolve(state, day):
+    state = copy.deepcopy(state)
+    stocks = state['stocks.json']['stocks']
+    stocks['tech']['AAA']['price'] = 1.0 + day
+    if day % 3 == 0:
+        stocks['tech'].pop('BBB', None)
+    else:
+        stocks['tech']['BBB'] = {'price': float(day), 'flag': day % 2 == 0}
+    stocks.setdefault('new', {})[f'N{day}'] = {'price': 1} if day % 2 else {'price': 1.0}
+    state['complete.json']['n'] = -0.0 if day == 4 else day
+    return state
+
+
+@pytest.mark.parametrize('old, new', [
+    (BASE, evolve(BASE, 1)),
+    ({'a': 1}, {'a': 1.0}),
+    ({'a': 0.0}, {'a': -0.0}),
+    ({'a': {'b': 1}}, {'a': 2}),
+    ({'a': 2}, {'a': {'b': 1}}),
+    ({'a': {'b': 1, 'c': 2}}, {}),
+])
+def test_diff_then_apply_reproduces_the_new_state(old, new):
+    changed, removed = diff_state(old, new)
+    rebuilt = apply_delta(copy.deepcopy(old), changed, removed)
+
+    assert json.dumps(rebuilt, sort_keys=True) == json.dumps(new, sort_keys=True)
+
+
+def test_every_day_is_reconstructed_from_keyframes_and_deltas(tmp_path):
+    path = str(tmp_path / 'history.snap')
+    store = SnapshotStore(path, keyframe_interval=3)
+    states = [evolve(BASE, day) for day in range(8)]
+    for day, state in enumerate(states):
+        store.record(state, day, {'run': day})
+
+    assert [entry.kind for entry in store.entries] == [KEYFRAME, DELTA, DELTA] * 2 + [KEYFRAME, DELTA]
+    reopened = SnapshotStore(path, keyframe_interval=3)
+    for day, state in enumerate(states):
+        assert json.dumps(reopened.state_at(day)) == json.dumps(state)
+        assert reopened.metadata_at(day) == {'run': day}
+    assert json.dumps(reopened.state_at(100)) == json.dumps(states[-1])
+    with pytest.raises(ValueError):
+        reopened.state_at(-1)
+    with pytest.raises(ValueError):
+        reopened.record(BASE, 3)
+
+
+def test_truncated_tail_is_ignored_and_overwritten(tmp_path):
+    path = tmp_path / 'history.snap'
+    store = SnapshotStore(str(path))
+    store.record(BASE, 0)
+    store.record(evolve(BASE, 1), 1)
+    intact = path.stat().st_size
+    with open(path, 'ab') as f:
+        f.write(b'MSN1partial')
+
+    reopened = SnapshotStore(str(path))
+    assert reopened.days == [0, 1]
+    reopened.record(evolve(BASE, 2), 2)
+    assert SnapshotStore(str(path)).days == [0, 1, 2]
+    assert path.stat().st_size > intact
+    assert json.dumps(SnapshotStore(str(path)).state_at(2)) == json.dumps(evolve(BASE, 2))
+
+
+def test_restore_writes_the_recorded_market_files(market_dir, tmp_path):
+    store = SnapshotStore(str(tmp_path / 'history.snap'))
+    state = load_market_state(str(market_dir))
+    store.record(state, 5)
+
+    written = store.restore(5, str(tmp_path / 'restored'))
+    assert sorted(written) == sorted(str(tmp_path / 'restored' / name) for name in state)
+    for name in state:
+        assert (tmp_path / 'restored' / name).read_bytes() == (market_dir / name).read_bytes()
@@ -0,0 +1,68 @@
+import shutil
+
+import pytest
+
+from calculate_volatility import ASSET_FILES, update_market_volatility
+from real_volatility_calculator import update_real_volatility
+from rng_streams import ItemRandom
+from volatility_cache import VolatilityCache
+
+
+def market_bytes(data_dir):
+    return {key: (data_dir / entry['filename']).read_bytes() for key, entry in ASSET_FILES.items()}
+
+
+@pytest.fixture
+def copies(market_dir, tmp_path):
+    def make(name):
+        target = tmp_path / name
+        shutil.copytree(market_dir, target)
+        return target
+    return make
+
+
+@pytest.mark.parametrize('options', [{'workers': 3}, {'stream': True}, {'cache_path': 'cache'}])
+def test_market_volatility_matches_plain_run(copies, tmp_path, options):
+    plain = copies('plain')
+    update_market_volatility(data_dir=str(plain), seed=11)
+
+    for run in range(2):  # the second cached run is served from the cache
+        other = copies(f'other{run}')
+        if 'cache_path' in options:
+            options = dict(options, cache_path=str(tmp_path / 'volatility.sqlite'))
+        update_market_volatility(data_dir=str(other), seed=11, **options)
+        assert market_bytes(other) == market_bytes(plain)
+
+
+def test_real_volatility_cache_matches_plain_run(copies, tmp_path):
+    plain = copies('plain')
+    update_real_volatility(data_dir=str(plain), seed=4)
+
+    for run in range(2):
+        cached = copies(f'cached{run}')
+        update_real_volatility(data_dir=str(cached), seed=4, cache_path=str(tmp_path / 'real.sqlite'))
+        assert market_bytes(cached) == market_bytes(plain)
+
+
+def test_unseeded_cached_runs_reuse_the_cache_seed(copies, tmp_path, capsys):
+    cache_path = str(tmp_path / 'volatility.sqlite')
+    first = update_market_volatility(data_dir=str(copies('first')), cache_path=cache_path)
+    capsys.readouterr()
+    second = update_market_volatility(data_dir=str(copies('second')), cache_path=cache_path)
+
+    assert first['seed'] == second['seed']
+    assert 'مورد از کش، 0 مورد محاسبه شد' in capsys.readouterr().out
+    with VolatilityCache(cache_path) as cache:
+        assert cache.default_seed() == first['seed']
+
+
+def test_item_random_depends_only_on_seed_and_names():
+    first = ItemRandom(7)
+    draws = [first.item('stocks', name).random() for name in ('a', 'b', 'a')]
+
+    assert draws[0] == draws[2] != draws[1]
+    assert ItemRandom(7).item('stocks', 'b').random() == draws[1]
+    assert ItemRandom(8).item('stocks', 'a').random() != draws[0]
+    first.item('x')
+    sample = [first.random() for _ in range(1000)]
+    assert all(0.0 <= value < 1.0 for value in sample)
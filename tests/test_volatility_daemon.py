@@ -0,0 +1,63 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from volatility_daemon import DaemonServer, VolatilityDaemon
+
+
+@pytest.fixture
+def server(market_dir, tmp_path):
+    daemon = VolatilityDaemon.from_data_dir(str(market_dir), state_path=str(tmp_path / 'state.npz'), seed=1)
+    server = DaemonServer(('127.0.0.1', 0), daemon)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, method, path, body=None):
+    data = body if body is None or isinstance(body, bytes) else json.dumps(body).encode('utf-8')
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data, method=method), timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+@pytest.mark.parametrize('body', [[1], 'x', 3, None])
+def test_non_object_body_is_rejected(server, body):
+    status, payload = request(server, 'POST', '/advance', json.dumps(body).encode('utf-8'))
+
+    assert status == 400
+    assert 'error' in payload
+    assert request(server, 'POST', '/volatility', [body])[0] == 400
+
+
+@pytest.mark.parametrize('body', [b'{not json', {'days': 0}, {'days': 'x'}, {'days': 2, 'closes': {'A': 1.0}}])
+def test_invalid_advance_is_rejected(server, body):
+    status, payload = request(server, 'POST', '/advance', body)
+
+    assert status == 400
+    assert 'error' in payload
+    assert request(server, 'GET', '/status')[1]['day'] == 0
+
+
+def test_advance_and_volatility(server):
+    status, payload = request(server, 'POST', '/advance', {'days': 3})
+    assert status == 200
+    assert payload['day'] == 3
+
+    symbol = next(iter(server.service.symbols))
+    status, payload = request(server, 'GET', f'/volatility?symbols={symbol},NOPE')
+    assert status == 200
+    assert list(payload['assets']) == [symbol]
+    assert payload['unknown_symbols'] == ['NOPE']
+
+
+def test_unknown_path(server):
+    assert request(server, 'GET', '/missing')[0] == 404
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+کش نتایج نوسان بر اساس هش ورودی‌های هر دارایی در SQLite با حذف LRU
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+VOLATILITY_CACHE_PATH = '/workspace/data/market-real-data/volatility_cache.sqlite'
+DEFAULT_MAX_ENTRIES = 1_000_000
+_QUERY_BATCH = 500  # stays below SQLite's bound-parameter limit
+
+Changes = Tuple[float, float]  # (change_7d, change_30d)
+
+
+def cache_key(*parts: Any) -> str:
+    """هش پایدار ورودی‌ها (قیمت، پارامترهای دسته، بذر، حالت و ...)"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class VolatilityCache:
+    """جدول key → (change_7d, change_30d, last_used)؛ پس از هر نوشتن قدیمی‌ترین‌ها حذف می‌شوند"""
+
+    def __init__(self, path: str = VOLATILITY_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS volatility ('
+            ' key TEXT PRIMARY KEY, change_7d REAL NOT NULL, change_30d REAL NOT NULL, last_used REAL NOT NULL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS volatility_last_used ON volatility (last_used)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self.connection.commit()
+
+    def __enter__(self) -> 'VolatilityCache':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM volatility').fetchone()[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Changes]:
+        """مقادیر کش شده کلیدهای موجود؛ زمان استفاده آنها هم به‌روز می‌شود"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for start in range(0, len(keys), _QUERY_BATCH):
+            batch = keys[start:start + _QUERY_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.connection.execute(
+                f'SELECT key, change_7d, change_30d FROM volatility WHERE key IN ({placeholders})', batch
+            )
+            for key, change_7d, change_30d in rows:
+                found[key] = (change_7d, change_30d)
+        now = time.time()
+        with self.connection:
+            self.connection.executemany('UPDATE volatility SET last_used = ? WHERE key = ?',
+                                        [(now, key) for key in found])
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str) -> Optional[Changes]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, values: Dict[str, Changes]) -> None:
+        """ذخیره نتایج تازه و حذف LRU در صورت عبور از max_entries"""
+        if not values:
+            return
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO volatility (key, change_7d, change_30d, last_used) VALUES (?, ?, ?, ?)',
+                [(key, change_7d, change_30d, now) for key, (change_7d, change_30d) in values.items()]
+            )
+        self.evict()
+
+    def evict(self) -> int:
+        """حذف کم‌استفاده‌ترین ورودی‌ها تا max_entries؛ تعداد حذف شده را برمی‌گرداند"""
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return 0
+        with self.connection:
+            self.connection.execute(
+                'DELETE FROM volatility WHERE key IN (SELECT key FROM volatility ORDER BY last_used LIMIT ?)',
+                (excess,)
+            )
+        return excess
+
+    def default_seed(self) -> int:
+        """بذر ثابت این کش برای اجراهای بدون --seed؛ بار اول ساخته و ذخیره می‌شود
+
+        نتایج به بذر وابسته‌اند، پس بذر تصادفی تازه در هر اجرا هیچ‌وقت به کش نمی‌خورد.
+        """
+        from rng_streams import RNGService
+
+        with self.connection:
+            # INSERT OR IGNORE keeps the first seed if two runs race on a fresh cache
+            self.connection.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('seed', ?)",
+                                    (str(RNGService().seed),))
+            (value,), = self.connection.execute("SELECT value FROM meta WHERE name = 'seed'")
+        return int(value)
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+سرویس ماندگار نوسان: فایل‌های بازار یک بار بارگذاری و قیمت‌ها و نوسان پنجره‌ای در حافظه نگه داشته می‌شوند؛
+درخواست‌های «جلو بردن روز» و «نوسان نمادها» از HTTP محلی پاسخ داده و وضعیت به صورت دوره‌ای ذخیره می‌شود
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from calculate_volatility import ASSET_FILES, DATA_DIR, load_market_files, write_changed_files
+from json_stream import dumps, load_json_file, write_file_atomic
+from news_impact import NewsImpactEngine
+from news_sampler import NewsSampler
+from price_paths import category_path_params, iter_price_paths
+from price_store import PriceStore
+from rng_streams import RNGService
+from rolling_volatility import DEFAULT_WINDOWS, RollingVolatilitySet
+from scheduled_events import EventTimeline
+from snapshot_store import SNAPSHOT_FILE, SnapshotStore, market_state
+from volatility_cache import cache_key
+from volatility_params import load_volatility_params
+
+DAEMON_STATE_PATH = os.path.join(DATA_DIR, 'volatility_daemon_state.npz')
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+SNAPSHOT_INTERVAL = 60.0  # ثانیه
+MAX_ADVANCE_DAYS = 3650
+
+
+def metadata_path(state_path: str) -> str:
+    """فایل JSON همراه وضعیت npz (روز بازی، خط زمانی رویدادها و اثر انگشت نمادها)"""
+    return os.path.splitext(state_path)[0] + '.json'
+
+
+class VolatilityDaemon:
+    """وضعیت درون حافظه سرویس؛ تمام متدهای عمومی با یک قفل سریالی می‌شوند
+
+    قیمت‌ها همان آرایه NewsImpactEngine هستند؛ هر روز ابتدا یک گام GBM با پارامترهای دسته،
+    سپس اثر رویدادهای همان روز اعمال و قیمت‌های بسته شدن به RollingVolatilitySet داده می‌شود.
+    """
+
+    def __init__(self, market: Dict[str, Dict], state_path: str = DAEMON_STATE_PATH,
+                 news_pool: Optional[str] = None, seed: Optional[int] = None, compact: bool = False,
+                 price_store_dir: Optional[str] = None, windows: Iterable[int] = DEFAULT_WINDOWS,
+                 history_path: Optional[str] = None):
+        self.lock = threading.Lock()
+        self.state_path = state_path
+        self.compact = compact
+        self.rngs = RNGService(seed)
+        self.engine = NewsImpactEngine(market)
+        self.windows = tuple(windows)
+
+        self.symbols: Dict[str, int] = {}
+        for index, (_, _, symbol, _) in enumerate(self.engine.assets):
+            self.symbols.setdefault(symbol, index)
+        self.fingerprint = cache_key([(asset_class, category, symbol)
+                                      for asset_class, category, symbol, _ in self.engine.assets])
+
+        # Categories missing from volatility_params.json only move with the news
+        labels = [(asset_class, category) for asset_class, category, _, _ in self.engine.assets]
+        self.path_params = category_path_params(labels, static_unknown=True)
+        params = load_volatility_params()
+        self.static_categories = sorted({f"{asset_class}/{category}" for asset_class, category in set(labels)
+                                         if not params.has_category(asset_class, category)})
+
+        self.sampler = None
+        self.timeline = EventTimeline()
+        if news_pool:
+            self.sampler = NewsSampler.from_news_pool(news_pool, rng=self.rngs.python_random('daemon', 'sampler'))
+            self.timeline = EventTimeline.from_news_pool(news_pool)
+
+        self.rolling = self._load_state() or self._warm_start(price_store_dir)
+        # Each snapshot is also appended to the market history (keyframe + delta) when enabled
+        self.history = SnapshotStore(history_path) if history_path else None
+        self.dirty = False
+        self._volatility: Optional[Dict[int, np.ndarray]] = None
+
+    @classmethod
+    def from_data_dir(cls, data_dir: str = DATA_DIR, **kwargs) -> 'VolatilityDaemon':
+        return cls(load_market_files(list(ASSET_FILES), data_dir), **kwargs)
+
+    @property
+    def day(self) -> int:
+        return self.timeline.current_day
+
+    def _closes(self) -> np.ndarray:
+        return np.where(self.engine.active, self.engine.prices, np.nan)
+
+    def _load_state(self) -> Optional[RollingVolatilitySet]:
+        """ادامه از آخرین snapshot اگر با همین مجموعه دارایی‌ها ساخته شده باشد"""
+        if not (os.path.exists(self.state_path) and os.path.exists(metadata_path(self.state_path))):
+            return None
+        meta = load_json_file(metadata_path(self.state_path))
+        if meta.get('fingerprint') != self.fingerprint:
+            print("⚠️ مجموعه دارایی‌ها با snapshot قبلی فرق دارد؛ وضعیت نوسان از نو ساخته می‌شود")
+            return None
+        rolling = RollingVolatilitySet.load(self.state_path)
+        if tuple(sorted(rolling.windows)) != tuple(sorted(self.windows)):
+            return None
+        self.timeline = EventTimeline.from_state_dict(meta['timeline'])
+        print(f"♻️ ادامه از snapshot روز {self.day}")
+        return rolling
+
+    def _warm_start(self, price_store_dir: Optional[str]) -> RollingVolatilitySet:
+        """گرم کردن پنجره‌ها از انبار قیمت (در صورت وجود) و قیمت فعلی دارایی‌ها"""
+        closes = self._closes()
+        if not price_store_dir or not os.path.exists(price_store_dir):
+            rolling = RollingVolatilitySet(len(closes), self.windows)
+            rolling.update(closes)
+            return rolling
+
+        store = PriceStore.open(price_store_dir)
+        history = store.window(max(self.windows))
+        matrix = np.full((len(closes), history.shape[1] + 1), np.nan, dtype=np.float64)
+        known = [(index, store.index[symbol]) for symbol, index in self.symbols.items() if symbol in store.index]
+        if known:
+            rows, store_rows = (np.array(part, dtype=np.intp) for part in zip(*known))
+            matrix[rows, :-1] = history[store_rows]
+        matrix[:, -1] = closes
+        return RollingVolatilitySet.from_history(matrix, self.windows)
+
+    def _step(self, day: int) -> List[Dict]:
+        """یک روز بازی: گام قیمت، رویدادهای روز و ثبت قیمت بسته شدن"""
+        engine = self.engine
+        params = self.path_params
+        start = np.where(engine.active, engine.prices, 1.0)
+        path = next(iter_price_paths(start, params['drift'], params['volatility'], 1,
+                                     self.rngs.generator('daemon', 'paths', day),
+                                     jump_intensity=params['jump_intensity'], jump_mean=params['jump_mean'],
+                                     jump_std=params['jump_std']))
+        np.copyto(engine.prices, path[:, 0], where=engine.active)
+
+        events = self.timeline.advance(1)
+        if self.sampler is not None:
+            events += self.sampler.sample(1)
+        if events:
+            engine.apply(events, self.rngs.generator('daemon', 'news', day))
+        self.rolling.update(self._closes())
+        return events
+
+    def advance(self, days: int = 1, closes: Optional[Dict[str, float]] = None) -> Dict:
+        """جلو بردن days روز؛ با closes قیمت بسته شدن همان یک روز از بیرون داده می‌شود"""
+        if not 1 <= days <= MAX_ADVANCE_DAYS:
+            raise ValueError(f"days باید بین 1 و {MAX_ADVANCE_DAYS} باشد")
+        if closes is not None and days != 1:
+            raise ValueError("قیمت‌های بیرونی فقط برای یک روز پذیرفته می‌شوند")
+        with self.lock:
+            started = time.perf_counter()
+            if closes is not None:
+                rows, unknown = self._rows(closes)
+                values = np.array([closes[symbol] for symbol in closes if symbol in self.symbols], dtype=np.float64)
+                self.engine.prices[rows] = values
+                self.engine.active[rows] = np.isfinite(values) & (values > 0)
+                # External closes are authoritative; scheduled events still fire so the timeline stays in step
+                fired = [event['id'] for event in self.timeline.advance(1)]
+                self.rolling.update(self._closes())
+            else:
+                unknown = []
+                fired = [event['id'] for _ in range(days) for event in self._step(self.day + 1)]
+            self._volatility = None
+            self.dirty = True
+            return {'day': self.day, 'events': fired, 'unknown_symbols': unknown,
+                    'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)}
+
+    def _rows(self, symbols: Iterable[str]) -> Tuple[np.ndarray, List[str]]:
+        rows, unknown = [], []
+        for symbol in symbols:
+            if symbol in self.symbols:
+                rows.append(self.symbols[symbol])
+            else:
+                unknown.append(symbol)
+        return np.array(rows, dtype=np.intp), unknown
+
+    def volatility(self, symbols: Optional[Iterable[str]] = None) -> Dict:
+        """قیمت و نوسان سالانه (درصد) پنجره‌ها برای نمادهای خواسته شده (بدون نماد: همه)"""
+        with self.lock:
+            if self._volatility is None:
+                self._volatility = {days: self.rolling.volatility(days) for days in self.rolling.windows}
+            symbols = list(self.symbols) if symbols is None else list(symbols)
+            rows, unknown = self._rows(symbols)
+            known = [symbol for symbol in symbols if symbol in self.symbols]
+            prices = self._closes()[rows]
+            columns = {f'volatility_{days}d': values[rows].tolist() for days, values in self._volatility.items()}
+            assets = {}
+            for position, symbol in enumerate(known):
+                price = prices[position]
+                entry = {'price': float(price) if np.isfinite(price) else None}
+                entry.update({name: values[position] for name, values in columns.items()})
+                assets[symbol] = entry
+            return {'day': self.day, 'assets': assets, 'unknown_symbols': unknown}
+
+    def status(self) -> Dict:
+        with self.lock:
+            return {'day': self.day, 'assets': len(self.engine.assets), 'active': int(self.engine.active.sum()),
+                    'windows': sorted(self.rolling.windows), 'seed': self.rngs.seed, 'dirty': self.dirty,
+                    'static_categories': self.static_categories}
+
+    def snapshot(self) -> Dict:
+        """ذخیره قیمت‌ها در فایل‌های بازار و وضعیت نوسان و خط زمانی در کنار آنها (و در تاریخچه بازار در صورت فعال بودن)"""
+        with self.lock:
+            started = time.perf_counter()
+            self.engine.sync()
+            written = write_changed_files(self.engine.market, self.compact)
+            self.rolling.save(self.state_path)
+            meta = {'fingerprint': self.fingerprint, 'seed': self.rngs.seed, 'timeline': self.timeline.state_dict()}
+            write_file_atomic(dumps(meta).encode('utf-8'), metadata_path(self.state_path))
+            if self.history is not None:
+                self.history.record(market_state(self.engine.market), self.day,
+                                    {'source': 'volatility_daemon', 'seed': self.rngs.seed})
+            self.dirty = False
+            return {'day': self.day, 'written': written,
+                    'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)}
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """GET /status، GET /volatility?symbols=A,B، POST /volatility، POST /advance، POST /snapshot"""
+
+    server_version = 'VolatilityDaemon/1.0'
+
+    @property
+    def service(self) -> VolatilityDaemon:
+        return self.server.service
+
+    def _send(self, status: int, payload: Dict) -> None:
+        body = dumps(payload, None).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else {}
+        if not isinstance(body, dict):
+            raise ValueError("بدنه درخواست باید یک شیء JSON باشد")
+        return body
+
+    def _dispatch(self, handler) -> None:
+        try:
+            self._send(200, handler())
+        except (ValueError, KeyError, TypeError) as exc:
+            self._send(400, {'error': str(exc)})
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == '/status':
+            self._dispatch(self.service.status)
+        elif url.path == '/volatility':
+            query = parse_qs(url.query)
+            symbols = [s for value in query['symbols'] for s in value.split(',') if s] if 'symbols' in query else None
+            self._dispatch(lambda: self.service.volatility(symbols))
+        else:
+            self._send(404, {'error': f"مسیر ناشناخته {url.path}"})
+
+    def do_POST(self) -> None:
+        path = urlparse(self.path).path
+        if path == '/advance':
+            self._dispatch(lambda: self.service.advance(**self._advance_args(self._body())))
+        elif path == '/volatility':
+            self._dispatch(lambda: self.service.volatility(self._body().get('symbols')))
+        elif path == '/snapshot':
+            self._dispatch(self.service.snapshot)
+        else:
+            self._send(404, {'error': f"مسیر ناشناخته {path}"})
+
+    @staticmethod
+    def _advance_args(body: Dict) -> Dict:
+        return {'days': int(body.get('days', 1)), 'closes': body.get('closes')}
+
+    def log_message(self, format: str, *args) -> None:
+        # Per-request logging would dominate millisecond-scale ticks
+        pass
+
+
+class DaemonServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], daemon: VolatilityDaemon):
+        super().__init__(address, DaemonRequestHandler)
+        self.service = daemon
+
+
+def run_snapshot_loop(daemon: VolatilityDaemon, interval: float, stop: threading.Event) -> None:
+    """ذخیره دوره‌ای وضعیت فقط وقتی از آخرین ذخیره چیزی تغییر کرده باشد"""
+    while not stop.wait(interval):
+        if daemon.dirty:
+            result = daemon.snapshot()
+            print(f"💾 snapshot روز {result['day']} در {result['elapsed_ms']} میلی‌ثانیه")
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="سرویس ماندگار نوسان روی HTTP محلی")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="آدرس گوش دادن (پیش‌فرض فقط localhost)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--data-dir', default=DATA_DIR, help="پوشه فایل‌های داده بازار")
+    parser.add_argument('--state', default=None, help="فایل npz وضعیت نوسان (پیش‌فرض داخل data-dir)")
+    parser.add_argument('--news-pool', default=None, help="فایل news-pool برای اعمال اخبار و رویدادها")
+    parser.add_argument('--price-store', default=None, help="انبار قیمت برای گرم کردن پنجره‌های نوسان")
+    parser.add_argument('--seed', type=int, default=None, help="بذر تصادفی برای اجرای تکرارپذیر")
+    parser.add_argument('--snapshot-interval', type=float, default=SNAPSHOT_INTERVAL,
+                        help="فاصله ذخیره دوره‌ای بر حسب ثانیه")
+    parser.add_argument('--compact', action='store_true', help="ذخیره JSON بدون تورفتگی")
+    parser.add_argument('--history', nargs='?', const='', default=None,
+                        help=f"ثبت هر snapshot در تاریخچه بازار (بدون مسیر: {SNAPSHOT_FILE} داخل data-dir)")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None):
+    args = parse_args(argv)
+    state_path = args.state or os.path.join(args.data_dir, os.path.basename(DAEMON_STATE_PATH))
+    history_path = None
+    if args.history is not None:
+        history_path = args.history or os.path.join(args.data_dir, SNAPSHOT_FILE)
+    daemon = VolatilityDaemon.from_data_dir(args.data_dir, state_path=state_path, news_pool=args.news_pool,
+                                            seed=args.seed, compact=args.compact, price_store_dir=args.price_store,
+                                            history_path=history_path)
+    if daemon.static_categories:
+        print(f"⚠️ دسته‌های بدون پارامتر مسیر قیمت: {', '.join(daemon.static_categories)}")
+
+    server = DaemonServer((args.host, args.port), daemon)
+    stop = threading.Event()
+    flusher = threading.Thread(target=run_snapshot_loop, args=(daemon, args.snapshot_interval, stop), daemon=True)
+    flusher.start()
+    print(f"🚀 سرویس نوسان روی http://{args.host}:{server.server_port} با {len(daemon.engine.assets)} دارایی "
+          f"(روز {daemon.day}، بذر {daemon.rngs.seed})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        if daemon.dirty:
+            daemon.snapshot()
+        print("✅ سرویس متوقف و وضعیت ذخیره شد")
+
+
+if __name__ == "__main__":
+    main()
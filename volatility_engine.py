@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+موتور برداری محاسبه نوسانات واقعی برای تمام دارایی‌ها به صورت یکجا
+"""
+
+import math
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def pad_price_histories(histories: Sequence[Sequence[float]]) -> np.ndarray:
+    """تبدیل لیست تاریخچه قیمت‌ها به ماتریس (دارایی × روز) با پر کردن ابتدای سطرها با NaN"""
+    n_days = max((len(h) for h in histories), default=0)
+    matrix = np.full((len(histories), n_days), np.nan, dtype=np.float64)
+    for row, history in enumerate(histories):
+        if len(history):
+            matrix[row, n_days - len(history):] = history
+    return matrix
+
+
+def history_lengths(price_matrix: np.ndarray) -> np.ndarray:
+    """طول تاریخچه هر دارایی (از اولین قیمت معتبر تا آخرین ستون)"""
+    finite = np.isfinite(price_matrix)
+    has_any = finite.any(axis=1)
+    first = np.argmax(finite, axis=1)
+    return np.where(has_any, price_matrix.shape[1] - first, 0)
+
+
+def calculate_real_volatility_batch(price_matrix: np.ndarray, days: int,
+                                    lengths: np.ndarray = None) -> np.ndarray:
+    """محاسبه نوسان واقعی سالانه (درصد) برای تمام سطرهای ماتریس قیمت در یک گذر
+
+    معادل برداری calculate_real_volatility: سطرهایی که کمتر از days قیمت دارند صفر می‌گیرند
+    و بازده‌هایی که قیمت قبلی آن‌ها صفر، منفی یا NaN است کنار گذاشته می‌شوند.
+    """
+    price_matrix = np.asarray(price_matrix, dtype=np.float64)
+    if price_matrix.ndim != 2:
+        raise ValueError("price_matrix باید دوبعدی (دارایی × روز) باشد")
+
+    n_assets = price_matrix.shape[0]
+    result = np.zeros(n_assets, dtype=np.float64)
+    if days < 2 or price_matrix.shape[1] < days:
+        return result
+
+    if lengths is None:
+        lengths = history_lengths(price_matrix)
+
+    window = price_matrix[:, -days:]
+    prev = window[:, :-1]
+    curr = window[:, 1:]
+
+    # Only returns whose previous close is a usable positive price count
+    with np.errstate(invalid='ignore', divide='ignore'):
+        valid = np.isfinite(prev) & np.isfinite(curr) & (prev > 0)
+        returns = np.where(valid, (curr - prev) / np.where(valid, prev, 1.0), 0.0)
+
+    counts = valid.sum(axis=1)
+    safe_counts = np.maximum(counts, 1)
+    mean = returns.sum(axis=1) / safe_counts
+    deviations = np.where(valid, returns - mean[:, None], 0.0)
+    variance = (deviations * deviations).sum(axis=1) / safe_counts
+
+    volatility = np.sqrt(variance) * math.sqrt(TRADING_DAYS_PER_YEAR) * 100
+    usable = (counts > 0) & (lengths >= days)
+    result[usable] = volatility[usable]
+    return result
+
+
+def calculate_volatility_7_30_batch(price_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """محاسبه نوسانات 7 و 30 روزه برای تمام دارایی‌ها در یک گذر برداری"""
+    price_matrix = np.asarray(price_matrix, dtype=np.float64)
+    lengths = history_lengths(price_matrix)
+    volatility_7d = calculate_real_volatility_batch(price_matrix, 7, lengths)
+    volatility_30d = calculate_real_volatility_batch(price_matrix, 30, lengths)
+    return volatility_7d, volatility_30d
+
+
+def calculate_volatility_for_histories(histories: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """محاسبه نوسانات 7 و 30 روزه برای دیکشنری {نماد: تاریخچه قیمت}"""
+    symbols = list(histories)
+    matrix = pad_price_histories([histories[symbol] for symbol in symbols])
+    volatility_7d, volatility_30d = calculate_volatility_7_30_batch(matrix)
+    return {
+        symbol: {'volatility_7d': float(volatility_7d[row]), 'volatility_30d': float(volatility_30d[row])}
+        for row, symbol in enumerate(symbols)
+    }
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+برآوردگرهای برداری نوسان تاریخی روی ماتریس‌های OHLC (دارایی × روز):
+close-to-close لگاریتمی، EWMA، Parkinson، Garman-Klass و Yang-Zhang
+"""
+
+import math
+from typing import Callable, Dict, List, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+
+from volatility_engine import TRADING_DAYS_PER_YEAR, history_lengths, pad_price_histories
+
+# تعداد دوره‌های معاملاتی سال برای هر کلاس دارایی؛ رمزارزها هر روز معامله می‌شوند
+PERIODS_PER_YEAR = {
+    'stocks': TRADING_DAYS_PER_YEAR,
+    'indices': TRADING_DAYS_PER_YEAR,
+    'commodities': TRADING_DAYS_PER_YEAR,
+    'cryptocurrencies': 365,
+}
+
+RISKMETRICS_LAMBDA = 0.94
+
+Periods = Union[float, np.ndarray]
+
+
+class OHLC(NamedTuple):
+    """چهار ماتریس هم‌شکل (دارایی × روز)؛ روزهای نامعلوم NaN هستند"""
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+
+def ohlc_from_bars(histories: Dict[str, List[Dict[str, float]]]) -> Tuple[List[str], OHLC]:
+    """تبدیل {نماد: کندل‌ها} (خروجی price_fetcher) به ماتریس‌های OHLC با پر کردن ابتدای سطرها با NaN"""
+    symbols = list(histories)
+    fields = {
+        field: pad_price_histories([[bar[field] for bar in histories[symbol]] for symbol in symbols])
+        for field in OHLC._fields
+    }
+    return symbols, OHLC(**fields)
+
+
+def periods_per_year(asset_classes: Sequence[str]) -> np.ndarray:
+    """ضریب سالانه‌سازی هر دارایی بر اساس کلاس آن (پیش‌فرض 252)"""
+    return np.array([PERIODS_PER_YEAR.get(asset_class, TRADING_DAYS_PER_YEAR) for asset_class in asset_classes],
+                    dtype=np.float64)
+
+
+def _log_ratio(numerator: np.ndarray, denominator: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """لگاریتم نسبت و ماسک خانه‌هایی که هر دو قیمت مثبت و معتبرند (بقیه صفر می‌شوند)"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        valid = np.isfinite(numerator) & np.isfinite(denominator) & (numerator > 0) & (denominator > 0)
+        values = np.where(valid, np.log(np.where(valid, numerator, 1.0) / np.where(valid, denominator, 1.0)), 0.0)
+    return values, valid
+
+
+def _masked_variance(values: np.ndarray, valid: np.ndarray, ddof: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    counts = valid.sum(axis=1)
+    mean = values.sum(axis=1) / np.maximum(counts, 1)
+    deviations = np.where(valid, values - mean[:, None], 0.0)
+    variance = (deviations * deviations).sum(axis=1) / np.maximum(counts - ddof, 1)
+    return variance, counts
+
+
+def _annualize(variance: np.ndarray, usable: np.ndarray, periods: Periods) -> np.ndarray:
+    """تبدیل واریانس روزانه به نوسان سالانه درصدی؛ سطرهای ناکافی صفر می‌گیرند"""
+    volatility = np.sqrt(np.maximum(variance, 0.0) * np.asarray(periods, dtype=np.float64)) * 100
+    return np.where(usable, volatility, 0.0)
+
+
+def _window(matrix: np.ndarray, days: int) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if matrix.ndim != 2:
+        raise ValueError("ماتریس قیمت باید دوبعدی (دارایی × روز) باشد")
+    return matrix[:, -days:]
+
+
+def _enough_history(close: np.ndarray, days: int) -> np.ndarray:
+    return history_lengths(np.asarray(close, dtype=np.float64)) >= days
+
+
+def close_to_close(close: np.ndarray, days: int, periods: Periods = TRADING_DAYS_PER_YEAR) -> np.ndarray:
+    """انحراف معیار نمونه بازده‌های لگاریتمی days قیمت آخر"""
+    window = _window(close, days)
+    returns, valid = _log_ratio(window[:, 1:], window[:, :-1])
+    variance, counts = _masked_variance(returns, valid)
+    return _annualize(variance, (counts >= 2) & _enough_history(close, days), periods)
+
+
+def ewma(close: np.ndarray, days: int, periods: Periods = TRADING_DAYS_PER_YEAR,
+         decay: float = RISKMETRICS_LAMBDA) -> np.ndarray:
+    """نوسان EWMA (RiskMetrics): میانگین وزنی مربع بازده‌ها با وزن decay^سن و میانگین صفر"""
+    window = _window(close, days)
+    returns, valid = _log_ratio(window[:, 1:], window[:, :-1])
+    ages = np.arange(returns.shape[1] - 1, -1, -1, dtype=np.float64)
+    weights = np.where(valid, decay ** ages, 0.0)
+    total = weights.sum(axis=1)
+    variance = (weights * returns * returns).sum(axis=1) / np.where(total > 0, total, 1.0)
+    return _annualize(variance, (valid.sum(axis=1) >= 1) & _enough_history(close, days), periods)
+
+
+def parkinson(high: np.ndarray, low: np.ndarray, days: int,
+              periods: Periods = TRADING_DAYS_PER_YEAR) -> np.ndarray:
+    """برآوردگر Parkinson از دامنه سقف/کف روزانه"""
+    ranges, valid = _log_ratio(_window(high, days), _window(low, days))
+    counts = valid.sum(axis=1)
+    variance = (ranges * ranges).sum(axis=1) / np.maximum(counts, 1) / (4 * math.log(2))
+    return _annualize(variance, (counts >= 1) & _enough_history(high, days), periods)
+
+
+def garman_klass(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, days: int,
+                 periods: Periods = TRADING_DAYS_PER_YEAR) -> np.ndarray:
+    """برآوردگر Garman-Klass: دامنه روزانه به همراه بازده باز تا بسته"""
+    ranges, range_valid = _log_ratio(_window(high, days), _window(low, days))
+    body, body_valid = _log_ratio(_window(close, days), _window(open_, days))
+    valid = range_valid & body_valid
+    terms = np.where(valid, 0.5 * ranges * ranges - (2 * math.log(2) - 1) * body * body, 0.0)
+    counts = valid.sum(axis=1)
+    variance = terms.sum(axis=1) / np.maximum(counts, 1)
+    return _annualize(variance, (counts >= 1) & _enough_history(close, days), periods)
+
+
+def rogers_satchell_terms(open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                          close: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    high_close, hc_valid = _log_ratio(high, close)
+    high_open, ho_valid = _log_ratio(high, open_)
+    low_close, lc_valid = _log_ratio(low, close)
+    low_open, lo_valid = _log_ratio(low, open_)
+    valid = hc_valid & ho_valid & lc_valid & lo_valid
+    return np.where(valid, high_close * high_open + low_close * low_open, 0.0), valid
+
+
+def yang_zhang(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, days: int,
+               periods: Periods = TRADING_DAYS_PER_YEAR) -> np.ndarray:
+    """برآوردگر Yang-Zhang: ترکیب نوسان شبانه، باز تا بسته و Rogers-Satchell (مقاوم در برابر گپ و رانش)"""
+    close = np.asarray(close, dtype=np.float64)
+    open_window = _window(open_, days)
+    # Overnight returns need the close before the window's first bar
+    previous_close = np.full_like(open_window, np.nan)
+    width = open_window.shape[1]
+    available = min(width, close.shape[1] - 1)
+    if available > 0:
+        previous_close[:, width - available:] = close[:, -available - 1:-1]
+
+    overnight, overnight_valid = _log_ratio(open_window, previous_close)
+    body, body_valid = _log_ratio(_window(close, days), open_window)
+    rs_terms, rs_valid = rogers_satchell_terms(open_window, _window(high, days), _window(low, days),
+                                               _window(close, days))
+    valid = overnight_valid & body_valid & rs_valid
+
+    overnight_variance, counts = _masked_variance(overnight, valid)
+    body_variance, _ = _masked_variance(body, valid)
+    rs_variance = np.where(valid, rs_terms, 0.0).sum(axis=1) / np.maximum(counts, 1)
+    n = counts.astype(np.float64)
+    k = 0.34 / (1.34 + (n + 1) / np.maximum(n - 1, 1))
+    variance = overnight_variance + k * body_variance + (1 - k) * rs_variance
+    return _annualize(variance, (counts >= 2) & _enough_history(close, days), periods)
+
+
+ESTIMATORS: Dict[str, Callable[[OHLC, int, Periods], np.ndarray]] = {
+    'close_to_close': lambda ohlc, days, periods: close_to_close(ohlc.close, days, periods),
+    'ewma': lambda ohlc, days, periods: ewma(ohlc.close, days, periods),
+    'parkinson': lambda ohlc, days, periods: parkinson(ohlc.high, ohlc.low, days, periods),
+    'garman_klass': lambda ohlc, days, periods: garman_klass(*ohlc, days, periods),
+    'yang_zhang': lambda ohlc, days, periods: yang_zhang(*ohlc, days, periods),
+}
+
+
+def estimate_volatility(ohlc: OHLC, days: int, method: str = 'yang_zhang',
+                        asset_classes: Sequence[str] = None) -> np.ndarray:
+    """نوسان سالانه درصدی تمام دارایی‌ها با برآوردگر انتخابی و ضریب سالانه‌سازی کلاس هر دارایی"""
+    if method not in ESTIMATORS:
+        raise ValueError(f"برآوردگر ناشناخته {method}؛ گزینه‌ها: {', '.join(ESTIMATORS)}")
+    periods = periods_per_year(asset_classes) if asset_classes is not None else TRADING_DAYS_PER_YEAR
+    return ESTIMATORS[method](ohlc, days, periods)
+
+
+def estimate_for_histories(histories: Dict[str, List[Dict[str, float]]], days: int, method: str = 'yang_zhang',
+                           asset_class: str = None) -> Dict[str, float]:
+    """نوسان هر نماد از کندل‌های دریافت شده با HistoryFetcher؛ {نماد: نوسان سالانه درصدی}"""
+    symbols, ohlc = ohlc_from_bars(histories)
+    classes = [asset_class] * len(symbols) if asset_class is not None else None
+    volatility = estimate_volatility(ohlc, days, method, classes)
+    return {symbol: float(volatility[row]) for row, symbol in enumerate(symbols)}
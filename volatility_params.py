@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+پارامترهای نوسان هر (کلاس دارایی، دسته) از volatility_params.json؛ یک بار بارگذاری و به آرایه تبدیل می‌شوند
+"""
+
+import json
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+VOLATILITY_PARAMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'volatility_params.json')
+
+PARAM_FIELDS = (
+    'base_volatility_7d',   # دامنه تغییر 7 روزه شبیه‌سازی شده (کسری)
+    'base_volatility_30d',  # دامنه تغییر 30 روزه شبیه‌سازی شده (کسری)
+    'random_factor',        # پراکندگی تصادفی دامنه
+    'real_volatility_7d',   # انحراف معیار تغییر 7 روزه در حالت «واقعی» (درصد)
+    'real_volatility_30d',  # انحراف معیار تغییر 30 روزه در حالت «واقعی» (درصد)
+    'real_multiplier',      # ضریب انحراف معیار حالت «واقعی»
+)
+
+# پارامترهای روزانه مسیر قیمت (price_paths)؛ اختیاری، پیش‌فرض بدون رانش و بدون پرش.
+# نوسان روزانه مسیر جدا ذخیره نمی‌شود و از real_volatility_30d به دست می‌آید
+PATH_FIELDS = {
+    'drift': 0.0,           # رانش روزانه
+    'jump_intensity': 0.0,  # احتمال روزانه پرش
+    'jump_mean': 0.0,       # میانگین اندازه لگاریتمی پرش
+    'jump_std': 0.0,        # انحراف معیار اندازه لگاریتمی پرش
+}
+
+CategoryLabel = Tuple[str, str]  # (asset_class, category)
+
+
+class UnknownCategoryError(KeyError):
+    """دسته‌ای که در فایل پارامترها تعریف نشده است"""
+
+
+class VolatilityParams:
+    """جدول پارامترها به صورت آرایه‌های NumPy با شناسه عددی برای هر (کلاس، دسته)
+
+    arrays[field][ids] پارامترهای یک دسته از دارایی‌ها را بدون جستجوی دیکشنری جمع می‌کند.
+    """
+
+    def __init__(self, data: Dict):
+        self.aliases = {
+            (asset_class, alias): target
+            for asset_class, mapping in data.get('aliases', {}).items()
+            for alias, target in mapping.items()
+        }
+        self.labels: List[CategoryLabel] = []
+        rows = []
+        for asset_class, categories in data['categories'].items():
+            for category, values in categories.items():
+                missing = [field for field in PARAM_FIELDS if field not in values]
+                if missing:
+                    raise ValueError(f"پارامترهای {missing} برای {asset_class}/{category} تعریف نشده‌اند")
+                self.labels.append((asset_class, category))
+                rows.append([float(values[field]) for field in PARAM_FIELDS]
+                            + [float(values.get(field, default)) for field, default in PATH_FIELDS.items()])
+
+        self.ids = {label: index for index, label in enumerate(self.labels)}
+        import numpy as np  # only the array paths need NumPy; keep it off the import path of the CLIs
+        fields = PARAM_FIELDS + tuple(PATH_FIELDS)
+        table = np.array(rows, dtype=np.float64).reshape(len(rows), len(fields))
+        self.arrays = {field: table[:, column].copy() for column, field in enumerate(fields)}
+        for array in self.arrays.values():
+            array.setflags(write=False)
+        # Plain-float rows for the per-asset code paths
+        self._factors = [dict(zip(PARAM_FIELDS, map(float, row))) for row in rows]
+
+    @classmethod
+    def load(cls, filepath: str = VOLATILITY_PARAMS_PATH) -> 'VolatilityParams':
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def categories(self, asset_class: str) -> List[str]:
+        """دسته‌های تعریف شده یک کلاس دارایی به ترتیب فایل"""
+        return [category for label_class, category in self.labels if label_class == asset_class]
+
+    def category_id(self, asset_class: str, category: str) -> int:
+        category = self.aliases.get((asset_class, category), category)
+        try:
+            return self.ids[(asset_class, category)]
+        except KeyError:
+            raise UnknownCategoryError(f"{asset_class}/{category}") from None
+
+    def has_category(self, asset_class: str, category: str) -> bool:
+        return (asset_class, self.aliases.get((asset_class, category), category)) in self.ids
+
+    def category_ids(self, labels: Iterable[CategoryLabel]) -> 'np.ndarray':
+        """شناسه هر برچسب؛ اگر برچسب ناشناخته‌ای باشد همه آنها با هم گزارش می‌شوند"""
+        ids, unknown = [], set()
+        for asset_class, category in labels:
+            try:
+                ids.append(self.category_id(asset_class, category))
+            except UnknownCategoryError:
+                unknown.add(f"{asset_class}/{category}")
+        if unknown:
+            raise UnknownCategoryError(', '.join(sorted(unknown)))
+        import numpy as np
+        return np.array(ids, dtype=np.intp)
+
+    def gather(self, field: str, ids: Sequence[int]) -> 'np.ndarray':
+        import numpy as np
+        return self.arrays[field][np.asarray(ids, dtype=np.intp)]
+
+    def path_params(self, ids: Sequence[int]) -> Dict[str, 'np.ndarray']:
+        """پارامترهای روزانه مسیر قیمت (drift، volatility و پرش‌ها) برای شناسه‌های داده شده
+
+        volatility انحراف معیار 30 روزه حالت «واقعی» (real_volatility_30d، درصد) تقسیم بر √30 است،
+        پس مسیرهای قیمت و محاسبه نوسان از یک جدول پارامتر می‌خوانند.
+        """
+        import numpy as np
+        params = {field: self.gather(field, ids) for field in PATH_FIELDS}
+        params['volatility'] = self.gather('real_volatility_30d', ids) / (100.0 * np.sqrt(30.0))
+        return params
+
+    def factor(self, asset_class: str, category: str) -> Dict[str, float]:
+        """پارامترهای یک دسته به صورت دیکشنری (فقط خواندنی فرض شود)"""
+        return self._factors[self.category_id(asset_class, category)]
+
+    def find_class(self, category: str) -> Optional[str]:
+        """کلاس دارایی دسته‌ای که بدون کلاس داده شده (در صورت تکرار، اولین کلاس)"""
+        for asset_class, label_category in self.labels:
+            if label_category == category:
+                return asset_class
+        for asset_class, alias in self.aliases:
+            if alias == category:
+                return asset_class
+        return None
+
+
+@lru_cache(maxsize=4)
+def load_volatility_params(filepath: str = VOLATILITY_PARAMS_PATH) -> VolatilityParams:
+    """بارگذاری یکباره فایل پارامترها (نتیجه برای هر مسیر کش می‌شود)"""
+    return VolatilityParams.load(filepath)